@@ -0,0 +1,60 @@
+"""
+Benchmarks the backward steps of the Ginelli algorithm against the per-step
+xarray/np.linalg.solve loop compute_clvs used to run.
+
+Written as asv benchmarks, can also be run directly for a quick comparison:
+    python benchmarks/benchmark_ginelli.py
+"""
+import timeit
+
+import numpy as np
+import xarray as xr
+
+from chaos_explorer.lyapunov import ginelli
+from chaos_explorer.lyapunov.core import posQR
+
+
+def random_R(steps, k, seed=0):
+    "Upper triangular R matrices with positive diagonals, shaped like a Bennetin run."
+    rng = np.random.default_rng(seed)
+    return np.stack([posQR(rng.standard_normal((k, k)))[1] + np.eye(k) for step in range(steps)])
+
+
+def legacy_backward_pass(ds, A):
+    "Backward loop as previously written in compute_clvs."
+    for step in np.flip(ds.time.values):
+        R = ds.R.sel(time=step)
+        pushedA = np.linalg.solve(R, A)
+        norms = np.linalg.norm(pushedA, axis=0, ord=2)
+        A = pushedA / norms
+    return A
+
+
+def engine_backward_pass(ds, A):
+    A_ts, ftcle_ts, A, norms = ginelli.observe(ds.R.values, A, np.ones(len(A)), 0.1)
+    return A
+
+
+class GinelliBackwardPass:
+    params = ([3, 40], [1000, 10000])
+    param_names = ["k", "steps"]
+
+    def setup(self, k, steps):
+        R = random_R(steps, k)
+        self.ds = xr.Dataset({"R": (["time", "le_index", "le_index_2"], R)}, coords={"time": 0.1 * np.arange(steps)})
+        engine_backward_pass(self.ds.isel(time=slice(0, 2)), np.eye(k))  # Compile outside of timing
+
+    def time_legacy(self, k, steps):
+        legacy_backward_pass(self.ds, np.eye(k))
+
+    def time_engine(self, k, steps):
+        engine_backward_pass(self.ds, np.eye(k))
+
+
+if __name__ == "__main__":
+    for k, steps in [(3, 10000), (40, 10000)]:
+        benchmark = GinelliBackwardPass()
+        benchmark.setup(k, steps)
+        legacy = timeit.timeit(lambda: benchmark.time_legacy(k, steps), number=1)
+        engine = timeit.timeit(lambda: benchmark.time_engine(k, steps), number=1)
+        print(f"k={k}, steps={steps}: legacy {legacy:.3f}s, engine {engine:.4f}s, speedup {legacy / engine:.0f}x")
@@ -0,0 +1,82 @@
+"""
+Benchmarks OdeIntegrator.run and TangentIntegrator.run.
+Throughput is tracked as integration steps (of length tau) and rhs evaluations per second.
+"""
+import numpy as np
+
+from chaos_explorer.autodiff import make_jvp
+from chaos_explorer.integrator import OdeIntegrator
+from chaos_explorer.stats import Stats
+from chaos_explorer.tangent_integrator import TangentIntegrator
+
+from .common import MODEL_NAMES, model, per_second
+
+TAU = 0.01
+STEPS = 200
+
+
+class OdeIntegratorRun:
+    params = (MODEL_NAMES, ["RK45", "RK4"])
+    param_names = ["model", "method"]
+
+    def setup(self, name, method):
+        self.rhs, jacobian, self.ic, k = model(name)
+        self.integrator = OdeIntegrator(self.rhs, self.ic, method=method)
+        self.integrator.run(TAU)  # Compile any kernels outside of timing
+
+    def _run(self, integrator):
+        for step in range(STEPS):
+            integrator.run(TAU)
+
+    def time_run(self, name, method):
+        self._run(self.integrator)
+
+    def peakmem_run(self, name, method):
+        self._run(self.integrator)
+
+    def track_steps_per_second(self, name, method):
+        return per_second(lambda: self._run(self.integrator), STEPS)
+
+    track_steps_per_second.unit = "steps/s"
+
+    def track_rhs_evaluations_per_second(self, name, method):
+        self.integrator.stats = Stats()
+        rate = per_second(lambda: self._run(self.integrator), 1)
+        return rate * self.integrator.stats.counts["rhs_evaluations"]
+
+    track_rhs_evaluations_per_second.unit = "evaluations/s"
+
+
+class TangentIntegratorRun:
+    params = (MODEL_NAMES, ["jacobian", "complex_step"])
+    param_names = ["model", "tlm"]
+
+    def setup(self, name, tlm):
+        self.rhs, self.jacobian, self.ic, k = model(name)
+        self.perturbation = np.eye(len(self.ic), k)
+        # Registered models use their compiled kernels with the jacobian, the jvp is never compiled
+        jacobian, jvp = (self.jacobian, None) if tlm == "jacobian" else (None, make_jvp(self.rhs))
+        self.integrator = TangentIntegrator(self.rhs, self.ic, jacobian, perturbation_ic=self.perturbation, jvp=jvp)
+        self.integrator.run(TAU)
+
+    def _run(self, integrator):
+        for step in range(STEPS):
+            integrator.run(TAU)
+
+    def time_run(self, name, tlm):
+        self._run(self.integrator)
+
+    def peakmem_run(self, name, tlm):
+        self._run(self.integrator)
+
+    def track_steps_per_second(self, name, tlm):
+        return per_second(lambda: self._run(self.integrator), STEPS)
+
+    track_steps_per_second.unit = "steps/s"
+
+    def track_rhs_evaluations_per_second(self, name, tlm):
+        self.integrator.stats = Stats()
+        rate = per_second(lambda: self._run(self.integrator), 1)
+        return rate * self.integrator.stats.counts["rhs_evaluations"]
+
+    track_rhs_evaluations_per_second.unit = "evaluations/s"
@@ -0,0 +1,137 @@
+"""
+Benchmarks BennetinStepper.step, compute_blvs and the forward and backward phases of compute_clvs.
+"""
+import shutil
+import tempfile
+
+import numpy as np
+
+from chaos_explorer.lyapunov import ginelli
+from chaos_explorer.lyapunov.blvs import compute_blvs
+from chaos_explorer.lyapunov.clvs import compute_clvs, _clv_output
+from chaos_explorer.lyapunov.core import BennetinStepper, BennetinObserver
+from chaos_explorer.lyapunov.storage import MemoryBlockStore
+
+from .common import MODEL_NAMES, model, per_second
+
+TAU = 0.01
+STEPS = 100
+
+
+def stepper(name):
+    rhs, jacobian, ic, k = model(name)
+    return BennetinStepper(rhs, ic, jacobian, np.eye(len(ic), k), tau=TAU)
+
+
+class BennetinStepperStep:
+    params = MODEL_NAMES
+    param_names = ["model"]
+
+    def setup(self, name):
+        self.stepper = stepper(name)
+        self.stepper.step()  # Compile any kernels outside of timing
+
+    def time_many_steps(self, name):
+        self.stepper.many_steps(STEPS)
+
+    def peakmem_many_steps(self, name):
+        self.stepper.many_steps(STEPS)
+
+    def track_steps_per_second(self, name):
+        return per_second(lambda: self.stepper.many_steps(STEPS), STEPS)
+
+    track_steps_per_second.unit = "steps/s"
+
+
+class ComputeBlvs:
+    params = MODEL_NAMES
+    param_names = ["model"]
+    timeout = 300
+
+    def setup(self, name):
+        self.rhs, self.jacobian, self.ic, self.k = model(name)
+
+    def _compute(self):
+        compute_blvs(self.rhs, self.jacobian, STEPS, self.ic, tau=TAU, transient_len=STEPS, k=self.k)
+
+    def time_compute_blvs(self, name):
+        self._compute()
+
+    def peakmem_compute_blvs(self, name):
+        self._compute()
+
+
+class ComputeClvs:
+    """
+    The forward phase is timed as the Bennetin observations compute_clvs stores in memory,
+    the backward phase as the Ginelli steps and CLV output from those stored observations.
+    """
+
+    params = MODEL_NAMES
+    param_names = ["model"]
+    timeout = 300
+
+    def setup(self, name):
+        self.rhs, self.jacobian, self.ic, self.k = model(name)
+        self.save_location = tempfile.mkdtemp(prefix="benchmark_clvs_")
+
+        self.stepper = stepper(name)
+        self.stepper.many_steps(STEPS)  # Transient, so R is never zero
+
+        # Stored observations for the backward phase
+        self.observation_store = self._forward()
+        self.convergence_store = self._forward()
+        self._backward()  # Compile outside of timing
+
+    def teardown(self, name):
+        shutil.rmtree(self.save_location, ignore_errors=True)
+
+    def _forward(self):
+        store = MemoryBlockStore()
+        observer = BennetinObserver(self.stepper, quiet=True)
+        observer.make_observations_in_blocks(None, STEPS, STEPS // 4, timer=False, store=store)
+        return store
+
+    def _backward(self):
+        A, norms = ginelli.initial_A(self.k)
+        for block in self.convergence_store.reversed_blocks():
+            A, norms = ginelli.converge(block["R"], A, norms)
+        for block in self.observation_store.reversed_blocks():
+            A_ts, ftcle_ts, A, norms = ginelli.observe(block["R"], A, norms, TAU)
+            _clv_output(block, A_ts, ftcle_ts, TAU, True, True)
+
+    def time_forward(self, name):
+        self._forward()
+
+    def peakmem_forward(self, name):
+        self._forward()
+
+    def time_backward(self, name):
+        self._backward()
+
+    def peakmem_backward(self, name):
+        self._backward()
+
+    def track_forward_steps_per_second(self, name):
+        return per_second(self._forward, STEPS)
+
+    track_forward_steps_per_second.unit = "steps/s"
+
+    def track_backward_steps_per_second(self, name):
+        return per_second(self._backward, 2 * STEPS)
+
+    track_backward_steps_per_second.unit = "steps/s"
+
+    def time_compute_clvs(self, name):
+        compute_clvs(
+            self.rhs,
+            self.jacobian,
+            self.ic,
+            save_location=self.save_location,
+            tau=TAU,
+            blv_tranient_len=STEPS,
+            clv_transient_steps=STEPS,
+            clv_observation_steps=STEPS,
+            block_size=STEPS // 4,
+            k=self.k,
+        )
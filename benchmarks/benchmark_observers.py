@@ -0,0 +1,89 @@
+"""
+Benchmarks observing and writing observations to netcdf, BennetinObserver.dump and the xarray observers.
+"""
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from chaos_explorer.integrator import OdeIntegrator
+from chaos_explorer.lyapunov.core import BennetinStepper, BennetinObserver
+from chaos_explorer.lyapunov.storage import StorageEncoding
+from chaos_explorer.models.l63 import L63TrajectoryObserver
+from chaos_explorer.models.l96 import L96TrajectoryObserver
+
+from .common import MODEL_NAMES, model
+
+NUMBER = 1000
+FREQUENCY = 0.01
+ENCODINGS = {
+    "float64": None,
+    "float32_zlib_packed": StorageEncoding("float32", "zlib", pack_R=True),
+    "int16_zlib_packed": StorageEncoding("int16", "zlib", pack_R=True),
+}
+
+
+def trajectory_observer(name, integrator):
+    if name == "l63":
+        return L63TrajectoryObserver(integrator)
+    return L96TrajectoryObserver(integrator)
+
+
+class TrajectoryObservers:
+    params = (MODEL_NAMES, [False, True])
+    param_names = ["model", "single_pass"]
+
+    def setup(self, name, single_pass):
+        rhs, jacobian, ic, k = model(name)
+        self.integrator = OdeIntegrator(rhs, ic)
+        self.integrator.run(FREQUENCY)  # Compile any kernels outside of timing
+        self.observer = trajectory_observer(name, self.integrator)
+        self.folder = Path(tempfile.mkdtemp(prefix="benchmark_observers_"))
+
+    def teardown(self, name, single_pass):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def time_make_observations(self, name, single_pass):
+        self.observer.make_observations(NUMBER, FREQUENCY, timer=False, single_pass=single_pass)
+        self.observer.wipe()
+
+    def time_make_observations_and_dump(self, name, single_pass):
+        self.observer.make_observations(NUMBER, FREQUENCY, timer=False, single_pass=single_pass)
+        self.observer.dump(self.folder / "observations.nc")
+
+    def peakmem_make_observations_and_dump(self, name, single_pass):
+        self.observer.make_observations(NUMBER, FREQUENCY, timer=False, single_pass=single_pass)
+        self.observer.dump(self.folder / "observations.nc")
+
+
+class BennetinObserverDump:
+    params = (MODEL_NAMES, list(ENCODINGS))
+    param_names = ["model", "encoding"]
+
+    def setup(self, name, encoding):
+        rhs, jacobian, ic, k = model(name)
+        stepper = BennetinStepper(rhs, ic, jacobian, np.eye(len(ic), k), tau=FREQUENCY)
+        self.observer = BennetinObserver(stepper, quiet=True)
+        self.observer.make_observations(NUMBER // 10, timer=False)
+        self.checkpoint = self.observer.checkpoint()
+        self.folder = Path(tempfile.mkdtemp(prefix="benchmark_observers_"))
+
+    def teardown(self, name, encoding):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _dump(self, encoding):
+        self.observer.restore(self.checkpoint)  # Same observations to dump every time
+        self.observer.dump(self.folder / "observations.nc", ENCODINGS[encoding])
+
+    def time_dump(self, name, encoding):
+        self._dump(encoding)
+
+    def peakmem_dump(self, name, encoding):
+        self._dump(encoding)
+
+    def track_dump_bytes(self, name, encoding):
+        self._dump(encoding)
+        return (self.folder / "observations.nc").stat().st_size
+
+    track_dump_bytes.unit = "bytes"
@@ -0,0 +1,30 @@
+"""
+Models and helpers shared by the benchmarks.
+L63 is the small case, L96 is run at increasing dimension to see how things scale.
+"""
+import time
+
+import numpy as np
+
+from chaos_explorer.models.l63 import l63, l63_jacobian
+from chaos_explorer.models.l96 import l96, l96_jacobian
+
+MODEL_NAMES = ["l63", "l96_40", "l96_200"]
+
+
+def model(name):
+    "Returns rhs, jacobian, an initial condition on the attractor and the number of Lyapunov vectors to track."
+    if name == "l63":
+        return l63, l63_jacobian, np.array([-5.9, -5.8, 23.4]), 3
+    if name.startswith("l96_"):
+        ndim = int(name.split("_")[1])
+        ic = 8.0 + 0.01 * np.random.default_rng(0).standard_normal(ndim)
+        return l96, l96_jacobian, ic, 10
+    raise ValueError(f"Unknown benchmark model {name}.")
+
+
+def per_second(function, number):
+    "Runs function once and returns number / seconds taken, e.g. steps per second."
+    start = time.perf_counter()
+    function()
+    return number / (time.perf_counter() - start)
@@ -0,0 +1,4 @@
+import logging
+
+# Library logger, silent unless the application adds a handler, e.g. with chaos_explorer.log.log_to_stdout
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,71 @@
+"""
+Jacobian-vector products derived from the rhs, for when no tangent linear model is provided.
+All jvps have the signature jvp(state, perturbation, **parameters) where perturbation is a
+vector (ndim,) or a matrix of vectors (ndim, k).
+"""
+import numpy as np
+
+
+def _columnwise(vector_jvp):
+    "Extends a jvp defined for single vectors to matrices of vectors, column by column."
+
+    def jvp(state, perturbation, **parameters):
+        if np.ndim(perturbation) == 1:
+            return vector_jvp(state, perturbation, **parameters)
+        return np.stack([vector_jvp(state, column, **parameters) for column in perturbation.T], axis=1)
+
+    return jvp
+
+
+def complex_step_jvp(rhs, h=1.0e-20):
+    """
+    jvp by the complex step method, J v = Im(f(x + ihv)) / h.
+    Exact to machine precision but needs rhs to accept complex states.
+    """
+
+    def vector_jvp(state, vector, **parameters):
+        return np.imag(rhs(state + 1j * h * vector, **parameters)) / h
+
+    return _columnwise(vector_jvp)
+
+
+def finite_difference_jvp(rhs):
+    "jvp by forward finite differences, J v = (f(x + eps v) - f(x)) / eps."
+
+    def vector_jvp(state, vector, **parameters):
+        vector_norm = np.linalg.norm(vector)
+        if vector_norm == 0:
+            return np.zeros_like(vector, dtype=float)
+        eps = np.sqrt(np.finfo(float).eps) * (1 + np.linalg.norm(state)) / vector_norm
+        return (rhs(state + eps * vector, **parameters) - rhs(state, **parameters)) / eps
+
+    return _columnwise(vector_jvp)
+
+
+def jax_jvp(rhs):
+    "jvp by forward mode differentiation with jax.jvp. Needs rhs written with jax.numpy."
+    import jax
+
+    def jvp(state, perturbation, **parameters):
+        def f(x):
+            return rhs(x, **parameters)
+
+        def vector_jvp(vector):
+            return jax.jvp(f, (state,), (vector,))[1]
+
+        if np.ndim(perturbation) == 1:
+            return np.asarray(vector_jvp(perturbation))
+        return np.asarray(jax.vmap(vector_jvp, in_axes=1, out_axes=1)(perturbation))
+
+    return jvp
+
+
+def make_jvp(rhs, method="complex_step"):
+    """
+    Builds a jvp for rhs.
+    method, string: "complex_step", "finite_difference" or "jax".
+    """
+    methods = {"complex_step": complex_step_jvp, "finite_difference": finite_difference_jvp, "jax": jax_jvp}
+    if method not in methods:
+        raise ValueError(f"Unknown jvp method {method}, choose from {list(methods)}.")
+    return methods[method](rhs)
@@ -0,0 +1,37 @@
+"""
+Checkpoints let long runs, e.g. compute_clvs or BisectionAlgorithm.run, be killed and resumed.
+A checkpoint is a dict of numpy arrays and python values, pickled to a single file.
+"""
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Atomically writes a checkpoint, a killed job leaves either the old or the new checkpoint, never half of one.
+    path, str: file to write to.
+    checkpoint, dict: state to save.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_checkpoint(path):
+    "Returns the checkpoint saved at path, or None if there isn't one."
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
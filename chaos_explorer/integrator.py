@@ -1,5 +1,86 @@
 # Imports
-from scipy.integrate import solve_ivp
+import numpy as np
+import scipy.integrate
+from scipy.integrate import solve_ivp, OdeSolution
+
+from chaos_explorer.jit import njit
+from chaos_explorer.models.registry import get_kernels
+from chaos_explorer.stats import NULL_STATS
+
+# Explicit Runge-Kutta solvers, the only ones whose step size we can safely carry over by hand.
+_RK_METHODS = ("RK23", "RK45", "DOP853")
+
+
+class SteppingSolver:
+    """
+    Keeps a scipy.integrate OdeSolver (e.g. RK45) alive across integrations.
+
+    Consecutive calls to advance that pick up where the last one finished reuse the
+    solver, so there is no set up cost and the adaptive step size carries over.
+    If the state or time has been changed in between, a new solver is started
+    using the last step size rather than re-running the initial step selection.
+    """
+
+    def __init__(self, fun, method="RK45"):
+        """
+        fun, function: rhs of ode with signature fun(t, state), as for solve_ivp.
+        method, string: name of a scipy.integrate OdeSolver, e.g. "RK45".
+        """
+        self.fun = fun
+        self.method = method
+        self.solver = None
+        self._h_abs = None
+        self.nfev = 0  # Totals across every solver used
+        self.njev = 0
+
+    def _start(self, t0, y0, t1):
+        first_step = None if self._h_abs is None else min(self._h_abs, abs(t1 - t0))
+        self.solver = getattr(scipy.integrate, self.method)(self.fun, t0, y0, t1, first_step=first_step)
+
+    def advance(self, t0, y0, t1, dense_output=False):
+        """
+        Integrates y0 from t0 to t1.
+        Returns state at t1 and, if dense_output, an OdeSolution interpolating [t0, t1].
+        """
+        if t1 == t0:
+            return np.array(y0, dtype=float), None
+
+        # Carry on with the current solver if the state hasn't been touched since the last call
+        # and we're integrating in the same direction
+        solver = self.solver
+        if (
+            solver is None
+            or solver.t != t0
+            or not np.array_equal(solver.y, y0)
+            or np.sign(t1 - t0) != solver.direction
+        ):
+            self._start(t0, y0, t1)
+            solver = self.solver
+            nfev, njev = 0, 0
+        else:
+            solver.t_bound = t1
+            solver.status = "running"
+            nfev, njev = solver.nfev, solver.njev
+
+        ts, interpolants = [t0], []
+        while solver.status == "running":
+            proposed_h_abs = getattr(solver, "h_abs", None)
+            message = solver.step()
+            if solver.status == "failed":
+                raise RuntimeError(message)
+            if dense_output:
+                ts.append(solver.t)
+                interpolants.append(solver.dense_output())
+
+        # The final step was clipped to land on t1, keep the step the solver actually proposed
+        if self.method in _RK_METHODS:
+            solver.h_abs = max(solver.h_abs, proposed_h_abs)
+            self._h_abs = solver.h_abs
+
+        self.nfev += solver.nfev - nfev
+        self.njev += solver.njev - njev
+        dense_solution = OdeSolution(ts, interpolants) if dense_output else None
+        return solver.y.copy(), dense_solution
 
 
 class OdeIntegrator:
@@ -7,12 +88,30 @@ class OdeIntegrator:
     Integrates a determinsitic dynamical system.
     """
 
-    def __init__(self, rhs, ic, parameters={}, method="RK45"):
+    def __init__(
+        self,
+        rhs,
+        ic,
+        parameters={},
+        method="RK45",
+        persistent=False,
+        dense_output=False,
+        dt=0.01,
+        use_kernels=True,
+        stats=None,
+    ):
         """
         rhs, function: Maps from state to rhs of ode.
         parameters, dict: Parameters used in ode.
         ic, np.array: initial condition for the ode.
-        method, string: passed to solve_ivp.
+        method, string: passed to solve_ivp, or "RK4" for fixed-step integration.
+        persistent, bool: keep one stepping solver alive across run calls instead of
+            starting a new solve_ivp problem each time.
+        dense_output, bool: whether run stores an interpolant of the last integration in dense_solution.
+        dt, float: step size used when method is "RK4".
+        use_kernels, bool: use compiled kernels if rhs is a registered model and they support the parameters,
+            otherwise rhs itself is used.
+        stats, Stats: collects rhs/jacobian evaluations (nfev/njev) and time spent integrating, nothing if None.
         """
         self.rhs = rhs
         self.ic = ic
@@ -21,22 +120,246 @@ class OdeIntegrator:
         self.time = 0
         self.method = method
         self.ndim = len(ic)
+        self.persistent = persistent
+        self.dense_output = dense_output
+        self.dense_solution = None
+        self.dt = dt
+        self.kernels = get_kernels(rhs) if use_kernels else None
+        self._active_kernels = None  # kernels, if they support the current parameters, set each run
+        self._stepping_solver = SteppingSolver(self._rhs_dt, method=method)
+        self.stats = NULL_STATS if stats is None else stats
+
+    def _count_evaluations(self, nfev, njev):
+        self.stats.count("rhs_evaluations", nfev)
+        if njev:
+            self.stats.count("jacobian_evaluations", njev)
+
+    def _advance(self, t1, dense_output):
+        "Persistent integration to t1, counting evaluations."
+        nfev, njev = self._stepping_solver.nfev, self._stepping_solver.njev
+        result = self._stepping_solver.advance(self.time, self.state, t1, dense_output=dense_output)
+        self._count_evaluations(self._stepping_solver.nfev - nfev, self._stepping_solver.njev - njev)
+        return result
 
     def _rhs_dt(self, t, state):
+        if self._active_kernels is not None:
+            return self._active_kernels.rhs(state, self._kernel_parameters)
         return self.rhs(state, **self.parameters)
 
+    def _prepare_kernels(self):
+        "Packs parameters for the compiled kernels, done each run in case parameters have changed."
+        if self.kernels is not None and self.kernels.supports(self.parameters):
+            self._active_kernels = self.kernels
+            self._kernel_parameters = self.kernels.pack(self.parameters)
+        else:
+            self._active_kernels = None
+
+    def _run_rk4(self, t):
+        "Fixed step RK4 integration, step shrunk slightly so we land on time + t."
+        number_of_steps = max(int(np.ceil(t / self.dt - 1.0e-9)), 1)
+        h = t / number_of_steps
+        state = np.asarray(self.state, dtype=float)
+        self.stats.count("rhs_evaluations", 4 * number_of_steps)
+        if self._active_kernels is not None:
+            return rk4_loop(self._active_kernels.rhs, state, self._kernel_parameters, h, number_of_steps)
+
+        def f(x):
+            return self.rhs(x, **self.parameters)
+
+        for step in range(number_of_steps):
+            state = rk4_step(f, state, h)
+        return state
+
     def run(self, t):
         """t: how long we integrate for in adimensional time."""
+        with self.stats.timer("integration"):
+            self._run(t)
+
+    def _run(self, t):
+        self._prepare_kernels()
+
+        if self.method == "RK4":
+            self.state = self._run_rk4(t)
+        elif self.persistent:
+            self.state, self.dense_solution = self._advance(self.time + t, self.dense_output)
+        else:
+            # Integration, default uses RK45 with adaptive stepping.
+            solver_return = solve_ivp(
+                self._rhs_dt,
+                (self.time, self.time + t),
+                self.state,
+                dense_output=self.dense_output,
+                method=self.method,
+            )
+            self._count_evaluations(solver_return.nfev, solver_return.njev)
+            self.state = solver_return.y[:, -1]
+            self.dense_solution = solver_return.sol
 
-        # Integration, default uses RK45 with adaptive stepping.
-        solver_return = solve_ivp(
-            self._rhs_dt,
-            (self.time, self.time + t),
-            self.state,
-            dense_output=True,
-            method=self.method,
-        )
+        # Updating variables
+        self.time = self.time + t
+
+    def sample(self, number, frequency):
+        """
+        Integrates for number * frequency in a single adaptive integration.
+        Returns the times and states, shape (number + 1, ndim), every frequency time units,
+        starting with the current state.
+        """
+        times = self.time + frequency * np.arange(number + 1)
+        with self.stats.timer("integration"):
+            states = self._sample(times, frequency)
 
         # Updating variables
+        self.state = states[-1].copy()
+        self.time = times[-1]
+        return times, states
+
+    def _sample(self, times, frequency):
+        self._prepare_kernels()
+        number = len(times) - 1
+
+        if self.method == "RK4":
+            states = np.empty((number + 1, self.ndim))
+            states[0] = self.state
+            for i in range(number):
+                states[i + 1] = self._run_rk4(frequency)
+                self.state = states[i + 1]
+        elif self.persistent:
+            final_state, dense_solution = self._advance(times[-1], True)
+            states = dense_solution(times).T
+            states[-1] = final_state
+        else:
+            solver_return = solve_ivp(
+                self._rhs_dt,
+                (self.time, times[-1]),
+                self.state,
+                t_eval=times,
+                method=self.method,
+            )
+            self._count_evaluations(solver_return.nfev, solver_return.njev)
+            states = solver_return.y.T
+        return states
+
+    def run_until(self, events, max_time):
+        """
+        Integrates until one of events crosses zero, or for max_time, in a single integration.
+        events, list: functions event(t, state) as for solve_ivp, each one stops the integration
+            at its exact crossing. Attributes such as direction are kept.
+        Returns the index of the event that stopped the integration, None if none did.
+        """
+        self._prepare_kernels()
+        method = "RK45" if self.method == "RK4" else self.method  # Fixed step RK4 has no event location
+        with self.stats.timer("integration"):
+            solver_return = solve_ivp(
+                self._rhs_dt,
+                (self.time, self.time + max_time),
+                self.state,
+                events=[_terminal(event) for event in events],
+                method=method,
+            )
+        self._count_evaluations(solver_return.nfev, solver_return.njev)
         self.state = solver_return.y[:, -1]
+        self.time = solver_return.t[-1]
+        if solver_return.status != 1:
+            return None
+        return next(i for i, t_events in enumerate(solver_return.t_events) if len(t_events) > 0)
+
+
+def _terminal(event):
+    "Copy of a solve_ivp event that stops the integration, event itself may not take attributes, e.g. a method."
+
+    def terminal_event(t, state):
+        return event(t, state)
+
+    terminal_event.terminal = True
+    terminal_event.direction = getattr(event, "direction", 0)
+    return terminal_event
+
+
+def rk4_step(f, state, h):
+    "One classic fourth order Runge-Kutta step of size h for the autonomous system dx/dt = f(x)."
+    k1 = f(state)
+    k2 = f(state + 0.5 * h * k1)
+    k3 = f(state + 0.5 * h * k2)
+    k4 = f(state + h * k3)
+    return state + (h / 6) * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+@njit
+def rk4_loop(rhs, state, parameters, h, number_of_steps):
+    "number_of_steps fixed RK4 steps of a compiled kernel rhs(state, parameters), all inside compiled code."
+    for step in range(number_of_steps):
+        k1 = rhs(state, parameters)
+        k2 = rhs(state + 0.5 * h * k1, parameters)
+        k3 = rhs(state + 0.5 * h * k2, parameters)
+        k4 = rhs(state + h * k3, parameters)
+        state = state + (h / 6) * (k1 + 2 * k2 + 2 * k3 + k4)
+    return state
+
+
+class EnsembleIntegrator:
+    """
+    Integrates an ensemble of initial conditions of a determinsitic dynamical system together.
+    """
+
+    def __init__(self, rhs, ic, parameters={}, method="RK4", dt=0.01):
+        """
+        rhs, function: Maps from stacked states, shape (n_members, ndim), to stacked rhs of ode.
+        parameters, dict: Parameters used in ode.
+        ic, np.array: initial conditions for the ode, shape (n_members, ndim).
+        method, string: "RK4" for fixed-step integration, otherwise passed to solve_ivp
+            which then integrates the whole ensemble as one adaptive system.
+        dt, float: step size used by the fixed-step RK4 integration.
+        """
+        self.rhs = rhs
+        self.ic = ic
+        self.state = ic
+        self.parameters = parameters
+        self.time = 0
+        self.method = method
+        self.dt = dt
+        self.n_members, self.ndim = np.shape(ic)
+
+    def _rhs(self, state):
+        return self.rhs(state, **self.parameters)
+
+    def _rhs_dt(self, t, state):
+        "Flattened rhs for solve_ivp."
+        return self._rhs(state.reshape(self.n_members, self.ndim)).ravel()
+
+    def run(self, t):
+        """t: how long we integrate for in adimensional time."""
+
+        if self.method == "RK4":
+            # Fixed step integration, step shrunk slightly so we land on time + t
+            number_of_steps = max(int(np.ceil(t / self.dt - 1.0e-9)), 1)
+            h = t / number_of_steps
+            state = np.asarray(self.state, dtype=float)
+            for step in range(number_of_steps):
+                state = rk4_step(self._rhs, state, h)
+            self.state = state
+        else:
+            solver_return = solve_ivp(
+                self._rhs_dt,
+                (self.time, self.time + t),
+                np.ravel(self.state),
+                method=self.method,
+            )
+            self.state = solver_return.y[:, -1].reshape(self.n_members, self.ndim)
+
+        # Updating variables
         self.time = self.time + t
+
+    def sample(self, number, frequency):
+        """
+        Runs the ensemble for number * frequency.
+        Returns the times and states, shape (number + 1, n_members, ndim), every frequency time units,
+        starting with the current state.
+        """
+        times = self.time + frequency * np.arange(number + 1)
+        states = np.empty((number + 1, self.n_members, self.ndim))
+        states[0] = self.state
+        for i in range(number):
+            self.run(frequency)
+            states[i + 1] = self.state
+        self.time = times[-1]
+        return times, states
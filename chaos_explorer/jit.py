@@ -0,0 +1,22 @@
+"""
+Optional Numba compilation.
+If numba isn't installed njit leaves functions as they are, so kernels run as plain NumPy.
+"""
+try:
+    import numba
+
+    NUMBA_AVAILABLE = True
+
+    def njit(*args, **kwargs):
+        "numba.njit, caching compiled code on disk by default to save compiling again in new processes."
+        kwargs.setdefault("cache", True)
+        return numba.njit(*args, **kwargs)
+
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        "Stand in for numba.njit, usable both as @njit and @njit(...)."
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
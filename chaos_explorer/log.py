@@ -0,0 +1,34 @@
+"""
+Logging and progress bars.
+Messages go to library loggers under "chaos_explorer", which only have a NullHandler, so nothing is shown
+by default, not even warnings, and applications decide what's shown, e.g. with log_to_stdout or logging.basicConfig.
+tqdm is only imported once a progress bar is actually shown.
+"""
+import logging
+import sys
+
+FORMAT = "%(asctime)s|%(levelname)s|%(message)s"
+DATE_FORMAT = "%Y%m%d%H%M%S"
+
+
+def log_to_stdout(level=logging.INFO):
+    """
+    Prints chaos_explorer's messages to stdout as time|level|message.
+    level, int: lowest level printed.
+    Returns the handler added, so it can be removed again.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(FORMAT, DATE_FORMAT))
+    logger = logging.getLogger("chaos_explorer")
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
+
+
+def progress(iterable, disable=False, **kwargs):
+    "tqdm progress bar over iterable, kwargs are passed to tqdm. iterable itself if disabled."
+    if disable:
+        return iterable
+    from tqdm import tqdm
+
+    return tqdm(iterable, **kwargs)
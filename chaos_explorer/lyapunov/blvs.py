@@ -1,20 +1,53 @@
 # TODO: Wrapper for the computation of BLVs
 
-from .core import BennetinIntegrator
+from .core import BennetinStepper, MapBennetinStepper
+from .transients import adaptive_blv_transient
 
 import numpy as np
-from loguru import logger
-import sys
+import logging
 
+logger = logging.getLogger(__name__)
 
-def compute_blvs(rhs, jacobian, number_of_observations, ic, tau=0.1, transient_len=1000):
-    bennetin_stepper = BennetinIntegrator(rhs, ic, jacobian, np.eye(3) * 1.0e-6, tau=tau)
 
-    logger.remove()
-    logger.add(sys.stdout, colorize=False, format="{time:YYYYMMDDHHmmss}|{level}|{message}")
+def compute_blvs(
+    rhs,
+    jacobian,
+    number_of_observations,
+    ic,
+    tau=0.1,
+    transient_len=1000,
+    jvp=None,
+    k=None,
+    adaptive_transient=False,
+    transient_tol=1.0e-3,
+    ftle_tol=1.0e-2,
+    discrete=False,
+):
+    """
+    k, int: number of leading exponents/vectors to compute, all of them if None.
+    adaptive_transient, bool: stop the transient once the BLVs have converged, transient_len is then
+        an upper limit. See adaptive_blv_transient for transient_tol and ftle_tol.
+    discrete, bool: rhs is a map and jacobian its jacobian, tau is then the number of iterates between QR steps.
+
+    Returns lists of the trajectory, BLVs and FTBLEs at each observation, and the number of transient steps
+    taken, transient_len unless adaptive_transient stopped it early.
+    """
+    Q_ic = np.eye(len(ic), k) * 1.0e-6
+    if discrete:
+        bennetin_stepper = MapBennetinStepper(rhs, ic, jacobian, Q_ic, tau=tau, jvp=jvp)
+    else:
+        bennetin_stepper = BennetinStepper(rhs, ic, jacobian, Q_ic, tau=tau, jvp=jvp)
 
     # Run Transient
-    bennetin_stepper.many_steps(transient_len)
+    if adaptive_transient:
+        max_transient_len = transient_len
+        transient_len = adaptive_blv_transient(
+            bennetin_stepper, max_transient_len, angle_tol=transient_tol, ftle_tol=ftle_tol
+        )
+        outcome = "converged" if transient_len < max_transient_len else "reached its maximum length"
+        logger.info(f"Transient {outcome} after {transient_len} steps.")
+    else:
+        bennetin_stepper.many_steps(transient_len)
     bennetin_stepper.time = 0
 
     # Initialise observations
@@ -35,4 +68,4 @@ def compute_blvs(rhs, jacobian, number_of_observations, ic, tau=0.1, transient_l
         blv_ts.append(blvs)
         trajectory_ts.append(bennetin_stepper._trajectory_state)
 
-    return trajectory_ts, blv_ts, ftble_ts
+    return trajectory_ts, blv_ts, ftble_ts, transient_len
@@ -1,11 +1,27 @@
-from .core import BennetinStepper, BennetinObserver
+from .core import BennetinStepper, BennetinObserver, MapBennetinStepper
+from .storage import make_store
+from .reducers import reduction_dataset
+from . import ginelli
+from .transients import adaptive_blv_transient, ClvTransientCheck
+from chaos_explorer.checkpoint import save_checkpoint, load_checkpoint
 
 import numpy as np
-import xarray as xr
 from pathlib import Path
-from loguru import logger
-import sys
+import logging
 import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+logger = logging.getLogger(__name__)
+
+
+def _intermediate_bytes(ndim, k, observation_steps, transient_steps):
+    "Estimate of the memory needed to hold the Q/R, trajectory and A intermediates of compute_clvs."
+    observation_bytes = (observation_steps + 1) * (ndim * k + k * k + ndim + 1)
+    transient_bytes = (transient_steps + 1) * (k * k + ndim + 1)
+    ginelli_bytes = (observation_steps + 1) * (k * k + k + 1)
+    return 8 * (observation_bytes + transient_bytes + ginelli_bytes)
 
 
 def compute_clvs(
@@ -22,115 +38,410 @@ def compute_clvs(
     clv_observation_steps=100,
     block_size=100,
     method="RK45",
+    jvp=None,
+    k=None,
+    store="netcdf",
+    output_store="netcdf",
+    time_chunk=None,
+    storage="memory",
+    memory_budget=2**30,
+    tmp_dir=None,
+    n_workers=1,
+    segment_overlap=None,
+    adaptive_transients=False,
+    transient_tol=1.0e-3,
+    ftle_tol=1.0e-2,
+    checkpoint_dir=None,
+    checkpoint_every=1000,
+    stats=None,
+    discrete=False,
+    reducers=None,
+    save_output=True,
+    output_encoding=None,
+    reductions_path=None,
 ):
-    # Logger/Folder Setup
-    logger.remove()
-    logger.add(sys.stdout, colorize=False, format="{time:YYYYMMDDHHmmss}|{level}|{message}")
-    tmp_folder = Path("tmp/")
-    tmp_folder.mkdir(parents=True, exist_ok=True)
+    """
+    k, int: number of leading CLVs/exponents to compute, all of them if None.
+    storage, string: where intermediate Q/R matrices are kept, "memory" for RAM, "mmap" for np.memmap
+        files or "disk" for a store of the kind given by store.
+    memory_budget, int: bytes the intermediates may take up with "memory" or "mmap" storage.
+        If they need more they are spilled to disk.
+    tmp_dir, str: where the per run temporary directory for intermediates is made, the system default if None.
+    store, string: "netcdf" or "zarr", how intermediates are stored on disk.
+    output_store, string: "netcdf" for a file per block in save_location,
+        or "zarr" for a single store at save_location/clvs.zarr.
+    time_chunk, int: observations per chunk for zarr stores, defaults to block_size.
+    n_workers, int: processes for the backward steps. With more than one, each observation block
+        is a segment whose CLVs are converged independently from the segment_overlap R matrices
+        that follow it, and segments are processed in parallel.
+    segment_overlap, int: number of R matrices each segment converges over, defaults to clv_transient_steps.
+    adaptive_transients, bool: stop the BLV and CLV transients once converged, blv_tranient_len and
+        clv_transient_steps are then upper limits. The BLV transient stops once BLVs from different
+        initial perturbations agree to within transient_tol radians and the running FTLEs change by less
+        than ftle_tol between checks. The CLV transient stops once A from different starting points agree
+        to within transient_tol radians. Checks are made every block_size steps.
+    checkpoint_dir, str: folder progress is checkpointed to. If a run is killed, calling compute_clvs again
+        with the same arguments carries on from the last checkpoint. Intermediates are then kept on disk
+        in this folder rather than in tmp_dir, and it can be deleted once the run has finished.
+    checkpoint_every, int: BLV transient steps between checkpoints, later phases are checkpointed every block.
+    stats, Stats: collects rhs/jacobian evaluations and the time spent integrating, in QR, observing,
+        in triangular solves and reading/writing stores. Logged at the end of the run.
+        The backward steps run by worker processes aren't included.
+    discrete, bool: rhs is a map, f(state, **parameters) -> next state, and jacobian its jacobian.
+        tau is then the number of iterates between QR steps and method is ignored.
+    reducers, list: Reducers from chaos_explorer.lyapunov.reducers, e.g. MeanVariance("FTCLE"), updated with
+        each output block as it's made. Their results are written to reductions_path.
+    save_output, bool: write the CLV/FTCLE time series, and BLV/FTBLE if save_blv/save_ftble, to save_location.
+        With False only the reducers' results are kept.
+    output_encoding, StorageEncoding: precision and compression of the CLV/BLV/FTCLE/FTBLE output,
+        e.g. StorageEncoding("int16", "zlib"). Intermediates are always kept exactly, so the
+        computation itself runs in float64 throughout.
+    reductions_path, str: netcdf file the reducers' results are written to, defaults to
+        save_location + "_reductions.nc" so save_location only holds the output blocks.
+
+    Returns a dict of the transient lengths used, "blv_tranient_len" and "clv_transient_steps".
+    """
+    # Folder Setup
     clv_folder = Path(save_location)
     clv_folder.mkdir(parents=True, exist_ok=True)
+    if reductions_path is None:
+        reductions_path = clv_folder.with_name(f"{clv_folder.name}_reductions.nc")
+    time_chunk = block_size if time_chunk is None else time_chunk
 
     # Get Bennetin Classes
-    Q_ic = np.eye(len(ic)) * 1.0e-6
-    bennetin_stepper = BennetinStepper(rhs, ic, jacobian, Q_ic, tau=tau, parameters=parameters, method=method)
+    Q_ic = np.eye(len(ic), k) * 1.0e-6
+    if discrete:
+        bennetin_stepper = MapBennetinStepper(
+            rhs, ic, jacobian, Q_ic, tau=tau, parameters=parameters, jvp=jvp, stats=stats
+        )
+    else:
+        bennetin_stepper = BennetinStepper(
+            rhs, ic, jacobian, Q_ic, tau=tau, parameters=parameters, method=method, jvp=jvp, stats=stats
+        )
+    stats = bennetin_stepper.stats
     bennetin_observer = BennetinObserver(bennetin_stepper, quiet=True)
 
-    # Step 0: Run BLV Transient
-    logger.info("Starting BLV Transient.")
-    bennetin_stepper.many_steps(blv_tranient_len)
-    bennetin_stepper.time = 0
-
-    # Step 1: Store Q and R Matrices for t1 -> t2 where we will later observe CLVS
-    logger.info("BLV Transient Done. Running Ginelli Algorithm Forward Steps.")
-    save_folder = tmp_folder / "clv_observation/"
-    save_folder.mkdir(parents=True, exist_ok=True)
-    bennetin_observer.make_observations_in_blocks(save_folder, clv_observation_steps, block_size, timer=False)
-
-    # Step 2: Store R Matrices for t2 -> t3 for CLV transient
-    bennetin_observer.store_Q = False
-    save_folder = tmp_folder / "clv_convergence/"
-    save_folder.mkdir(parents=True, exist_ok=True)
-    bennetin_observer.make_observations_in_blocks(save_folder, clv_transient_steps, block_size, timer=False)
-
-    # Step 3: CLV Convergence Steps, t3 -> t2
-    logger.info("Forward Steps Done. Running Ginelli Algorithm Backward Steps.")
-    R_file_list = list((tmp_folder / "clv_convergence/").glob("*.nc"))
-    R_file_list.sort(key=lambda path: -int(path.name.split(".")[0]))  # Sort R files in reverse order
-
-    A = np.eye(bennetin_stepper.ndim)  # Initialise random matrix to push with R^-1s
-    for file in R_file_list:
-        ds = xr.open_dataset(file)
-        for step in np.flip(ds.time.values):
-            R = ds.R.sel(time=step)
-            pushedA = np.linalg.solve(R, A)  # Push A with R^-1
-            norms = np.linalg.norm(pushedA, axis=0, ord=2)  # Prevent vector growth
-            A = pushedA / norms
-
-    # Step 4: CLV Observation Steps, t3 -> t2
-    R_file_list = list((tmp_folder / "clv_observation/").glob("*.nc"))
-    R_file_list.sort(key=lambda path: -int(path.name.split(".")[0]))  # Sort R files in reverse order
-
-    for file in R_file_list:
-        ds = xr.open_dataset(file)
-        clv_ts = []
-        ftcle_ts = []
-        blv_ts = []
-        ftble_ts = []
-        for step in np.flip(ds.time.values):
-            # Get Q and R
-            Q = ds.Q.sel(time=step)
-            R = ds.R.sel(time=step)
-
-            # Compute and store FTCLE/CLV
-            clv = np.matmul(Q.values, A)
-            reversed_ftcle = -np.log(norms) / (bennetin_stepper.tau)
-            clv_ts.append(clv)
-            ftcle_ts.append(np.flip(reversed_ftcle))
-
-            # Compute and store FTBLE/BLV
-            blv = Q.values
-            reversed_ftble = np.log(np.diag(R.values)) / (tau)
-            blv_ts.append(blv)
-            ftble_ts.append(np.flip(reversed_ftble))
-
-            # Push A with R^-1
-            pushedA = np.linalg.solve(R, A)
-            norms = np.linalg.norm(pushedA, axis=0, ord=2)  # Prevent vector growth
-            A = pushedA / norms
-
-        # Save CLV/FTCLE files
-        dic = {}
-        dic['trajectory'] = ds['trajectory']
-        dic["CLV"] = xr.DataArray(
-            np.flip(clv_ts),
-            dims=["time", "le_index", "component"],
-            name="CLV",
-            coords={"time": ds.time, "le_index": ds.le_index, "component": ds.component},
+    # Checkpoints, intermediates have to outlive the process so are kept next to the checkpoint
+    settings = {
+        "ndim": len(ic),
+        "k": bennetin_stepper.k,
+        "tau": tau,
+        "blv_tranient_len": blv_tranient_len,
+        "clv_transient_steps": clv_transient_steps,
+        "clv_observation_steps": clv_observation_steps,
+        "block_size": block_size,
+        "adaptive_transients": adaptive_transients,
+    }
+    checkpoint_path = None
+    checkpoint = {}
+    if checkpoint_dir is not None:
+        checkpoint_path = Path(checkpoint_dir) / "checkpoint.pkl"
+        checkpoint = load_checkpoint(checkpoint_path) or {}
+        if checkpoint and checkpoint["settings"] != settings:
+            raise ValueError(f"Checkpoint in {checkpoint_dir} is from a run with different settings.")
+        if checkpoint.get("phase") == "done":
+            logger.info(f"Checkpoint in {checkpoint_dir} is of a finished run, results are at {clv_folder}.")
+            return checkpoint["transients"]
+        tmp_folder = Path(checkpoint_dir) / "intermediates"
+        tmp_folder.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp_folder = Path(tempfile.mkdtemp(prefix="compute_clvs_", dir=tmp_dir))
+    # Scratch intermediates are removed however the run ends, checkpointed ones are kept to resume from
+    try:
+        phase = checkpoint.get("phase", "blv_transient")
+        steps_done = checkpoint.get("steps_done", 0)
+        transients = checkpoint.get("transients", {})
+        if checkpoint and phase in ["blv_transient", "observation", "convergence"]:
+            bennetin_observer.restore(checkpoint["observer"])
+            logger.info(f"Resuming from checkpoint in {checkpoint_dir}, {phase} phase, {steps_done} steps done.")
+
+        def save(phase, steps_done=0, **state):
+            if checkpoint_path is not None:
+                state.update(phase=phase, steps_done=steps_done, transients=transients, settings=settings)
+                if phase in ["blv_transient", "observation", "convergence"]:
+                    state["observer"] = bennetin_observer.checkpoint()
+                save_checkpoint(checkpoint_path, state)
+
+        # Intermediate storage, spilled to disk if it won't fit in the memory budget
+        required_bytes = _intermediate_bytes(
+            bennetin_stepper.ndim, bennetin_stepper.k, clv_observation_steps, clv_transient_steps
+        )
+        if storage in ["memory", "mmap"] and required_bytes > memory_budget:
+            logger.info(f"Intermediates need {required_bytes / 1e9:.2f}GB, over the memory budget. Spilling to disk.")
+            storage = "disk"
+        if storage in ["memory", "mmap"] and checkpoint_path is not None:
+            storage = "disk"  # Intermediates have to be reopened on resume
+        if storage == "memory" and n_workers > 1:
+            storage = "mmap"  # Worker processes need to share the intermediates
+        intermediate_kind = store if storage == "disk" else storage
+        observation_store = make_store(
+            intermediate_kind, tmp_folder / "clv_observation", time_chunk=time_chunk, capacity=clv_observation_steps + 1
         )
-        dic["FTCLE"] = xr.DataArray(
-            np.flip(ftcle_ts),
-            dims=["time", "le_index"],
-            name="FTCLE",
-            coords={"time": ds.time, "le_index": ds.le_index},
+        convergence_store = make_store(
+            intermediate_kind, tmp_folder / "clv_convergence", time_chunk=time_chunk, capacity=clv_transient_steps + 1
         )
-        if save_blv:
-            dic["BLV"] = xr.DataArray(
-                np.flip(blv_ts),
-                dims=["time", "le_index", "component"],
-                name="BLV",
-                coords={"time": ds.time, "le_index": ds.le_index, "component": ds.component},
+
+        # Step 0: Run BLV Transient
+        if phase == "blv_transient":
+            logger.info("Starting BLV Transient.")
+            if adaptive_transients:
+                # Not checkpointed part way through, the probe vectors aren't part of the stepper's state
+                max_transient_len = blv_tranient_len
+                blv_tranient_len = adaptive_blv_transient(
+                    bennetin_stepper,
+                    max_transient_len,
+                    angle_tol=transient_tol,
+                    ftle_tol=ftle_tol,
+                    check_every=block_size,
+                )
+                outcome = "converged" if blv_tranient_len < max_transient_len else "reached its maximum length"
+                logger.info(f"BLV Transient {outcome} after {blv_tranient_len} steps.")
+            else:
+                while steps_done < blv_tranient_len:
+                    steps = min(checkpoint_every, blv_tranient_len - steps_done)
+                    bennetin_stepper.many_steps(steps)
+                    steps_done += steps
+                    save("blv_transient", steps_done)
+            bennetin_stepper.time = 0
+            transients["blv_tranient_len"] = blv_tranient_len
+            phase, steps_done = "observation", 0
+            save(phase)
+
+        # Step 1: Store Q and R Matrices for t1 -> t2 where we will later observe CLVS
+        if phase == "observation":
+            logger.info("BLV Transient Done. Running Ginelli Algorithm Forward Steps.")
+            observation_store.truncate(checkpoint.get("blocks", 0) if checkpoint.get("phase") == phase else 0)
+            _observe_blocks(
+                bennetin_observer,
+                observation_store,
+                clv_observation_steps,
+                block_size,
+                steps_done,
+                on_block=lambda steps_done: save("observation", steps_done, blocks=len(observation_store)),
             )
-        if save_ftble:
-            dic["FTBLE"] = xr.DataArray(
-                np.flip(ftble_ts),
-                dims=["time", "le_index"],
-                name="FTBLE",
-                coords={"time": ds.time, "le_index": ds.le_index},
+            bennetin_observer.store_Q = False
+            phase, steps_done = "convergence", 0
+            save(phase)
+
+        # Step 2: Store R Matrices for t2 -> t3 for CLV transient
+        if phase == "convergence":
+            convergence_store.truncate(checkpoint.get("blocks", 0) if checkpoint.get("phase") == phase else 0)
+            # Add blocks of R until A has converged at t2, each block is read once by the check
+            transient_check = ClvTransientCheck(bennetin_stepper.k, angle_tol=transient_tol)
+
+            def converged():
+                return transient_check(convergence_store)
+
+            max_transient_steps = clv_transient_steps
+            clv_transient_steps = _observe_blocks(
+                bennetin_observer,
+                convergence_store,
+                max_transient_steps,
+                block_size,
+                steps_done,
+                on_block=lambda steps_done: save("convergence", steps_done, blocks=len(convergence_store)),
+                stop=converged if adaptive_transients else None,
             )
-        ds = xr.Dataset(dic)
-        ds.to_netcdf(clv_folder / file.name)
-    logger.info(f"Results saved at {clv_folder}.")
+            if adaptive_transients:
+                outcome = "converged" if clv_transient_steps < max_transient_steps else "reached its maximum length"
+                logger.info(f"CLV Transient {outcome} after {clv_transient_steps} steps.")
+            transients["clv_transient_steps"] = clv_transient_steps
+            phase = "backward"
+            save(phase)
+        clv_transient_steps = transients["clv_transient_steps"]
+
+        # Output stores
+        reducers = [] if reducers is None else reducers
+        overwrite = phase != "output"
+        if not save_output:
+            clv_store = None
+        elif output_store == "zarr":
+            clv_store = make_store(
+                "zarr",
+                clv_folder / "clvs",
+                time_chunk=time_chunk,
+                overwrite=overwrite,
+                storage_encoding=output_encoding,
+            )
+        else:
+            clv_store = make_store(output_store, clv_folder, overwrite=overwrite, storage_encoding=output_encoding)
+
+        if n_workers > 1:
+            # Steps 3-5 in parallel segments, netcdf output is written by the workers
+            logger.info(f"Forward Steps Done. Running Ginelli Algorithm Backward Steps on {n_workers} processes.")
+            if clv_store is not None:
+                clv_store.truncate(0)
+            overlap = clv_transient_steps if segment_overlap is None else segment_overlap
+            worker_store = clv_store if output_store == "netcdf" else None
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                outputs = pool.map(
+                    _backward_segment,
+                    repeat(observation_store),
+                    repeat(convergence_store),
+                    range(len(observation_store)),
+                    repeat(overlap),
+                    repeat(tau),
+                    repeat(save_blv),
+                    repeat(save_ftble),
+                    repeat(worker_store),
+                    repeat(len(reducers) > 0),
+                )
+                # Outputs come back in time order
+                for output in outputs:
+                    _reduce(reducers, output, stats)
+                    if clv_store is not None and worker_store is None:
+                        with stats.timer("io"):
+                            clv_store.append(output)
+            _save_reductions(reducers, reductions_path)
+            logger.info(f"Results saved at {clv_folder}.")
+            if stats.enabled:
+                logger.info(f"Run stats:\n{stats.summary()}")
+            shutil.rmtree(tmp_folder)
+            save("done")
+            return transients
+
+        ginelli_store = make_store(
+            intermediate_kind, tmp_folder / "clv_ginelli", time_chunk=time_chunk, capacity=clv_observation_steps + 1
+        )
+        if phase == "backward":
+            logger.info("Forward Steps Done. Running Ginelli Algorithm Backward Steps.")
+            if checkpoint.get("phase") == phase and "A" in checkpoint:
+                A, norms = checkpoint["A"], checkpoint["norms"]
+            else:
+                # Step 3: CLV Convergence Steps, t3 -> t2
+                A, norms = ginelli.initial_A(bennetin_stepper.k)  # Initialise matrix to push with R^-1s
+                for index in reversed(range(len(convergence_store))):
+                    with stats.timer("io"):
+                        block = convergence_store.read(index)
+                    with stats.timer("triangular_solve"):
+                        A, norms = ginelli.converge(block["R"], A, norms)
+            ginelli_store.truncate(checkpoint.get("blocks", 0) if "A" in checkpoint else 0)
+
+            # Step 4: CLV Observation Steps, t2 -> t1. Store A and FTCLEs, blocks are appended last block first.
+            for index in reversed(range(len(observation_store) - len(ginelli_store))):
+                with stats.timer("io"):
+                    block = observation_store.read(index)
+                with stats.timer("triangular_solve"):
+                    A_ts, ftcle_ts, A, norms = ginelli.observe(block["R"], A, norms, tau)
+                with stats.timer("io"):
+                    ginelli_store.append({"time": block["time"], "A": A_ts, "FTCLE": ftcle_ts})
+                save("backward", A=A, norms=norms, blocks=len(ginelli_store))
+            phase = "output"
+            save(phase, blocks=0)
+
+        # Step 5: Compute CLVs from Q and A, t1 -> t2, so output is written and reduced in time order
+        blocks_done = checkpoint.get("blocks", 0) if checkpoint.get("phase") == phase else 0
+        if clv_store is not None:
+            clv_store.truncate(blocks_done)
+        if blocks_done > 0:
+            for reducer, reducer_checkpoint in zip(reducers, checkpoint["reducers"]):
+                reducer.restore(reducer_checkpoint)
+        for index in range(blocks_done, len(observation_store)):
+            with stats.timer("io"):
+                block = observation_store.read(index)
+                ginelli_block = ginelli_store.read(len(ginelli_store) - 1 - index)
+            output = _clv_output(block, ginelli_block["A"], ginelli_block["FTCLE"], tau, save_blv, save_ftble)
+            _reduce(reducers, output, stats)
+            if clv_store is not None:
+                with stats.timer("io"):
+                    clv_store.append(output)
+            save("output", blocks=index + 1, reducers=[reducer.checkpoint() for reducer in reducers])
+        _save_reductions(reducers, reductions_path)
+        logger.info(f"Results saved at {clv_folder}.")
+        if stats.enabled:
+            logger.info(f"Run stats:\n{stats.summary()}")
+
+        # Clean Up
+        shutil.rmtree(tmp_folder)
+        save("done")
+        return transients
+    finally:
+        if checkpoint_dir is None:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+
+
+def _observe_blocks(observer, store, number, block_size, steps_done=0, on_block=None, stop=None):
+    """
+    Makes number observations with a BennetinObserver a block at a time, carrying on from steps_done.
+    on_block(steps_done) is called after each block is written to store, e.g. to checkpoint.
+    stop() is checked after each block and ends the observations early if True.
+    Returns the number of steps observed.
+    """
+    while steps_done < number:
+        steps = min(block_size, number - steps_done)
+        observer.make_observations_in_blocks(
+            None, steps, block_size, timer=False, store=store, initial_observation=steps_done == 0
+        )
+        steps_done += steps
+        if on_block is not None:
+            on_block(steps_done)
+        if stop is not None and stop():
+            break
+    return steps_done
+
+
+def _reduce(reducers, output, stats):
+    with stats.timer("reduction"):
+        for reducer in reducers:
+            reducer.update(output)
+
+
+def _save_reductions(reducers, path):
+    if reducers:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        reduction_dataset(reducers).to_netcdf(path)
+
+
+def _clv_output(block, A_ts, ftcle_ts, tau, save_blv, save_ftble):
+    "Output block of CLVs/FTCLEs, and optionally BLVs/FTBLEs, from a block of observations and its A matrices."
+    output = {"time": block["time"], "trajectory": block["trajectory"]}
+    output["CLV"] = np.matmul(block["Q"], A_ts)
+    output["FTCLE"] = ftcle_ts
+    if save_blv:
+        output["BLV"] = block["Q"]
+    if save_ftble:
+        output["FTBLE"] = np.log(np.diagonal(block["R"], axis1=1, axis2=2)) / tau
+    return output
+
+
+def _backward_segment(
+    observation_store,
+    convergence_store,
+    index,
+    overlap,
+    tau,
+    save_blv,
+    save_ftble,
+    output_store=None,
+    return_output=False,
+):
+    """
+    Backward steps for observation block number index on its own.
+    A is converged over the overlap R matrices following the block, then pushed through the block.
+    The output block is written to output_store at index if given, and returned if there's no
+    output_store or return_output, e.g. to be reduced.
+    """
+    # R matrices following the segment, from later observation blocks then the convergence blocks
+    following_blocks = [(observation_store, i) for i in range(index + 1, len(observation_store))]
+    following_blocks += [(convergence_store, i) for i in range(len(convergence_store))]
+    window = []
+    window_length = 0
+    for store, i in following_blocks:
+        if window_length >= overlap:
+            break
+        R_ts = store.read(i)["R"]
+        window.append(R_ts)
+        window_length += len(R_ts)
+
+    block = observation_store.read(index)
+    A, norms = ginelli.initial_A(block["R"].shape[-1])
+    if window:
+        A, norms = ginelli.converge(np.concatenate(window)[:overlap], A, norms)
+    A_ts, ftcle_ts, A, norms = ginelli.observe(block["R"], A, norms, tau)
 
-    # Clean Up
-    shutil.rmtree(tmp_folder)
+    output = _clv_output(block, A_ts, ftcle_ts, tau, save_blv, save_ftble)
+    if output_store is None:
+        return output
+    output_store.write(index, output)
+    if return_output:
+        return output
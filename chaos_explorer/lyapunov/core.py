@@ -1,161 +1,270 @@
+import logging
+
 import numpy as np
-import xarray as xr
-from tqdm import tqdm
-from loguru import logger
-import sys
 
+from chaos_explorer.log import progress
+from chaos_explorer.map_iterator import TangentMapIterator
 from chaos_explorer.tangent_integrator import TangentIntegrator
+from chaos_explorer.observers.buffer import ObservationBuffer
+from chaos_explorer.lyapunov.storage import NetcdfBlockStore, StorageEncoding, block_to_dataset
+
+logger = logging.getLogger(__name__)
 
 
 def posQR(M):
     """Returns QR decomposition of a matrix with positive diagonals on R.
-    Parameter, M: Array that is being decomposed
+    Parameter, M: Array that is being decomposed, (n, k) or a stack of matrices (..., n, k)
     """
     Q, R = np.linalg.qr(M)  # Performing QR decomposition
-    signs = np.diag(np.sign(np.diagonal(R)))  # Matrix with signs of R diagonal on the diagonal
-    Q, R = np.dot(Q, signs), np.dot(signs, R)  # Ensuring R Diagonal is positive
+    signs = np.sign(np.diagonal(R, axis1=-2, axis2=-1))  # Signs of R diagonal
+    Q, R = Q * signs[..., np.newaxis, :], R * signs[..., :, np.newaxis]  # Ensuring R Diagonal is positive
     return Q, R
 
 
-class BennetinStepper(TangentIntegrator):
-    "Performs the Bennetin steps."
-
-    def __init__(self, rhs, ic, jacobian, Q_ic, tau=0.01, parameters={}, method="RK45"):
-        super().__init__(rhs, ic, jacobian, perturbation_ic=Q_ic[0], parameters=parameters, method=method)
+class BennetinSteps:
+    """
+    Bennetin steps for a tangent integrator, shared by BennetinStepper and MapBennetinStepper.
+    The perturbation matrix is integrated for tau then re-orthonormalised by a QR decomposition.
+    """
 
-        self.Q = Q_ic
-        self.R = np.zeros(Q_ic.shape)
+    def _start_steps(self, Q_ic, tau):
+        self.Q = Q_ic  # (ndim, k), k <= ndim for the leading k exponents/vectors only
+        self.k = Q_ic.shape[-1]
+        self.R = np.zeros(np.shape(Q_ic)[:-2] + (self.k, self.k))
         self.tau = tau
 
     def step(self):
-        # Trajectory state prior to pusing matrix forward
-        time = self.time
-        trajectory_state = self._trajectory_state
-        P = np.zeros(self.Q.shape)  # dummy stretched matrix
-
-        # Integrate perturbation matrix forward
-        for i, column in enumerate(self.Q.T):
-            self.time = time
-            self._trajectory_state = trajectory_state
-            self._perturbation_state = column
-            self.run(self.tau)  # use underlying tangent integrator
-            P.T[i] = self._perturbation_state
+        # Integrate whole perturbation matrix forward alongside the trajectory
+        self._perturbation_state = self.Q
+        self.run(self.tau)  # use underlying tangent integrator
 
         # Updata Q and R
-        self.Q, self.R = posQR(P)
+        with self.stats.timer("qr"):
+            self.Q, self.R = posQR(self._perturbation_state)
+        self.stats.count("bennetin_steps")
         return
 
     def many_steps(self, n):
         for i in range(n):
             self.step()
 
+    def checkpoint(self):
+        "State needed to carry on stepping, as a dict for save_checkpoint."
+        return {
+            "time": self.time,
+            "trajectory": np.copy(self._trajectory_state),
+            "Q": np.copy(self.Q),
+            "R": np.copy(self.R),
+        }
+
+    def restore(self, checkpoint):
+        "Carries on from a checkpoint made by checkpoint."
+        self.time = checkpoint["time"]
+        self._trajectory_state = np.copy(checkpoint["trajectory"])
+        self.Q = np.copy(checkpoint["Q"])
+        self.R = np.copy(checkpoint["R"])
+        self._perturbation_state = self.Q
+
+
+class BennetinStepper(BennetinSteps, TangentIntegrator):
+    "Performs the Bennetin steps."
+
+    def __init__(
+        self,
+        rhs,
+        ic,
+        jacobian,
+        Q_ic,
+        tau=0.01,
+        parameters={},
+        method="RK45",
+        persistent=False,
+        jvp=None,
+        stats=None,
+    ):
+        """stats, Stats: collects evaluations and time spent integrating and in QR, nothing if None."""
+        super().__init__(
+            rhs,
+            ic,
+            jacobian,
+            perturbation_ic=Q_ic,
+            parameters=parameters,
+            method=method,
+            persistent=persistent,
+            jvp=jvp,
+            stats=stats,
+        )
+        self._start_steps(Q_ic, tau)
 
-logger.remove()
-logger.add(sys.stdout, colorize=False, format="{time:YYYYMMDDHHmmss}|{level}|{message}")
+
+class MapBennetinStepper(BennetinSteps, TangentMapIterator):
+    """
+    Performs the Bennetin steps for a discrete map, tau is the number of iterates between QR steps.
+    A whole ensemble is stepped at once given ics (n_members, ndim), stacked jacobians and Q_ic
+    (n_members, ndim, k), with one batched QR per step.
+    """
+
+    def __init__(self, f, ic, jacobian, Q_ic, tau=1, parameters={}, jvp=None, stats=None):
+        """stats, Stats: collects evaluations and time spent iterating and in QR, nothing if None."""
+        super().__init__(f, ic, jacobian, perturbation_ic=Q_ic, parameters=parameters, jvp=jvp, stats=stats)
+        self._start_steps(Q_ic, tau)
 
 
 class BennetinObserver:
     def __init__(self, bennetin_stepper, quiet=False):
         self.bennetin_stepper = bennetin_stepper
-        self._time_obs = []
         self.dump_count = 0
-        self._Q_observations = []
-        self._R_observations = []
-        self._trajectory_observations = []
+        self.wipe()
         self.store_Q = True
         self.store_R = True
         self.quiet = quiet
 
     def make_observations(self, number, timer=True):
+        self._reserve(number + 1)
         self.look(self.bennetin_stepper)  # Initial observation
-        for x in tqdm(range(number), disable=not timer):
+        for x in progress(range(number), disable=not timer):
             self.bennetin_stepper.step()
             self.look(self.bennetin_stepper)
         return
 
-    def make_observations_in_blocks(self, save_folder, number_of_obs, block_size, timer=True):
+    def make_observations_in_blocks(
+        self,
+        save_folder,
+        number_of_obs,
+        block_size,
+        timer=True,
+        store=None,
+        initial_observation=True,
+        storage_encoding=None,
+    ):
+        """
+        Observes in blocks of block_size, each block is appended to store and wiped.
+        save_folder, Path: folder to write a netcdf file per block to when no store is given.
+        store, BlockStore: where blocks are written, e.g. a single ZarrBlockStore.
+        initial_observation, bool: observe before the first step, False to carry on from a previous call.
+        storage_encoding, StorageEncoding: how the netcdf files in save_folder are written, not used with a store.
+        """
+        if store is None:
+            store = NetcdfBlockStore(save_folder, storage_encoding=storage_encoding)
         number_of_blocks = int(number_of_obs / block_size)
         remainder = int(number_of_obs % block_size)
-        self.look(self.bennetin_stepper)  # Initial observation
-        for block in tqdm(range(number_of_blocks), disable=not timer):
+        self._reserve(block_size + 1)
+        if initial_observation:
+            self.look(self.bennetin_stepper)
+        for block in progress(range(number_of_blocks), disable=not timer):
             for i in range(block_size):
                 self.bennetin_stepper.step()
                 self.look(self.bennetin_stepper)
-            self.dump(save_folder / f"{block}.nc")
+            self.dump_to_store(store)
+            self._reserve(block_size)
 
         if remainder != 0:
             for i in range(remainder):
                 self.bennetin_stepper.step()
                 self.look(self.bennetin_stepper)
-            self.dump(save_folder / f"{block + 1}.nc")
+            self.dump_to_store(store)
         return
 
     def look(self, bennetin_stepper):
-        self._time_obs.append(bennetin_stepper.time)
-        if self.store_Q:
-            self._Q_observations.append(bennetin_stepper.Q)
-        if self.store_R:
-            self._R_observations.append(bennetin_stepper.R)
-        self._trajectory_observations.append(bennetin_stepper._trajectory_state)
+        with bennetin_stepper.stats.timer("observation"):
+            self._time_obs.append(bennetin_stepper.time)
+            if self.store_Q:
+                self._Q_observations.append(bennetin_stepper.Q)
+            if self.store_R:
+                self._R_observations.append(bennetin_stepper.R)
+            self._trajectory_observations.append(bennetin_stepper._trajectory_state)
 
     @property
     def observations(self):
         if len(self._R_observations) == 0:
-            print("I have no observations! :(")
+            logger.warning("I have no observations! :(")
             return
 
-        # Set up dimensions
-        le_index = np.arange(1, 1 + self.bennetin_stepper.ndim)
-        component = np.arange(1, 1 + self.bennetin_stepper.ndim)
-        time = self._time_obs
+        return block_to_dataset(self.block)
 
-        # Package Observations
-        dic = {}
+    @property
+    def block(self):
+        "Observations as a dict of arrays, as written to a BlockStore."
+        block = {"time": self._time_obs.array}
         if self.store_Q:
-            dic["Q"] = xr.DataArray(
-                self._Q_observations,
-                dims=["time", "le_index", "component"],
-                name="Q",
-                coords={"time": time, "le_index": le_index, "component": component},
-            )
+            block["Q"] = self._Q_observations.array
         if self.store_R:
-            dic["R"] = xr.DataArray(
-                self._R_observations,
-                dims=["time", "le_index", "component"],
-                name="R",
-                coords={"time": time, "le_index": le_index, "component": component},
-            )
-        dic["trajectory"] = xr.DataArray(
-            self._trajectory_observations,
-            dims=["time", "component"],
-            name="trajectory",
-            coords={"time": time, "component": component},
-        )
-        return xr.Dataset(dic)
+            block["R"] = self._R_observations.array
+        block["trajectory"] = self._trajectory_observations.array
+        return block
+
+    def _reserve(self, number):
+        "Makes space for another number of observations in the buffers."
+        for buffer in [self._time_obs, self._Q_observations, self._R_observations, self._trajectory_observations]:
+            buffer.reserve(len(buffer) + number)
 
     def wipe(self):
-        """Erases observations"""
-        self._time_obs = []
-        self._R_observations = []
-        self._Q_observations = []
-        self._trajectory_observations = []
+        """Erases observations. New buffers so datasets already handed out are left untouched."""
+        self._time_obs = ObservationBuffer()
+        self._R_observations = ObservationBuffer()
+        self._Q_observations = ObservationBuffer()
+        self._trajectory_observations = ObservationBuffer()
+
+    def checkpoint(self):
+        "Stepper state, block counter and observations not yet dumped, as a dict for save_checkpoint."
+        return {
+            "stepper": self.bennetin_stepper.checkpoint(),
+            "dump_count": self.dump_count,
+            "store_Q": self.store_Q,
+            "store_R": self.store_R,
+            "block": self.block,
+        }
+
+    def restore(self, checkpoint):
+        "Carries on from a checkpoint made by checkpoint."
+        self.bennetin_stepper.restore(checkpoint["stepper"])
+        self.dump_count = checkpoint["dump_count"]
+        self.store_Q = checkpoint["store_Q"]
+        self.store_R = checkpoint["store_R"]
+        self.wipe()
+        buffers = {
+            "time": self._time_obs,
+            "Q": self._Q_observations,
+            "R": self._R_observations,
+            "trajectory": self._trajectory_observations,
+        }
+        for name, values in checkpoint["block"].items():
+            buffers[name].extend(values)
 
-    def dump(self, save_name):
+    def dump(self, save_name, storage_encoding=None):
         """Saves observations to netcdf and wipes.
-        cupboard: Directory where to write netcdf.
-        name: file name"""
+        save_name: file name
+        storage_encoding, StorageEncoding: how the file is written, float64 and uncompressed if None."""
 
         if len(self._R_observations) == 0:
-            print("I have no observations! :(")
+            logger.warning("I have no observations! :(")
             return
 
-        self.observations.to_netcdf(save_name)
+        storage_encoding = StorageEncoding() if storage_encoding is None else storage_encoding
+        with self.bennetin_stepper.stats.timer("io"):
+            ds = block_to_dataset(storage_encoding.encode_block(self.block))
+            ds.to_netcdf(save_name, encoding=storage_encoding.encoding(ds, "netcdf"))
         if not self.quiet:
             logger.info(f"Observations written to {save_name}. Erasing personal log.\n")
         self.wipe()
         self.dump_count += 1
         return
 
+    def dump_to_store(self, store):
+        """Appends observations to a BlockStore as a block and wipes."""
+
+        if len(self._R_observations) == 0:
+            logger.warning("I have no observations! :(")
+            return
+
+        with self.bennetin_stepper.stats.timer("io"):
+            store.append(self.block)
+        if not self.quiet:
+            logger.info(f"Observations written to {store}. Erasing personal log.\n")
+        self.wipe()
+        self.dump_count += 1
+        return
+
 
 # def clv_convergence_step(R, A):
 #     newA = np.linalg.solve(R, A)  # Push A with R^-1
@@ -0,0 +1,172 @@
+from .core import posQR
+from chaos_explorer.integrator import EnsembleIntegrator
+from chaos_explorer.models.registry import get_batched
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+
+def _unbatched(function):
+    """
+    Turns a function of a single state into one of stacked states, the batched version registered
+    for it if there is one, e.g. l63_batched for l63, otherwise by looping over members.
+    """
+    registered = get_batched(function)
+    if registered is not None:
+        return registered
+
+    def batched_function(states, *args, **parameters):
+        return np.stack([function(state, *(arg[i] for arg in args), **parameters) for i, state in enumerate(states)])
+
+    return batched_function
+
+
+class EnsembleBennetinStepper:
+    """
+    Performs Bennetin steps for an ensemble of M tangent systems at once.
+    All members are integrated together by an EnsembleIntegrator and re-orthonormalised
+    with one batched posQR of the stacked (M, ndim, k) perturbation matrices.
+    """
+
+    def __init__(
+        self,
+        rhs,
+        ics,
+        jacobian,
+        Q_ic,
+        tau=0.01,
+        parameters={},
+        method="RK45",
+        dt=0.01,
+        jvp=None,
+        batched=True,
+    ):
+        """
+        rhs, function: rhs of ode for stacked states (M, ndim).
+        ics, np.array: initial conditions, shape (M, ndim).
+        jacobian, function: jacobians for stacked states, shape (M, ndim, ndim).
+        Q_ic, np.array: initial perturbation matrix (ndim, k), or one per member (M, ndim, k).
+        jvp, function: jvp(states, perturbations) for stacked states, used instead of the jacobian.
+        batched, bool: False if rhs, jacobian and jvp act on single states. Their registered batched versions
+            are then used, e.g. l63_batched and l63_jacobian_batched, or members are looped over if there are none.
+        method, dt: passed to EnsembleIntegrator, "RK4" for fixed step integration.
+        """
+        if not batched:
+            rhs = _unbatched(rhs)
+            jacobian = None if jacobian is None else _unbatched(jacobian)
+            jvp = None if jvp is None else _unbatched(jvp)
+        self.rhs = rhs
+        self.jacobian = jacobian
+        self.jvp = jvp
+        self.parameters = parameters
+        self.n_members, self.ndim = np.shape(ics)
+        self._trajectory_state = np.asarray(ics, dtype=float)
+        self.Q = np.broadcast_to(Q_ic, (self.n_members,) + np.shape(Q_ic)[-2:]).copy()
+        self.k = self.Q.shape[-1]
+        self.R = np.zeros((self.n_members, self.k, self.k))
+        self.tau = tau
+        self.time = 0
+        self.integrator = EnsembleIntegrator(self._tlm_rhs, self._augmented_state, method=method, dt=dt)
+
+    @property
+    def _augmented_state(self):
+        "Trajectory and flattened perturbation matrix of each member, shape (M, ndim + ndim * k)."
+        return np.concatenate([self._trajectory_state, self.Q.reshape(self.n_members, -1)], axis=1)
+
+    def _tlm_rhs(self, states):
+        trajectories = states[:, : self.ndim]
+        perturbations = states[:, self.ndim :].reshape(self.n_members, self.ndim, self.k)
+        trajectory_rhs = self.rhs(trajectories, **self.parameters)
+        if self.jvp is not None:
+            tangent_rhs = self.jvp(trajectories, perturbations, **self.parameters)
+        else:
+            tangent_rhs = np.matmul(self.jacobian(trajectories, **self.parameters), perturbations)
+        return np.concatenate([trajectory_rhs, tangent_rhs.reshape(self.n_members, -1)], axis=1)
+
+    def step(self):
+        # Integrate every member's perturbation matrix forward alongside its trajectory
+        self.integrator.state = self._augmented_state
+        self.integrator.time = self.time
+        self.integrator.run(self.tau)
+        self._trajectory_state = self.integrator.state[:, : self.ndim]
+        P = self.integrator.state[:, self.ndim :].reshape(self.n_members, self.ndim, self.k)
+        self.time = self.integrator.time
+
+        # Update Q and R for all members at once
+        self.Q, self.R = posQR(P)
+        return
+
+    def many_steps(self, n):
+        for i in range(n):
+            self.step()
+
+
+def _ensemble_exponents(
+    rhs, jacobian, ics, tau, transient_len, number_of_steps, parameters, method, dt, jvp, k, batched
+):
+    "Time averaged exponents of every member, shape (M, k)."
+    Q_ic = np.eye(np.shape(ics)[1], k) * 1.0e-6
+    stepper = EnsembleBennetinStepper(
+        rhs, ics, jacobian, Q_ic, tau=tau, parameters=parameters, method=method, dt=dt, jvp=jvp, batched=batched
+    )
+    stepper.many_steps(transient_len)
+
+    log_stretching = np.zeros((stepper.n_members, stepper.k))
+    for step in range(number_of_steps):
+        stepper.step()
+        log_stretching += np.log(np.diagonal(stepper.R, axis1=1, axis2=2))
+    return log_stretching / (number_of_steps * tau)
+
+
+def compute_ensemble_spectrum(
+    rhs,
+    jacobian,
+    ics,
+    number_of_steps=1000,
+    tau=0.1,
+    transient_len=1000,
+    parameters={},
+    method="RK45",
+    dt=0.01,
+    jvp=None,
+    k=None,
+    batched=True,
+    n_workers=1,
+    confidence=0.95,
+):
+    """
+    Lyapunov spectrum with error bars from an ensemble of initial conditions.
+
+    ics, np.array: initial conditions, shape (M, ndim).
+    number_of_steps, int: Bennetin steps exponents are averaged over, after transient_len steps.
+    k, int: number of leading exponents to compute, all of them if None.
+    n_workers, int: processes the ensemble is split over.
+    confidence, float: level of the confidence intervals on the mean spectrum.
+    Other arguments as for EnsembleBennetinStepper.
+
+    Returns a dict with the per member "exponents" (M, k), their "mean" and the
+    "lower" and "upper" bounds of the confidence interval on the mean.
+    """
+    arguments = (tau, transient_len, number_of_steps, parameters, method, dt, jvp, k, batched)
+    if n_workers > 1:
+        chunks = np.array_split(ics, min(n_workers, len(ics)))
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = pool.map(
+                _ensemble_exponents, repeat(rhs), repeat(jacobian), chunks, *(repeat(arg) for arg in arguments)
+            )
+            exponents = np.concatenate(list(results))
+    else:
+        exponents = _ensemble_exponents(rhs, jacobian, ics, *arguments)
+
+    # Student's t confidence interval on the mean over members
+    n_members = len(exponents)
+    mean = exponents.mean(axis=0)
+    if n_members > 1:
+        from scipy import stats
+
+        standard_error = exponents.std(axis=0, ddof=1) / np.sqrt(n_members)
+        half_width = stats.t.ppf(0.5 * (1 + confidence), n_members - 1) * standard_error
+    else:
+        half_width = np.full_like(mean, np.nan)
+    return {"exponents": exponents, "mean": mean, "lower": mean - half_width, "upper": mean + half_width}
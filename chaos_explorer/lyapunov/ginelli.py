@@ -0,0 +1,103 @@
+"""
+Backward steps of the Ginelli algorithm on contiguous arrays of R matrices.
+
+A is pushed backwards in time with R^-1 and its columns normalised at every step.
+R and A are upper triangular, so R^-1 A is found by back substitution. With numba the
+loop over a whole block of R matrices runs in compiled code, otherwise each step uses
+scipy's triangular solver.
+"""
+import numpy as np
+from scipy.linalg import solve_triangular
+
+from chaos_explorer.jit import njit, NUMBA_AVAILABLE
+
+if NUMBA_AVAILABLE:
+
+    @njit
+    def _push(R, A):
+        "R^-1 A by back substitution for upper triangular R and A, with normalised columns."
+        k = A.shape[0]
+        pushedA = np.zeros((k, k))
+        norms = np.empty(k)
+        for j in range(k):
+            for i in range(j, -1, -1):
+                total = A[i, j]
+                for m in range(i + 1, j + 1):
+                    total -= R[i, m] * pushedA[m, j]
+                pushedA[i, j] = total / R[i, i]
+            norms[j] = np.sqrt(np.sum(pushedA[: j + 1, j] ** 2))
+            pushedA[: j + 1, j] /= norms[j]
+        return pushedA, norms
+
+else:
+
+    def _push(R, A):
+        "R^-1 A for upper triangular R, with normalised columns."
+        pushedA = solve_triangular(R, A, check_finite=False)
+        norms = np.linalg.norm(pushedA, axis=0, ord=2)  # Prevent vector growth
+        return pushedA / norms, norms
+
+
+@njit
+def _converge(R_ts, A, norms):
+    for t in range(R_ts.shape[0] - 1, -1, -1):
+        A, norms = _push(R_ts[t], A)
+    return A, norms
+
+
+@njit
+def _converge_with_growth(R_ts, A):
+    log_growth = np.zeros(A.shape[1])
+    for t in range(R_ts.shape[0] - 1, -1, -1):
+        A, norms = _push(R_ts[t], A)
+        log_growth += np.log(norms)
+    return A, log_growth
+
+
+@njit
+def _observe(R_ts, A, norms):
+    A_ts = np.empty((R_ts.shape[0],) + A.shape)
+    norms_ts = np.empty((R_ts.shape[0],) + norms.shape)
+    for t in range(R_ts.shape[0] - 1, -1, -1):
+        A_ts[t] = A
+        norms_ts[t] = norms
+        A, norms = _push(R_ts[t], A)
+    return A_ts, norms_ts, A, norms
+
+
+def initial_A(k):
+    "Starting point of the backward steps, A and the norms of its columns."
+    return np.eye(k), np.ones(k)
+
+
+def converge(R_ts, A, norms):
+    """
+    Pushes A backwards through a block of R matrices without recording anything, e.g. for the CLV transient.
+    R_ts, np.array: R matrices in time order, shape (time, k, k).
+    A, norms: current A and the norms of the last push.
+    Returns A and norms at the start of the block.
+    """
+    return _converge(np.ascontiguousarray(R_ts, dtype=float), A, norms)
+
+
+def converge_with_growth(R_ts, A):
+    """
+    Pushes A backwards through a block of R matrices as converge does, also keeping track of how much its
+    columns grew, so the product of the R^-1s times A is A diag(exp(log_growth)) at the start of the block.
+    R_ts, np.array: R matrices in time order, shape (time, k, k).
+    Returns A and log_growth at the start of the block.
+    """
+    return _converge_with_growth(np.ascontiguousarray(R_ts, dtype=float), np.asarray(A, dtype=float))
+
+
+def observe(R_ts, A, norms, tau):
+    """
+    Pushes A backwards through a block of R matrices, recording A and the FTCLEs at every time.
+    R_ts, np.array: R matrices in time order, shape (time, k, k).
+    A, norms: current A and the norms of the last push.
+    tau, float: time between R matrices.
+    Returns A_ts and FTCLE_ts in time order, along with A and norms at the start of the block.
+    CLVs are then Q_ts @ A_ts.
+    """
+    A_ts, norms_ts, A, norms = _observe(np.ascontiguousarray(R_ts, dtype=float), A, norms)
+    return A_ts, -np.log(norms_ts) / tau, A, norms
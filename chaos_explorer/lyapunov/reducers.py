@@ -0,0 +1,205 @@
+"""
+Streaming reductions of compute_clvs output, e.g. exponent means and variances or CLV angle histograms.
+Reducers see each output block as it's made, {"time": ..., "trajectory": ..., "CLV": ..., "FTCLE": ...}
+plus "BLV" and "FTBLE" if saved, and keep a fixed amount of state, so the full time series needn't be stored.
+"""
+import numpy as np
+
+from .storage import DIMS
+
+
+class Reducer:
+    """
+    Reduces output blocks one at a time.
+    Subclasses implement update and result, and name the attributes holding their running state in
+    _state so compute_clvs can checkpoint them.
+
+    variable, string or function: output variable reduced, e.g. "FTCLE",
+        or a function of the output block returning an array with time as its first axis.
+    name, string: prefix of the result's variables, defaults to variable if it's a string.
+    """
+
+    _state = ()
+
+    def __init__(self, variable, name=None):
+        if name is None and callable(variable):
+            raise ValueError("Reducers of a function need a name.")
+        self.variable = variable
+        self.name = variable if name is None else name
+
+    def values(self, block):
+        "Values reduced from block, time first."
+        if callable(self.variable):
+            return np.asarray(self.variable(block))
+        return block[self.variable]
+
+    def _dims(self, ndim):
+        "Names of the dimensions after time of values with ndim dimensions."
+        if not callable(self.variable) and self.variable in DIMS:
+            return DIMS[self.variable][1:]
+        return [f"{self.name}_dim_{i}" for i in range(ndim - 1)]
+
+    def _coords(self, dims, shape):
+        # Components and lyapunov indices are labelled from 1, as in the output files
+        return {dim: np.arange(1, 1 + size) for dim, size in zip(dims, shape)}
+
+    def update(self, block):
+        raise NotImplementedError
+
+    def result(self):
+        "Reduction so far as an xr.Dataset."
+        raise NotImplementedError
+
+    def checkpoint(self):
+        "Running state, as a dict of arrays. State that hasn't been set up yet, None, is left out."
+        state = {name: getattr(self, name) for name in self._state}
+        return {name: np.copy(value) for name, value in state.items() if value is not None}
+
+    def restore(self, checkpoint):
+        for name, value in checkpoint.items():
+            setattr(self, name, np.copy(value))
+
+
+class MeanVariance(Reducer):
+    """
+    Running mean and sample variance over time, combining blocks with Chan's parallel update
+    so it stays accurate over long runs.
+    """
+
+    _state = ("count", "mean", "m2")
+
+    def __init__(self, variable, name=None):
+        super().__init__(variable, name)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+
+    def update(self, block):
+        values = self.values(block)
+        block_count = len(values)
+        if block_count == 0:
+            return
+        block_mean = np.mean(values, axis=0)
+        block_m2 = np.sum((values - block_mean) ** 2, axis=0)
+
+        count = self.count + block_count
+        delta = block_mean - self.mean
+        self.mean = self.mean + delta * block_count / count
+        self.m2 = self.m2 + block_m2 + delta**2 * self.count * block_count / count
+        self.count = count
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.full_like(np.asarray(self.m2), np.nan)
+
+    def result(self):
+        import xarray as xr
+
+        mean = np.asarray(self.mean)
+        dims = self._dims(mean.ndim + 1)
+        return xr.Dataset(
+            {
+                f"{self.name}_mean": (dims, mean),
+                f"{self.name}_variance": (dims, np.asarray(self.variance)),
+            },
+            coords=self._coords(dims, mean.shape),
+            attrs={f"{self.name}_count": int(self.count)},
+        )
+
+
+class Histogram(Reducer):
+    """
+    Histogram over time with fixed bins, one per component, e.g. per exponent for FTCLEs.
+    Values outside range are counted in underflow and overflow, NaNs are dropped.
+
+    bins, int: number of equal width bins.
+    range, tuple: (lower, upper) edges of the bins.
+    """
+
+    _state = ("counts", "underflow", "overflow")
+
+    def __init__(self, variable, bins, range, name=None):
+        super().__init__(variable, name)
+        self.bins = bins
+        self.range = range
+        self.edges = np.linspace(range[0], range[1], bins + 1)
+        self.counts = None
+        self.underflow = None
+        self.overflow = None
+
+    def update(self, block):
+        values = self.values(block)
+        component_shape = np.shape(values)[1:]
+        if self.counts is None:
+            self.counts = np.zeros(component_shape + (self.bins,), dtype=np.int64)
+            self.underflow = np.zeros(component_shape, dtype=np.int64)
+            self.overflow = np.zeros(component_shape, dtype=np.int64)
+
+        # Flatten components so the whole block is binned by one bincount
+        values = np.reshape(values, (len(values), -1))
+        components = values.shape[1]
+        lower, upper = self.range
+        self.underflow += np.sum(values < lower, axis=0).reshape(component_shape)
+        self.overflow += np.sum(values > upper, axis=0).reshape(component_shape)
+
+        inside = (values >= lower) & (values <= upper)
+        bin_index = np.floor((values - lower) * (self.bins / (upper - lower)))
+        bin_index = np.minimum(bin_index[inside].astype(np.int64), self.bins - 1)  # upper edge in the last bin
+        component_index = np.broadcast_to(np.arange(components), values.shape)[inside]
+        counts = np.bincount(component_index * self.bins + bin_index, minlength=components * self.bins)
+        self.counts += counts.reshape(component_shape + (self.bins,))
+
+    def result(self):
+        import xarray as xr
+
+        counts = np.asarray(self.counts) if self.counts is not None else np.zeros(self.bins, dtype=np.int64)
+        dims = self._dims(counts.ndim)
+        bin_dim = f"{self.name}_bin"
+        coords = self._coords(dims, counts.shape[:-1])
+        coords[bin_dim] = 0.5 * (self.edges[1:] + self.edges[:-1])  # Bin centres
+        data = {f"{self.name}_histogram": (dims + [bin_dim], counts)}
+        if self.counts is not None:
+            data[f"{self.name}_underflow"] = (dims, self.underflow)
+            data[f"{self.name}_overflow"] = (dims, self.overflow)
+        return xr.Dataset(data, coords=coords, attrs={f"{self.name}_range": list(self.range)})
+
+
+class ClvAngleHistogram(Histogram):
+    """
+    Histogram of the angle between two CLVs, or the smallest angle between the subspaces two lists
+    of CLVs span, e.g. ClvAngleHistogram([0], [1, 2]) for the unstable and stable directions of a system
+    with one positive exponent. Angles are in [0, pi/2], CLVs being defined up to sign.
+
+    first, second, int or list: indices of the CLVs, from 0.
+    bins, int: number of equal width bins over [0, pi/2].
+    """
+
+    def __init__(self, first, second, bins=90, name=None):
+        if name is None:
+            name = f"clv_angle_{_label(first)}_{_label(second)}"
+        super().__init__(self._angles, bins, (0, np.pi / 2), name)
+        self.first = first
+        self.second = second
+
+    def _angles(self, block):
+        clvs = block["CLV"]
+        if np.ndim(self.first) == 0 and np.ndim(self.second) == 0:
+            u, v = clvs[..., self.first], clvs[..., self.second]
+            cosines = np.abs(np.sum(u * v, axis=-1)) / (np.linalg.norm(u, axis=-1) * np.linalg.norm(v, axis=-1))
+        else:
+            # Largest singular value of U^T V for orthonormal bases U and V is the cosine of the smallest angle
+            U = np.linalg.qr(clvs[..., np.atleast_1d(self.first)])[0]
+            V = np.linalg.qr(clvs[..., np.atleast_1d(self.second)])[0]
+            cosines = np.linalg.svd(np.matmul(np.swapaxes(U, -1, -2), V), compute_uv=False)[..., 0]
+        return np.arccos(np.clip(cosines, 0, 1))
+
+
+def _label(indices):
+    return "_".join(str(index) for index in np.atleast_1d(indices))
+
+
+def reduction_dataset(reducers):
+    "Results of reducers merged into one xr.Dataset."
+    import xarray as xr
+
+    return xr.merge([reducer.result() for reducer in reducers], combine_attrs="no_conflicts")
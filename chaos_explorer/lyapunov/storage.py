@@ -0,0 +1,439 @@
+"""
+Block stores hold observations made by a BennetinObserver, one block at a time, and let
+compute_clvs read them back, including in reverse time for the Ginelli algorithm.
+
+A block is a dict of numpy arrays that all have time as their first axis,
+e.g. {"time": ..., "trajectory": ..., "Q": ..., "R": ...}.
+xarray and zarr are only imported once a netcdf or zarr store is used.
+
+Netcdf and zarr stores take a StorageEncoding to write reduced precision, compressed blocks
+with only the upper triangle of R. Computations are unaffected, blocks are encoded as they're written.
+"""
+import re
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+# Dimensions of every variable that can appear in a block
+DIMS = {
+    "trajectory": ["time", "component"],
+    "Q": ["time", "component", "le_index"],
+    "R": ["time", "le_index", "le_index_2"],
+    "R_packed": ["time", "le_pair"],
+    "A": ["time", "le_index", "le_index_2"],
+    "CLV": ["time", "component", "le_index"],
+    "BLV": ["time", "component", "le_index"],
+    "FTCLE": ["time", "le_index"],
+    "FTBLE": ["time", "le_index"],
+    "block": ["time"],
+}
+
+
+def block_to_dataset(block):
+    "Packages a block of observations as an xr.Dataset, without copying."
+    import xarray as xr
+
+    dic = {}
+    sizes = {}
+    for name, values in block.items():
+        if name == "time":
+            continue
+        dims = DIMS[name]
+        dic[name] = xr.DataArray(values, dims=dims, name=name)
+        sizes.update(zip(dims[1:], np.shape(values)[1:]))
+
+    # Components and lyapunov indices are labelled from 1
+    coords = {"time": block["time"]}
+    coords.update({dim: np.arange(1, 1 + size) for dim, size in sizes.items()})
+    return xr.Dataset(dic, coords=coords)
+
+
+def dataset_to_block(ds):
+    "Unpacks an xr.Dataset, as written by a BlockStore, into a block of numpy arrays."
+    block = {"time": ds.time.values}
+    block.update({name: ds[name].values for name in ds.data_vars if name != "block"})
+    if "R_packed" in block:
+        block["R"] = unpack_upper_triangle(block.pop("R_packed"))
+    return block
+
+
+def pack_upper_triangle(matrices):
+    "Upper triangles, diagonal included, of matrices (time, k, k) as rows (time, k * (k + 1) / 2)."
+    rows, columns = np.triu_indices(np.shape(matrices)[-1])
+    return matrices[:, rows, columns]
+
+
+def unpack_upper_triangle(packed):
+    "Inverse of pack_upper_triangle, zeros below the diagonal."
+    k = int(round((np.sqrt(8 * np.shape(packed)[-1] + 1) - 1) / 2))
+    rows, columns = np.triu_indices(k)
+    matrices = np.zeros((len(packed), k, k), dtype=packed.dtype)
+    matrices[:, rows, columns] = packed
+    return matrices
+
+
+class StorageEncoding:
+    """
+    How blocks are written by netcdf and zarr stores, e.g. StorageEncoding("float32", "zlib", pack_R=True).
+
+    dtype, string: "float64", "float32", or an integer type, e.g. "int16", to store the variables in scaled as
+        integers scaled to [-1, 1]. Other floating point variables are then float32. Unchanged if None.
+    compression, string: None, "zlib" or "blosc". Blosc is for zarr stores, netcdf files use zlib instead
+        as netcdf's blosc filter fails on chunks it can't compress.
+    level, int: compression level.
+    pack_R, bool: store only the upper triangle of R, as R_packed, which is unpacked again when read.
+    scaled, tuple: variables bounded by 1 in absolute value, stored as scaled integers with integer dtypes.
+        Q, BLVs and CLVs are unit vectors.
+    """
+
+    def __init__(self, dtype=None, compression=None, level=4, pack_R=False, scaled=("Q", "BLV", "CLV")):
+        if compression not in [None, "zlib", "blosc"]:
+            raise ValueError(f"Unknown compression {compression}, choose from None, zlib or blosc.")
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        self.compression = compression
+        self.level = level
+        self.pack_R = pack_R
+        self.scaled = scaled
+
+    def encode_block(self, block):
+        "Block as it's written, with R packed if pack_R."
+        if self.pack_R and "R" in block:
+            block = dict(block)
+            block["R_packed"] = pack_upper_triangle(block.pop("R"))
+        return block
+
+    def _dtype_encoding(self, name):
+        if self.dtype is None:
+            return {}
+        if np.issubdtype(self.dtype, np.floating):
+            return {"dtype": self.dtype.name}
+        if name in self.scaled:
+            info = np.iinfo(self.dtype)
+            return {"dtype": self.dtype.name, "scale_factor": 1 / info.max, "_FillValue": info.min}
+        return {"dtype": "float32"}
+
+    def _compression_encoding(self, backend):
+        if self.compression is None:
+            return {}
+        if backend == "netcdf":
+            return {"zlib": True, "complevel": self.level, "shuffle": True}
+
+        import zarr
+
+        if int(zarr.__version__.split(".")[0]) < 3:
+            import numcodecs
+
+            if self.compression == "zlib":
+                return {"compressor": numcodecs.Zlib(level=self.level)}
+            return {"compressor": numcodecs.Blosc(cname="lz4", clevel=self.level, shuffle=numcodecs.Blosc.SHUFFLE)}
+        if self.compression == "zlib":
+            return {"compressors": (zarr.codecs.GzipCodec(level=self.level),)}
+        return {"compressors": (zarr.codecs.BloscCodec(cname="lz4", clevel=self.level, shuffle="shuffle"),)}
+
+    def encoding(self, ds, backend):
+        """
+        Per variable encoding of ds, as passed to to_netcdf or to_zarr.
+        backend, string: "netcdf" or "zarr".
+        """
+        encoding = {}
+        for name in ds.data_vars:
+            encoding[name] = self._compression_encoding(backend)
+            if np.issubdtype(ds[name].dtype, np.floating):
+                encoding[name].update(self._dtype_encoding(name))
+        return encoding
+
+
+class BlockStore:
+    "Blocks of observations, appended in time order."
+
+    def append(self, block):
+        raise NotImplementedError
+
+    def read(self, index):
+        "Returns block number index."
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def truncate(self, length):
+        "Drops blocks from number length on, e.g. ones written after the checkpoint a run is resumed from."
+        raise NotImplementedError
+
+    def blocks(self):
+        "Blocks in time order."
+        for index in range(len(self)):
+            yield self.read(index)
+
+    def reversed_blocks(self):
+        "Blocks in reverse time order, the time order within each block is unchanged."
+        for index in reversed(range(len(self))):
+            yield self.read(index)
+
+    def cleanup(self):
+        "Deletes the store."
+        raise NotImplementedError
+
+
+_BLOCK_FILE = re.compile(r"\d+\.nc")  # Names of the files NetcdfBlockStore writes
+
+
+class NetcdfBlockStore(BlockStore):
+    "One netcdf file per block, 0.nc, 1.nc, ..."
+
+    def __init__(self, folder, overwrite=False, storage_encoding=None):
+        """
+        folder, str: folder the files are written to, existing files are added to.
+        overwrite, bool: delete any existing block files, 0.nc, 1.nc, ..., in the folder first.
+            Other files in the folder are left alone.
+        storage_encoding, StorageEncoding: how blocks are written, float64 and uncompressed if None.
+        """
+        self.folder = Path(folder)
+        self.storage_encoding = StorageEncoding() if storage_encoding is None else storage_encoding
+        self.folder.mkdir(parents=True, exist_ok=True)
+        if overwrite:
+            for path in self._block_paths():
+                path.unlink()
+        self._length = len(self._block_paths())
+
+    def _block_paths(self):
+        "Block files in the folder, ignoring any other netcdf files."
+        return [path for path in self.folder.glob("*.nc") if _BLOCK_FILE.fullmatch(path.name)]
+
+    def _path(self, index):
+        return self.folder / f"{index}.nc"
+
+    def append(self, block):
+        self.write(self._length, block)
+        self._length += 1
+
+    def write(self, index, block):
+        "Writes block number index directly, e.g. from worker processes filling in blocks out of order."
+        ds = block_to_dataset(self.storage_encoding.encode_block(block))
+        ds.to_netcdf(self._path(index), encoding=self.storage_encoding.encoding(ds, "netcdf"))
+
+    def read(self, index):
+        import xarray as xr
+
+        with xr.open_dataset(self._path(index)) as ds:
+            return dataset_to_block(ds.load())
+
+    def __len__(self):
+        return self._length
+
+    def truncate(self, length):
+        for index in range(length, self._length):
+            self._path(index).unlink(missing_ok=True)
+        self._length = min(length, self._length)
+
+    def cleanup(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+class ZarrBlockStore(BlockStore):
+    """
+    All blocks appended along time in a single chunked, compressed zarr store.
+    The block each observation came from is stored alongside, so blocks can be read back one at a time.
+    """
+
+    def __init__(self, path, time_chunk=100, encoding={}, overwrite=False, storage_encoding=None):
+        """
+        path, str: location of the zarr store, any existing store is added to.
+        time_chunk, int: number of observations per zarr chunk.
+        encoding, dict: extra zarr encoding per variable, e.g. compressors, passed to to_zarr.
+            Takes precedence over storage_encoding.
+        overwrite, bool: delete any existing store first.
+        storage_encoding, StorageEncoding: how blocks are written, float64 with zarr's default compression if None.
+        """
+        self.path = Path(path)
+        if overwrite:
+            shutil.rmtree(self.path, ignore_errors=True)
+        self.time_chunk = time_chunk
+        self.encoding = encoding
+        self.storage_encoding = StorageEncoding() if storage_encoding is None else storage_encoding
+        self._block_ends = []
+        self._dataset = None
+        if self.path.exists():
+            import xarray as xr
+
+            block_index = xr.open_zarr(self.path, chunks=None)["block"].values
+            self._block_ends = list(np.searchsorted(block_index, np.arange(block_index[-1] + 1), side="right"))
+
+    def append(self, block):
+        block = self.storage_encoding.encode_block(block)
+        ds = block_to_dataset(dict(block, block=np.full(len(block["time"]), len(self._block_ends))))
+        if len(self._block_ends) == 0:
+            storage_encoding = self.storage_encoding.encoding(ds, "zarr")
+            encoding = {
+                name: dict(
+                    {"chunks": (self.time_chunk,) + ds[name].shape[1:]},
+                    **storage_encoding[name],
+                    **self.encoding.get(name, {}),
+                )
+                for name in ds.data_vars
+            }
+            ds.to_zarr(self.path, mode="w", encoding=encoding)
+            self._block_ends.append(len(ds.time))
+        else:
+            ds.to_zarr(self.path, append_dim="time")
+            self._block_ends.append(self._block_ends[-1] + len(ds.time))
+        self._dataset = None  # Reopen on next read to see new data
+
+    def read(self, index):
+        if self._dataset is None:
+            import xarray as xr
+
+            self._dataset = xr.open_zarr(self.path, chunks=None)
+        start = 0 if index == 0 else self._block_ends[index - 1]
+        return dataset_to_block(self._dataset.isel(time=slice(start, self._block_ends[index])).load())
+
+    def __len__(self):
+        return len(self._block_ends)
+
+    def truncate(self, length):
+        if length >= len(self._block_ends):
+            return
+        if length == 0:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._block_ends = []
+            self._dataset = None
+            return
+        import xarray as xr
+        import zarr
+
+        end = self._block_ends[length - 1]
+        with xr.open_zarr(self.path, chunks=None) as ds:
+            timed = {name: ds[name].shape for name in ds.variables if ds[name].dims[:1] == ("time",)}
+        group = zarr.open_group(self.path, mode="r+")
+        for name, shape in timed.items():
+            group[name].resize((end,) + shape[1:])
+        zarr.consolidate_metadata(self.path)
+        self._block_ends = self._block_ends[:length]
+        self._dataset = None
+
+    def cleanup(self):
+        self._dataset = None
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class MemoryBlockStore(BlockStore):
+    "Blocks kept in RAM."
+
+    def __init__(self):
+        self._blocks = []
+
+    def append(self, block):
+        self._blocks.append(dict(block))
+
+    def read(self, index):
+        return self._blocks[index]
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def truncate(self, length):
+        del self._blocks[length:]
+
+    def cleanup(self):
+        self._blocks = []
+
+
+class MemmapBlockStore(BlockStore):
+    """
+    Blocks appended to one np.memmap file per variable, so they live on disk
+    but are paged in and out by the operating system rather than read and written explicitly.
+    """
+
+    def __init__(self, folder, capacity=1000):
+        """
+        folder, str: folder the memmap files are written to.
+        capacity, int: number of observations to allocate space for, grown if exceeded.
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self._arrays = {}
+        self._block_ends = []
+
+    def _memmap(self, name, shape, dtype, capacity):
+        return np.memmap(self.folder / f"{name}_{capacity}.dat", dtype=dtype, mode="w+", shape=(capacity,) + shape)
+
+    def _grow(self, capacity):
+        stored = self._block_ends[-1] if self._block_ends else 0  # Observations, not blocks
+        for name, array in self._arrays.items():
+            grown = self._memmap(name, array.shape[1:], array.dtype, capacity)
+            grown[:stored] = array[:stored]
+            (self.folder / Path(array.filename).name).unlink()
+            self._arrays[name] = grown
+        self.capacity = capacity
+
+    def append(self, block):
+        start = self._block_ends[-1] if self._block_ends else 0
+        end = start + len(block["time"])
+        if not self._arrays:
+            for name, values in block.items():
+                values = np.asarray(values)
+                self._arrays[name] = self._memmap(name, values.shape[1:], np.result_type(values, float), self.capacity)
+        elif end > self.capacity:
+            self._grow(max(end, 2 * self.capacity))
+        for name, values in block.items():
+            self._arrays[name][start:end] = values
+        self._block_ends.append(end)
+
+    def read(self, index):
+        start = 0 if index == 0 else self._block_ends[index - 1]
+        return {name: array[start : self._block_ends[index]] for name, array in self._arrays.items()}
+
+    def __len__(self):
+        return len(self._block_ends)
+
+    def truncate(self, length):
+        del self._block_ends[length:]
+
+    def __getstate__(self):
+        "Pickled, e.g. for worker processes, as file names so the memmaps are reopened rather than copied."
+        state = self.__dict__.copy()
+        state["_arrays"] = {
+            name: (array.filename, array.dtype, array.shape) for name, array in self._arrays.items()
+        }
+        return state
+
+    def __setstate__(self, state):
+        arrays = state.pop("_arrays")
+        self.__dict__.update(state)
+        self._arrays = {
+            name: np.memmap(filename, dtype=dtype, mode="r+", shape=shape)
+            for name, (filename, dtype, shape) in arrays.items()
+        }
+
+    def cleanup(self):
+        self._arrays = {}
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+def make_store(kind, path=None, time_chunk=100, overwrite=False, capacity=1000, storage_encoding=None):
+    """
+    kind, string: "netcdf" for a folder of netcdf files, "zarr" for a single zarr store,
+        "memory" to keep blocks in RAM or "mmap" for np.memmap files.
+    path, str: folder for the store, ".zarr" is added for zarr stores. Not needed for memory stores.
+    time_chunk, int: number of observations per chunk for zarr stores.
+    overwrite, bool: delete any existing store first.
+    capacity, int: number of observations to allocate space for in mmap stores.
+    storage_encoding, StorageEncoding: how netcdf and zarr stores write blocks, memory and mmap stores
+        keep them as they are.
+    """
+    if kind == "memory":
+        return MemoryBlockStore()
+    elif kind == "mmap":
+        return MemmapBlockStore(path, capacity=capacity)
+    elif kind == "netcdf":
+        return NetcdfBlockStore(path, overwrite=overwrite, storage_encoding=storage_encoding)
+    elif kind == "zarr":
+        return ZarrBlockStore(
+            Path(path).with_suffix(".zarr"),
+            time_chunk=time_chunk,
+            overwrite=overwrite,
+            storage_encoding=storage_encoding,
+        )
+    raise ValueError(f"Unknown store {kind}, choose from netcdf, zarr, memory or mmap.")
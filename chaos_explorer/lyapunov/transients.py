@@ -0,0 +1,113 @@
+"""
+Convergence checks so BLV and CLV transients can stop once converged rather than run for a fixed length.
+"""
+from .core import posQR
+from . import ginelli
+
+import numpy as np
+
+
+def _largest_angle(U, V):
+    "Largest angle between corresponding unit columns of U and V, ignoring sign."
+    cosines = np.abs(np.sum(U * V, axis=0))
+    return np.max(np.arccos(np.clip(cosines, 0, 1)))
+
+
+def _random_orthonormal(shape, rng):
+    return posQR(rng.standard_normal(shape))[0]
+
+
+def adaptive_blv_transient(stepper, max_steps, angle_tol=1.0e-3, ftle_tol=1.0e-2, check_every=100, seed=0):
+    """
+    Runs Bennetin steps until the BLVs have converged, or max_steps have been taken.
+
+    Alongside Q a probe perturbation matrix, started from random vectors, is pushed forward on the
+    same trajectory. The BLVs have converged once Q and the probe have both forgotten where they
+    started and agree, every pair of vectors within angle_tol radians, and the running average FTLEs
+    have changed by less than ftle_tol since the previous check.
+
+    stepper, BennetinStepper: stepper to run.
+    check_every, int: steps between convergence checks.
+    Returns the number of steps taken.
+    """
+    rng = np.random.default_rng(seed)
+    k = stepper.k
+    # Q starts out scaled, e.g. eye * 1e-6, which would bias every FTLE by log(scale) / (steps * tau)
+    stepper.Q = posQR(stepper.Q)[0]
+    probe = _random_orthonormal(stepper.Q.shape, rng)
+    log_stretching = np.zeros(k)
+    previous_ftle = None
+    steps = 0
+    while steps < max_steps:
+        # Push Q and the probe forward together in one integration
+        stepper._perturbation_state = np.hstack([stepper.Q, probe])
+        stepper.run(stepper.tau)
+        stepper.Q, stepper.R = posQR(stepper._perturbation_state[:, :k])
+        probe = posQR(stepper._perturbation_state[:, k:])[0]
+        log_stretching += np.log(np.diag(stepper.R))
+        steps += 1
+
+        if steps % check_every == 0:
+            ftle = log_stretching / (steps * stepper.tau)
+            ftle_converged = previous_ftle is not None and np.max(np.abs(ftle - previous_ftle)) < ftle_tol
+            if ftle_converged and _largest_angle(stepper.Q, probe) < angle_tol:
+                break
+            previous_ftle = ftle
+    stepper._perturbation_state = stepper.Q
+    return steps
+
+
+def _scaled_product(U, log_scale, V):
+    """
+    U diag(exp(log_scale)) V with normalised columns, and the log of the norms of its columns,
+    without forming exp(log_scale) which over or underflows on long transients.
+    """
+    with np.errstate(divide="ignore"):
+        log_terms = log_scale[:, None] + np.log(np.abs(V))  # -inf where V is zero
+    shift = np.max(log_terms, axis=0)
+    product = U @ (np.sign(V) * np.exp(log_terms - shift))
+    norms = np.linalg.norm(product, axis=0)
+    return product / norms, shift + np.log(norms)
+
+
+class ClvTransientCheck:
+    """
+    Whether the R matrices stored so far are enough for the CLV transient, called with the
+    convergence store as blocks are added to it.
+
+    A is pushed back through them from two different starting points, the identity and a random
+    upper triangular matrix. The transient is long enough if both give the same A at the start,
+    every pair of columns within angle_tol radians.
+
+    Rather than pushing both back through every block on each check, the product M of the R^-1s
+    from the start is carried from one check to the next, as normalised columns and the log of their
+    norms, and only blocks added since the last check are read. Both starting points pushed back
+    are then M times them, the identity giving the columns of M.
+
+    k, int: number of CLVs.
+    """
+
+    def __init__(self, k, angle_tol=1.0e-3, seed=0):
+        self.angle_tol = angle_tol
+        rng = np.random.default_rng(seed)
+        self.random_A = np.triu(rng.standard_normal((k, k)))
+        self.random_A += np.diag(np.abs(np.diag(self.random_A)) + 1)
+        self.random_A /= np.linalg.norm(self.random_A, axis=0)
+        self.M, self.log_norms = ginelli.initial_A(k)[0], np.zeros(k)
+        self.blocks = 0  # Blocks of the store included in M
+
+    def update(self, convergence_store):
+        "Includes blocks added to convergence_store since the last update in M."
+        for index in range(self.blocks, len(convergence_store)):
+            # Product over the new block, appended on the right of M as they're later in time
+            block_A, block_log_norms = ginelli.converge_with_growth(
+                convergence_store.read(index)["R"], ginelli.initial_A(len(self.M))[0]
+            )
+            self.M, log_norms = _scaled_product(self.M, self.log_norms, block_A)
+            self.log_norms = log_norms + block_log_norms
+        self.blocks = len(convergence_store)
+
+    def __call__(self, convergence_store):
+        self.update(convergence_store)
+        random_A = _scaled_product(self.M, self.log_norms, self.random_A)[0]
+        return _largest_angle(self.M, random_A) < self.angle_tol
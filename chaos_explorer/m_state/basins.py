@@ -0,0 +1,96 @@
+"""
+Ready made check_cold for BisectionAlgorithm.
+Rather than polling the integrator every tau and testing thresholds, the hot and cold
+thresholds are solve_ivp events, so each point is classified in a single integration
+that stops exactly when a threshold is crossed.
+"""
+import numpy as np
+
+
+class BasinClassifier:
+    """
+    Classifies points as in the cold or hot basin by integrating until a threshold is crossed.
+    Called as check_cold(ic, integrator), it returns True if cold, False if hot and None if
+    neither threshold was crossed within max_time.
+
+    Inputs
+    ------------
+    observable, function
+        Function of the state that the thresholds apply to, e.g. lambda state: state[0].
+
+    cold_threshold, float
+        Points are cold once observable drops below this.
+
+    hot_threshold, float
+        Points are hot once observable rises above this.
+
+    max_time, float
+        Longest we integrate for before giving up on a point.
+
+    cache, bool
+        Remember classified points, so a point that's already been integrated with the same integrator
+        parameters and max_time isn't integrated again, e.g. when mapping basins on a grid.
+        Bisection rarely tests the same point twice and copies sent to worker processes each have their
+        own cache, so it's off by default.
+
+    decimals, int
+        Points are rounded to this many decimals when looked up in the cache, exact matches only if None.
+    """
+
+    def __init__(self, observable, cold_threshold, hot_threshold, max_time=100, cache=False, decimals=None):
+        self.observable = observable
+        self.cold_threshold = cold_threshold
+        self.hot_threshold = hot_threshold
+        self.max_time = max_time
+        self.cache = {} if cache else None
+        self.decimals = decimals
+        self.crossing_time = None  # Time taken to cross a threshold by the last point classified
+
+    def _key(self, ic, integrator):
+        "Cache key of ic, along with everything else the result depends on."
+        ic = np.asarray(ic, dtype=float)
+        if self.decimals is not None:
+            ic = np.round(ic, self.decimals) + 0.0  # + 0.0 so -0.0 and 0.0 are the same key
+        parameters = tuple(
+            (name, np.shape(value), np.asarray(value).tobytes())
+            for name, value in sorted(getattr(integrator, "parameters", {}).items())
+        )
+        return ic.tobytes(), parameters, self.max_time
+
+    def _cold_event(self, t, state):
+        return self.observable(state) - self.cold_threshold
+
+    def _hot_event(self, t, state):
+        return self.observable(state) - self.hot_threshold
+
+    def classify(self, ic, integrator):
+        """
+        Integrates ic with integrator, an OdeIntegrator, until it crosses a threshold.
+        Returns whether it's cold (True, False or None as for __call__) and the time taken to cross the threshold.
+        The integrator is left at the crossing, or after max_time if there wasn't one. It isn't touched
+        for points already past a threshold, classified with a crossing time of 0, or found in the cache.
+        """
+        key = self._key(ic, integrator) if self.cache is not None else None
+        if key is not None and key in self.cache:
+            return self.cache[key]
+
+        # Already past a threshold, there'd be no crossing to detect
+        value = self.observable(ic)
+        if value < self.cold_threshold:
+            result = (True, 0.0)
+        elif value > self.hot_threshold:
+            result = (False, 0.0)
+        else:
+            start_time = integrator.time
+            integrator.state = np.array(ic, dtype=float)
+            event_index = integrator.run_until([self._cold_event, self._hot_event], self.max_time)
+            crossing_time = integrator.time - start_time
+            result = (None, crossing_time) if event_index is None else (event_index == 0, crossing_time)
+
+        if key is not None:
+            self.cache[key] = result
+        return result
+
+    def __call__(self, ic, integrator):
+        cold, self.crossing_time = self.classify(ic, integrator)
+        return cold
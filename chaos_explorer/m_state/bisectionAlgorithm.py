@@ -2,8 +2,16 @@
 Class defining M State bisection algorithm.
 To implement you need to write integrator, check_cold, cool_down, heat_up functions.
 Example of each is commented in this doc.
+BasinClassifier in chaos_explorer.m_state.basins is a ready made check_cold for threshold based basins.
 """
-from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from chaos_explorer.checkpoint import save_checkpoint, load_checkpoint
+from chaos_explorer.log import progress
+from chaos_explorer.stats import NULL_STATS
 
 
 def bisect(x, y):
@@ -19,6 +27,8 @@ class BisectionAlgorithm:
     integrator, object
         Something that runs the dynamical system.
         Needs to have set_state, state and run functions.
+        Its state and time are checkpointed, along with whatever its own checkpoint method returns
+        if it has one, e.g. the noise streams of an SdeIntegrator.
 
     check_cold, function
         Function that tests whether a point is in the 'cold' basin.
@@ -35,9 +45,22 @@ class BisectionAlgorithm:
 
     ic, list
         Where to start algorithm from [cold basin ic, hot basin ic].
+
+    sections, int
+        Number of evenly spaced points between the cold and hot points tested each step,
+        shrinking the bracket by a factor of sections + 1. 1 for bisection.
+
+    n_workers, int
+        Processes the sections points are tested on. check_cold and the integrator
+        then have to be picklable, each test is given its own copy of the integrator.
+        Integrators with a spawn method, e.g. SdeIntegrator, give each test a copy with its own noise.
+
+    stats, Stats
+        Collects the number of points tested and the time spent testing them, nothing if None.
+        Pass the same Stats to the integrator to collect its evaluations and integration time too.
     """
 
-    def __init__(self, integrator, check_cold, cool_down, heat_up, tau, ic):
+    def __init__(self, integrator, check_cold, cool_down, heat_up, tau, ic, sections=1, n_workers=1, stats=None):
 
         self.integrator = integrator
         self.parameters = integrator.parameters
@@ -48,6 +71,10 @@ class BisectionAlgorithm:
         self.midpoint = bisect(self.cold_point, self.hot_point)
         self.tau = tau
         self.time = 0
+        self.sections = sections
+        self.n_workers = n_workers
+        self._pool = None
+        self.stats = NULL_STATS if stats is None else stats
 
     def _midpoint_update(self):
         "Calculates midpoint and updates hot/cold points respectively"
@@ -56,7 +83,9 @@ class BisectionAlgorithm:
         self.midpoint = bisect(self.cold_point, self.hot_point)
 
         # Check if it the midpoint is cold or hot
-        midpoint_cold = self.check_cold(self.midpoint, self.integrator)
+        with self.stats.timer("basin_checks"):
+            midpoint_cold = self.check_cold(self.midpoint, self.integrator)
+        self.stats.count("basin_checks")
 
         # Update cold or hot point depending on result
         if midpoint_cold:
@@ -68,6 +97,41 @@ class BisectionAlgorithm:
         elif midpoint_cold is None:
             self.cold_point = self.midpoint
 
+    def _section_update(self):
+        "Tests sections points between the cold and hot points and shrinks the bracket to the first change of basin"
+
+        # Evenly spaced points from cold to hot
+        points = [
+            self.cold_point + j / (self.sections + 1) * (self.hot_point - self.cold_point)
+            for j in range(1, self.sections + 1)
+        ]
+
+        # Stochastic integrators give each test its own noise, the same whether tests run in parallel or not
+        if hasattr(self.integrator, "spawn"):
+            integrators = self.integrator.spawn(len(points))
+        else:
+            integrators = repeat(self.integrator)
+
+        # Check which are cold, in parallel if we have a pool
+        with self.stats.timer("basin_checks"):
+            if self._pool is None:
+                points_cold = [self.check_cold(point, integrator) for point, integrator in zip(points, integrators)]
+            else:
+                points_cold = list(self._pool.map(self.check_cold, points, integrators))
+        self.stats.count("basin_checks", len(points))
+
+        # New bracket either side of the first point that isn't cold
+        first_hot = next((j for j, point_cold in enumerate(points_cold) if not point_cold), len(points))
+        if first_hot > 0:
+            self.cold_point = points[first_hot - 1]
+        else:
+            self.cool_down(self.cold_point)
+        if first_hot < len(points):
+            self.hot_point = points[first_hot]
+        else:
+            self.heat_up(self.hot_point)
+        self.midpoint = bisect(self.cold_point, self.hot_point)
+
     def _step(self):
         "One step on M-state algorithm"
 
@@ -81,13 +145,61 @@ class BisectionAlgorithm:
         self.hot_point = self.integrator.state
 
         # Midpoint update
-        self._midpoint_update()
+        if self.sections == 1:
+            self._midpoint_update()
+        else:
+            self._section_update()
         self.time += self.tau
-
-    def run(self, steps, timer=False):
-        "Many step of m-state algorithm"
-        for i in tqdm(range(steps), disable=(not timer)):
-            self._step()
+        self.stats.count("steps")
+
+    def run(self, steps, timer=False, checkpoint_path=None, checkpoint_every=100):
+        """
+        Many step of m-state algorithm.
+        checkpoint_path, str: file the algorithm is checkpointed to every checkpoint_every steps.
+            If it already exists the run carries on from it, so a killed run is resumed by calling run again.
+        """
+        start = 0
+        if checkpoint_path is not None:
+            checkpoint = load_checkpoint(checkpoint_path)
+            if checkpoint is not None:
+                self.restore(checkpoint)
+                start = checkpoint["step"]
+        if self.sections > 1 and self.n_workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.n_workers)
+        try:
+            for i in progress(range(start, steps), disable=(not timer), initial=start, total=steps):
+                self._step()
+                if checkpoint_path is not None and ((i + 1) % checkpoint_every == 0 or i + 1 == steps):
+                    save_checkpoint(checkpoint_path, dict(self.checkpoint(), step=i + 1))
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def checkpoint(self):
+        "State needed to carry on the algorithm, as a dict for save_checkpoint."
+        checkpoint = {
+            "cold_point": np.copy(self.cold_point),
+            "hot_point": np.copy(self.hot_point),
+            "midpoint": np.copy(self.midpoint),
+            "time": self.time,
+            "integrator_state": np.copy(self.integrator.state),
+            "integrator_time": self.integrator.time,
+        }
+        if hasattr(self.integrator, "checkpoint"):
+            checkpoint["integrator"] = self.integrator.checkpoint()
+        return checkpoint
+
+    def restore(self, checkpoint):
+        "Carries on from a checkpoint made by checkpoint."
+        self.cold_point = np.copy(checkpoint["cold_point"])
+        self.hot_point = np.copy(checkpoint["hot_point"])
+        self.midpoint = np.copy(checkpoint["midpoint"])
+        self.time = checkpoint["time"]
+        self.integrator.state = np.copy(checkpoint["integrator_state"])
+        self.integrator.time = checkpoint["integrator_time"]
+        if "integrator" in checkpoint:
+            self.integrator.restore(checkpoint["integrator"])
 
 
 #
@@ -0,0 +1,188 @@
+"""
+Iterators for discrete dynamical systems, x_{n+1} = f(x_n), with the same state/time/run
+contract as the ODE integrators. Time counts iterates, so run(t) applies the map t times.
+
+Maps are written for a single state (ndim,) or a whole ensemble (n_members, ndim), e.g. indexing
+state[..., 0], so ensembles are iterated with vectorised NumPy. Registered models with compiled
+kernels, the kernel rhs being the map, are iterated inside compiled loops for single states.
+"""
+import numpy as np
+
+from chaos_explorer.autodiff import make_jvp
+from chaos_explorer.jit import njit
+from chaos_explorer.models.registry import get_kernels
+from chaos_explorer.stats import NULL_STATS
+
+
+@njit
+def map_loop(f, state, parameters, number_of_iterates):
+    "number_of_iterates of a compiled kernel map f(state, parameters), all inside compiled code."
+    for iterate in range(number_of_iterates):
+        state = f(state, parameters)
+    return state
+
+
+@njit
+def tangent_map_loop(f, jacobian, state, perturbation, parameters, number_of_iterates):
+    "Iterates a state and its perturbation (ndim,) or (ndim, k) through compiled kernels."
+    for iterate in range(number_of_iterates):
+        perturbation = jacobian(state, parameters) @ perturbation
+        state = f(state, parameters)
+    return state, perturbation
+
+
+class MapIterator:
+    """
+    Iterates a discrete dynamical system, or an ensemble of them.
+    """
+
+    def __init__(self, f, ic, parameters={}, chunk_size=4096, use_kernels=True, stats=None):
+        """
+        f, function: the map, f(state, **parameters) -> next state, for states (ndim,) or (n_members, ndim).
+        ic, np.array: initial condition (ndim,), or initial conditions of an ensemble (n_members, ndim).
+        parameters, dict: Parameters used in the map.
+        chunk_size, int: ensembles are iterated chunk_size members at a time, each chunk through all
+            the iterates of a run before the next, so the working set stays in cache.
+        use_kernels, bool: use compiled kernels for single states if f is a registered model
+            and they support the parameters.
+        stats, Stats: collects map evaluations and time spent iterating, nothing if None.
+        """
+        self.f = f
+        self.ic = ic
+        self.state = ic
+        self.parameters = parameters
+        self.time = 0
+        self.ndim = np.shape(ic)[-1]
+        self.chunk_size = chunk_size
+        self.kernels = get_kernels(f) if use_kernels else None
+        self.stats = NULL_STATS if stats is None else stats
+
+    def _iterate(self, state, number_of_iterates):
+        for iterate in range(number_of_iterates):
+            state = self.f(state, **self.parameters)
+        return state
+
+    def run(self, t):
+        """t, int: number of iterates."""
+        t = int(t)
+        state = np.asarray(self.state, dtype=float)
+        with self.stats.timer("integration"):
+            if state.ndim == 1 and self.kernels is not None and self.kernels.supports(self.parameters):
+                state = map_loop(self.kernels.rhs, state, self.kernels.pack(self.parameters), t)
+            elif state.ndim == 1 or len(state) <= self.chunk_size:
+                state = self._iterate(state, t)
+            else:
+                state = state.copy()
+                for start in range(0, len(state), self.chunk_size):
+                    chunk = slice(start, start + self.chunk_size)
+                    state[chunk] = self._iterate(state[chunk], t)
+        self.stats.count("rhs_evaluations", t * (len(state) if state.ndim > 1 else 1))
+
+        # Updating variables
+        self.state = state
+        self.time = self.time + t
+
+    def sample(self, number, frequency=1):
+        """
+        Iterates for number * frequency.
+        Returns the times and states, shape (number + 1,) + state shape, every frequency iterates,
+        starting with the current state.
+        """
+        times = self.time + int(frequency) * np.arange(number + 1)
+        states = np.empty((number + 1,) + np.shape(self.state))
+        states[0] = self.state
+        for i in range(number):
+            self.run(frequency)
+            states[i + 1] = self.state
+        return times, states
+
+
+class TangentMapIterator:
+    """
+    Iterates a discrete dynamical system alongside perturbations pushed through its jacobian,
+    the tangent map, for a single state or an ensemble.
+    """
+
+    def __init__(
+        self,
+        f,
+        ic,
+        jacobian=None,
+        perturbation_ic=None,
+        parameters={},
+        use_kernels=True,
+        jvp=None,
+        stats=None,
+    ):
+        """
+        f, function: the map, f(state, **parameters) -> next state, for states (ndim,) or (n_members, ndim).
+        ic, np.array: initial condition (ndim,), or initial conditions of an ensemble (n_members, ndim).
+        jacobian, function: jacobian(state, **parameters) of the map, shape (ndim, ndim),
+            or (n_members, ndim, ndim) for an ensemble.
+        perturbation_ic, np.array: perturbation vector (ndim,) or matrix (ndim, k),
+            with a leading n_members axis for an ensemble.
+        jvp, function: jvp(state, perturbation, **parameters) -> jacobian @ perturbation, used instead of
+            the jacobian. If neither are given the jvp is derived from f by the complex step method,
+            for single states only.
+        stats, Stats: collects map and jacobian evaluations and time spent iterating, nothing if None.
+        """
+        self.rhs = f
+        self.jacobian = jacobian
+        self._trajectory_state = ic
+        self.ndim = np.shape(ic)[-1]
+        self._perturbation_state = perturbation_ic
+        self.time = 0
+        self.parameters = parameters
+        self.stats = NULL_STATS if stats is None else stats
+
+        # Compiled kernels are only used if the jacobian, if given, belongs to the same registered model as f
+        kernels = get_kernels(f) if use_kernels and jvp is None else None
+        if kernels is not None and jacobian is not None and kernels is not get_kernels(jacobian):
+            kernels = None
+        if kernels is not None and kernels.jacobian is None:
+            kernels = None
+        self.kernels = kernels
+
+        if jacobian is None and jvp is None and kernels is None:
+            jvp = make_jvp(f)
+        self.jvp = jvp
+
+    @property
+    def state(self):
+        return np.append(self._trajectory_state, self._perturbation_state)
+
+    def _tangent(self, state, perturbation):
+        if self.jvp is not None:
+            return self.jvp(state, perturbation, **self.parameters)
+        return np.matmul(self.jacobian(state, **self.parameters), perturbation)
+
+    def run(self, t):
+        """t, int: number of iterates."""
+        t = int(t)
+        state = np.asarray(self._trajectory_state, dtype=float)
+        perturbation = np.asarray(self._perturbation_state, dtype=float)
+        with self.stats.timer("integration"):
+            if state.ndim == 1 and self.kernels is not None and self.kernels.supports(self.parameters):
+                state, perturbation = tangent_map_loop(
+                    self.kernels.rhs,
+                    self.kernels.jacobian,
+                    state,
+                    np.ascontiguousarray(perturbation),
+                    self.kernels.pack(self.parameters),
+                    t,
+                )
+            else:
+                if self.jacobian is None and self.jvp is None:
+                    self.jvp = make_jvp(self.rhs)
+                # Ensembles have perturbations (n_members, ndim, k), which np.matmul broadcasts over
+                for iterate in range(t):
+                    perturbation = self._tangent(state, perturbation)
+                    state = self.rhs(state, **self.parameters)
+        evaluations = t * (len(state) if state.ndim > 1 else 1)
+        self.stats.count("rhs_evaluations", evaluations)
+        self.stats.count("jacobian_evaluations", evaluations)
+
+        # Updating variables
+        self._trajectory_state = state
+        self._perturbation_state = perturbation
+        self.time = self.time + t
@@ -0,0 +1,48 @@
+from chaos_explorer.models.registry import ModelKernels, register_model
+from chaos_explorer.jit import njit
+
+import numpy as np
+
+
+def henon(state, a=1.4, b=0.3):
+    "Henon map, for a state (2,) or stacked states (..., 2)."
+    x, y = state[..., 0], state[..., 1]
+    return np.stack([1 - a * x**2 + y, b * x], axis=-1)
+
+
+def henon_jacobian(state, a=1.4, b=0.3):
+    "Jacobian of the Henon map, shape (2, 2) or (..., 2, 2) for stacked states."
+    x = state[..., 0]
+    jacobian = np.zeros(np.shape(state) + (2,))
+    jacobian[..., 0, 0] = -2 * a * x
+    jacobian[..., 0, 1] = 1
+    jacobian[..., 1, 0] = b
+    return jacobian
+
+
+# Compiled kernels, parameters are the tuple (a, b)
+
+
+@njit
+def _henon_kernel(state, parameters):
+    a, b = parameters
+    next_state = np.empty(2)
+    next_state[0] = 1 - a * state[0] ** 2 + state[1]
+    next_state[1] = b * state[0]
+    return next_state
+
+
+@njit
+def _henon_jacobian_kernel(state, parameters):
+    a, b = parameters
+    jacobian = np.empty((2, 2))
+    jacobian[0, 0], jacobian[0, 1] = -2 * a * state[0], 1.0
+    jacobian[1, 0], jacobian[1, 1] = b, 0.0
+    return jacobian
+
+
+register_model(
+    ModelKernels("henon", _henon_kernel, jacobian=_henon_jacobian_kernel, parameters={"a": 1.4, "b": 0.3}),
+    henon,
+    jacobian=henon_jacobian,
+)
@@ -1,7 +1,11 @@
 from chaos_explorer.observers.xarray import TrajectoryObserver
+from chaos_explorer.models.registry import ModelKernels, register_batched, register_model
+from chaos_explorer.jit import njit
 
+import logging
 import numpy as np
-import xarray as xr
+
+logger = logging.getLogger(__name__)
 
 
 def l63(state, sigma=10, rho=28, beta=8 / 3):
@@ -20,32 +24,120 @@ def l63_jacobian(state, sigma=10, rho=28, beta=8 / 3):
     return np.array([grad_f0, grad_f1, grad_f2])
 
 
+def l63_jvp(state, perturbation, sigma=10, rho=28, beta=8 / 3):
+    "l63_jacobian(state) @ perturbation without forming the jacobian."
+    x, y, z = state
+    dx, dy, dz = perturbation
+    return np.array([sigma * (dy - dx), (rho - z) * dx - dy - x * dz, y * dx + x * dy - beta * dz])
+
+
+def l63_batched(states, sigma=10, rho=28, beta=8 / 3):
+    "l63 for stacked states, shape (..., 3)."
+    x, y, z = states[..., 0], states[..., 1], states[..., 2]
+    dxdt = sigma * (y - x)
+    dydt = x * (rho - z) - y
+    dzdt = x * y - beta * z
+    return np.stack([dxdt, dydt, dzdt], axis=-1)
+
+
+def l63_jacobian_batched(states, sigma=10, rho=28, beta=8 / 3):
+    "l63_jacobian for stacked states, shape (..., 3). Returns jacobians with shape (..., 3, 3)."
+    x, y, z = states[..., 0], states[..., 1], states[..., 2]
+    jacobians = np.zeros(np.shape(states) + (3,))
+    jacobians[..., 0, 0] = -sigma
+    jacobians[..., 0, 1] = sigma
+    jacobians[..., 1, 0] = rho - z
+    jacobians[..., 1, 1] = -1
+    jacobians[..., 1, 2] = -x
+    jacobians[..., 2, 0] = y
+    jacobians[..., 2, 1] = x
+    jacobians[..., 2, 2] = -beta
+    return jacobians
+
+
+# Compiled kernels, parameters are the tuple (sigma, rho, beta)
+
+
+@njit
+def _l63_kernel(state, parameters):
+    sigma, rho, beta = parameters
+    x, y, z = state[0], state[1], state[2]
+    rhs = np.empty(3)
+    rhs[0] = sigma * (y - x)
+    rhs[1] = x * (rho - z) - y
+    rhs[2] = x * y - beta * z
+    return rhs
+
+
+@njit
+def _l63_jacobian_kernel(state, parameters):
+    sigma, rho, beta = parameters
+    x, y, z = state[0], state[1], state[2]
+    jacobian = np.empty((3, 3))
+    jacobian[0, 0], jacobian[0, 1], jacobian[0, 2] = -sigma, sigma, 0.0
+    jacobian[1, 0], jacobian[1, 1], jacobian[1, 2] = rho - z, -1.0, -x
+    jacobian[2, 0], jacobian[2, 1], jacobian[2, 2] = y, x, -beta
+    return jacobian
+
+
+@njit
+def _l63_jvp_kernel(state, perturbation, parameters):
+    sigma, rho, beta = parameters
+    x, y, z = state[0], state[1], state[2]
+    jvp = np.empty_like(perturbation)
+    jvp[0] = sigma * (perturbation[1] - perturbation[0])
+    jvp[1] = (rho - z) * perturbation[0] - perturbation[1] - x * perturbation[2]
+    jvp[2] = y * perturbation[0] + x * perturbation[1] - beta * perturbation[2]
+    return jvp
+
+
+register_model(
+    ModelKernels(
+        "l63",
+        _l63_kernel,
+        jacobian=_l63_jacobian_kernel,
+        jvp=_l63_jvp_kernel,
+        parameters={"sigma": 10, "rho": 28, "beta": 8 / 3},
+    ),
+    l63,
+    jacobian=l63_jacobian,
+)
+register_batched(l63, l63_batched)
+register_batched(l63_jacobian, l63_jacobian_batched)
+
+
 class L63TrajectoryObserver(TrajectoryObserver):
     @property
     def observations(self):
+        import xarray as xr
+
         if len(self._observations) == 0:
-            print("I have no observations! :(")
+            logger.warning("I have no observations! :(")
             return
 
+        # Ensemble integrators give observations with an extra member dimension
+        observations = self._observations.array
+        dims = ["time", "member"][: observations.ndim - 1]
+
         dic = {}
         dic["X"] = xr.DataArray(
-            np.stack(self._observations)[:, 0],
-            dims=["time"],
+            observations[..., 0],
+            dims=dims,
             name="X",
-            coords={"time": self._time_obs},
+            coords={"time": self._time_obs.array},
         )
 
         dic["Y"] = xr.DataArray(
-            np.stack(self._observations)[:, 1],
-            dims=["time"],
+            observations[..., 1],
+            dims=dims,
             name="X",
-            coords={"time": self._time_obs},
+            coords={"time": self._time_obs.array},
         )
 
         dic["Z"] = xr.DataArray(
-            np.stack(self._observations)[:, 2],
-            dims=["time"],
+            observations[..., 2],
+            dims=dims,
             name="X",
-            coords={"time": self._time_obs},
+            coords={"time": self._time_obs.array},
         )
         return xr.Dataset(dic, attrs=self.parameters)
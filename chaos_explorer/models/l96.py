@@ -0,0 +1,193 @@
+from chaos_explorer.observers.xarray import TrajectoryObserver
+from chaos_explorer.models.registry import ModelKernels, register_model
+from chaos_explorer.jit import njit
+
+import logging
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+
+#
+# Lorenz-96, N variables on a ring. The number of variables is set by the length of the state.
+#
+
+
+def l96(state, F=8):
+    return (np.roll(state, -1) - np.roll(state, 2)) * np.roll(state, 1) - state + F
+
+
+def l96_jacobian(state, F=8):
+    "Sparse (csr) jacobian, each row has 4 non zero entries."
+    N = len(state)
+    k = np.arange(N)
+    rows = np.repeat(k, 4)
+    cols = np.stack([(k - 2) % N, (k - 1) % N, k, (k + 1) % N], axis=1).ravel()
+    data = np.stack(
+        [-np.roll(state, 1), np.roll(state, -1) - np.roll(state, 2), -np.ones(N), np.roll(state, 1)], axis=1
+    ).ravel()
+    return sparse.csr_matrix((data, (rows, cols)), shape=(N, N))
+
+
+def l96_jvp(state, perturbation, F=8):
+    "l96_jacobian(state) @ perturbation without forming the jacobian, perturbation is (N,) or (N, k)."
+    if np.ndim(perturbation) == 2:
+        state = state[:, np.newaxis]
+    return (
+        (np.roll(perturbation, -1, axis=0) - np.roll(perturbation, 2, axis=0)) * np.roll(state, 1, axis=0)
+        + (np.roll(state, -1, axis=0) - np.roll(state, 2, axis=0)) * np.roll(perturbation, 1, axis=0)
+        - perturbation
+    )
+
+
+# Compiled kernels, parameters are the tuple (F,) with F an array of length 1, or N for per site forcing
+
+
+@njit
+def _l96_kernel(state, parameters):
+    F = parameters[0]
+    N = state.shape[0]
+    per_site = F.shape[0] > 1
+    rhs = np.empty(N)
+    for k in range(N):
+        rhs[k] = (state[(k + 1) % N] - state[k - 2]) * state[k - 1] - state[k] + (F[k] if per_site else F[0])
+    return rhs
+
+
+@njit
+def _l96_jvp_kernel(state, perturbation, parameters):
+    N = state.shape[0]
+    jvp = np.empty_like(perturbation)
+    for k in range(N):
+        kp1 = (k + 1) % N
+        jvp[k] = (
+            (perturbation[kp1] - perturbation[k - 2]) * state[k - 1]
+            + (state[kp1] - state[k - 2]) * perturbation[k - 1]
+            - perturbation[k]
+        )
+    return jvp
+
+
+register_model(
+    ModelKernels("l96", _l96_kernel, jvp=_l96_jvp_kernel, parameters={"F": 8}, array_parameters=("F",)),
+    l96,
+    jacobian=l96_jacobian,
+)
+
+
+#
+# Two-scale Lorenz-96. State is [X, Y] with K slow variables X and J fast variables per slow
+# variable, K * J in total. Y_{j,k} is at Y[k * J + j], the fast variables form one ring.
+#
+
+
+def _split_two_scale(state, J):
+    K = len(state) // (J + 1)
+    return state[:K], state[K:], K
+
+
+def l96_two_scale(state, F=10, h=1, b=10, c=10, J=10):
+    X, Y, K = _split_two_scale(state, J)
+    dXdt = l96(X, F=F) - (h * c / b) * Y.reshape(K, J).sum(axis=1)
+    dYdt = -c * b * np.roll(Y, -1) * (np.roll(Y, -2) - np.roll(Y, 1)) - c * Y + (h * c / b) * np.repeat(X, J)
+    return np.append(dXdt, dYdt)
+
+
+def l96_two_scale_jacobian(state, F=10, h=1, b=10, c=10, J=10):
+    "Sparse (csr) jacobian of the two-scale system."
+    X, Y, K = _split_two_scale(state, J)
+    n_fast = K * J
+    slow_jacobian = l96_jacobian(X, F=F)
+
+    # Fast variables, Y_{i+1}, Y_{i+2}, Y_{i-1} and Y_i dependence
+    i = np.arange(n_fast)
+    fast_rows = np.repeat(i, 4)
+    fast_cols = np.stack([(i - 1) % n_fast, i, (i + 1) % n_fast, (i + 2) % n_fast], axis=1).ravel()
+    fast_data = np.stack(
+        [
+            c * b * np.roll(Y, -1),
+            -c * np.ones(n_fast),
+            -c * b * (np.roll(Y, -2) - np.roll(Y, 1)),
+            -c * b * np.roll(Y, -1),
+        ],
+        axis=1,
+    ).ravel()
+    fast_jacobian = sparse.csr_matrix((fast_data, (fast_rows, fast_cols)), shape=(n_fast, n_fast))
+
+    # Coupling, each X_k with its J fast variables
+    coupling = sparse.csr_matrix((np.ones(n_fast), (np.repeat(np.arange(K), J), i)), shape=(K, n_fast))
+    return sparse.bmat(
+        [[slow_jacobian, -(h * c / b) * coupling], [(h * c / b) * coupling.T, fast_jacobian]], format="csr"
+    )
+
+
+def l96_two_scale_jvp(state, perturbation, F=10, h=1, b=10, c=10, J=10):
+    "l96_two_scale_jacobian(state) @ perturbation without forming the jacobian."
+    X, Y, K = _split_two_scale(state, J)
+    dX, dY = perturbation[:K], perturbation[K:]
+    if np.ndim(perturbation) == 2:
+        Y = Y[:, np.newaxis]
+    slow = l96_jvp(X, dX, F=F) - (h * c / b) * dY.reshape((K, J) + dY.shape[1:]).sum(axis=1)
+    fast = (
+        -c * b * np.roll(dY, -1, axis=0) * (np.roll(Y, -2, axis=0) - np.roll(Y, 1, axis=0))
+        - c * b * np.roll(Y, -1, axis=0) * (np.roll(dY, -2, axis=0) - np.roll(dY, 1, axis=0))
+        - c * dY
+        + (h * c / b) * np.repeat(dX, J, axis=0)
+    )
+    return np.concatenate([slow, fast])
+
+
+class L96TrajectoryObserver(TrajectoryObserver):
+    @property
+    def observations(self):
+        import xarray as xr
+
+        if len(self._observations) == 0:
+            logger.warning("I have no observations! :(")
+            return
+
+        # Ensemble integrators give observations with an extra member dimension
+        observations = self._observations.array
+        dims = ["time", "member"][: observations.ndim - 1] + ["k"]
+
+        dic = {}
+        dic["X"] = xr.DataArray(
+            observations,
+            dims=dims,
+            name="X",
+            coords={"time": self._time_obs.array, "k": np.arange(observations.shape[-1])},
+        )
+        return xr.Dataset(dic, attrs=self.parameters)
+
+
+class L96TwoScaleTrajectoryObserver(TrajectoryObserver):
+    @property
+    def observations(self):
+        import xarray as xr
+
+        if len(self._observations) == 0:
+            logger.warning("I have no observations! :(")
+            return
+
+        observations = self._observations.array
+        J = self.parameters.get("J", 10)
+        K = observations.shape[-1] // (J + 1)
+        X = observations[..., :K]
+        Y = observations[..., K:].reshape(observations.shape[:-1] + (K, J))
+        dims = ["time", "member"][: observations.ndim - 1]
+
+        dic = {}
+        dic["X"] = xr.DataArray(
+            X,
+            dims=dims + ["k"],
+            name="X",
+            coords={"time": self._time_obs.array, "k": np.arange(K)},
+        )
+        dic["Y"] = xr.DataArray(
+            Y,
+            dims=dims + ["k", "j"],
+            name="Y",
+            coords={"time": self._time_obs.array, "k": np.arange(K), "j": np.arange(J)},
+        )
+        return xr.Dataset(dic, attrs=self.parameters)
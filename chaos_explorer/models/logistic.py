@@ -0,0 +1,38 @@
+from chaos_explorer.models.registry import ModelKernels, register_model
+from chaos_explorer.jit import njit
+
+import numpy as np
+
+
+def logistic(state, r=4):
+    "Logistic map, for a state (1,) or stacked states (..., 1)."
+    return r * state * (1 - state)
+
+
+def logistic_jacobian(state, r=4):
+    "Jacobian of the logistic map, shape (1, 1) or (..., 1, 1) for stacked states."
+    return (r * (1 - 2 * state))[..., np.newaxis]
+
+
+# Compiled kernels, parameters are the tuple (r,)
+
+
+@njit
+def _logistic_kernel(state, parameters):
+    r = parameters[0]
+    return r * state * (1 - state)
+
+
+@njit
+def _logistic_jacobian_kernel(state, parameters):
+    r = parameters[0]
+    jacobian = np.empty((1, 1))
+    jacobian[0, 0] = r * (1 - 2 * state[0])
+    return jacobian
+
+
+register_model(
+    ModelKernels("logistic", _logistic_kernel, jacobian=_logistic_jacobian_kernel, parameters={"r": 4}),
+    logistic,
+    jacobian=logistic_jacobian,
+)
@@ -0,0 +1,96 @@
+"""
+Registry of models that supply compiled kernels.
+
+Kernels take the state and a tuple of parameter values, ordered as in ModelKernels.parameters,
+rather than keyword arguments so that they can be compiled with numba.
+Integrators look up kernels from the python rhs function they're given, and fall back to the
+python rhs for parameters the kernels don't support, e.g. arrays.
+
+Models can also register numpy versions of their functions that act on stacked states, used by
+ensemble steppers in place of looping over members.
+"""
+import numpy as np
+
+_REGISTRY = {}
+_BATCHED = {}
+
+
+class ModelKernels:
+    """
+    Compiled kernels for a model.
+
+    rhs, function: rhs(state, parameters) -> rhs of ode.
+    jacobian, function: jacobian(state, parameters) -> jacobian of rhs.
+    jvp, function: jvp(state, perturbation, parameters) -> jacobian @ perturbation,
+        for a perturbation vector (ndim,) or matrix (ndim, k).
+    parameters, dict: parameter names and default values, in the order kernels expect them.
+    array_parameters, tuple: parameters the kernels also take as 1d arrays, e.g. per variable forcing.
+        These are always passed to the kernels as 1d float arrays, of length 1 for scalars.
+        Other parameters are scalars only.
+    """
+
+    def __init__(self, name, rhs, jacobian=None, jvp=None, parameters={}, array_parameters=()):
+        self.name = name
+        self.rhs = rhs
+        self.jacobian = jacobian
+        self.jvp = jvp
+        self.parameters = parameters
+        self.array_parameters = array_parameters
+
+    def supports(self, parameters):
+        "Whether the kernels can run with a parameter dict, known parameters with values of supported shapes."
+        if not set(parameters) <= set(self.parameters):
+            return False
+        return all(
+            np.ndim(value) <= (1 if name in self.array_parameters else 0) for name, value in parameters.items()
+        )
+
+    def _pack_value(self, name, value):
+        if name in self.array_parameters:
+            return np.atleast_1d(np.asarray(value, dtype=float))
+        return float(value)
+
+    def pack(self, parameters):
+        "Turns a parameter dict, as passed to the python rhs, into the tuple kernels expect."
+        unknown = set(parameters) - set(self.parameters)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {self.name}: {sorted(unknown)}")
+        return tuple(self._pack_value(name, parameters.get(name, default)) for name, default in self.parameters.items())
+
+
+def register_model(kernels, rhs, jacobian=None):
+    """
+    Registers compiled kernels for a model.
+    kernels, ModelKernels: the compiled kernels.
+    rhs, function: python rhs of the model, used to look the kernels up.
+    jacobian, function: python jacobian of the model, used to look the kernels up.
+    """
+    _REGISTRY[kernels.name] = kernels
+    _REGISTRY[rhs] = kernels
+    if jacobian is not None:
+        _REGISTRY[jacobian] = kernels
+
+
+def get_kernels(model):
+    "Returns the ModelKernels registered for a python rhs function or model name, None if there are none."
+    try:
+        return _REGISTRY.get(model)
+    except TypeError:  # unhashable
+        return None
+
+
+def register_batched(function, batched_function):
+    """
+    Registers a version of a model function for stacked states.
+    function, function: python function of a single state, e.g. rhs(state, **parameters).
+    batched_function, function: the same for states stacked along the first axis, (n_members, ndim).
+    """
+    _BATCHED[function] = batched_function
+
+
+def get_batched(function):
+    "Returns the batched version registered for a python function of a single state, None if there isn't one."
+    try:
+        return _BATCHED.get(function)
+    except TypeError:  # unhashable
+        return None
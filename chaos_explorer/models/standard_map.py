@@ -0,0 +1,56 @@
+from chaos_explorer.models.registry import ModelKernels, register_model
+from chaos_explorer.jit import njit
+
+import numpy as np
+
+
+def standard_map(state, K=1):
+    """
+    Chirikov standard map on the torus, state (theta, p), or stacked states (..., 2).
+    p' = p + K sin(theta), theta' = theta + p', both mod 2 pi.
+    """
+    theta, p = state[..., 0], state[..., 1]
+    p = p + K * np.sin(theta)
+    theta = theta + p
+    return np.mod(np.stack([theta, p], axis=-1), 2 * np.pi)
+
+
+def standard_map_jacobian(state, K=1):
+    "Jacobian of the standard map, shape (2, 2) or (..., 2, 2) for stacked states."
+    kick = K * np.cos(state[..., 0])
+    jacobian = np.ones(np.shape(state) + (2,))
+    jacobian[..., 0, 0] = 1 + kick
+    jacobian[..., 1, 0] = kick
+    return jacobian
+
+
+# Compiled kernels, parameters are the tuple (K,)
+
+
+@njit
+def _standard_map_kernel(state, parameters):
+    K = parameters[0]
+    next_state = np.empty(2)
+    p = state[1] + K * np.sin(state[0])
+    next_state[0] = np.mod(state[0] + p, 2 * np.pi)
+    next_state[1] = np.mod(p, 2 * np.pi)
+    return next_state
+
+
+@njit
+def _standard_map_jacobian_kernel(state, parameters):
+    K = parameters[0]
+    kick = K * np.cos(state[0])
+    jacobian = np.ones((2, 2))
+    jacobian[0, 0] = 1 + kick
+    jacobian[1, 0] = kick
+    return jacobian
+
+
+register_model(
+    ModelKernels(
+        "standard_map", _standard_map_kernel, jacobian=_standard_map_jacobian_kernel, parameters={"K": 1}
+    ),
+    standard_map,
+    jacobian=standard_map_jacobian,
+)
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class ObservationBuffer:
+    """
+    Preallocated numpy array that observations are written into.
+    Grows in chunks when full, array gives a (time, ...) view of what's been observed without copying.
+    """
+
+    def __init__(self, capacity=16):
+        """capacity, int: number of observations to allocate space for on the first observation."""
+        self._capacity = capacity
+        self._data = None
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def _allocate(self, observation):
+        # Always at least float, so integer times such as an initial time of 0 aren't truncated
+        dtype = np.result_type(observation, np.float64)
+        self._data = np.empty((self._capacity,) + np.shape(observation), dtype=dtype)
+
+    def reserve(self, capacity):
+        "Makes sure there's space for capacity observations in total, e.g. a whole block."
+        if self._data is None:
+            self._capacity = max(self._capacity, capacity)
+        elif capacity > len(self._data):
+            data = np.empty((capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+            data[: self._length] = self._data[: self._length]
+            self._data = data
+
+    def append(self, observation):
+        if self._data is None:
+            self._allocate(observation)
+        elif self._length == len(self._data):
+            self.reserve(self._length + max(self._capacity, self._length))
+        self._data[self._length] = observation
+        self._length += 1
+
+    def extend(self, observations):
+        observations = np.asarray(observations)
+        if len(observations) == 0:
+            return
+        if self._data is None:
+            self._allocate(observations[0])
+        if self._length + len(observations) > len(self._data):
+            self.reserve(self._length + max(self._capacity, self._length, len(observations)))
+        self._data[self._length : self._length + len(observations)] = observations
+        self._length += len(observations)
+
+    @property
+    def array(self):
+        "View of the observations, shape (time, ...)."
+        if self._data is None:
+            return np.empty((0,))
+        return self._data[: self._length]
@@ -1,12 +1,19 @@
+import logging
+
 from .base import Observer
-from tqdm import tqdm
-import xarray as xr
+from .buffer import ObservationBuffer
+from chaos_explorer.log import progress
+
+logger = logging.getLogger(__name__)
 
 
 class XarrayObserver(Observer):
     """Parent class that has the basic functionality we expect from an xarray observer.
     Child classes should be equipped with a method called 'observations'
-    that unpacks the ._observations list into xr."""
+    that unpacks the ._observations buffer into xr.
+    Child classes that implement look_many set single_pass = True."""
+
+    single_pass = False  # Whether look_many is implemented
 
     def __init__(self, integrator):
         """param, integrator: integrator being observed."""
@@ -16,21 +23,49 @@ class XarrayObserver(Observer):
         self.integrator = integrator
 
         # Observation logs
-        self._time_obs = []  # Times we've made observations
-        self._observations = []
+        self._time_obs = ObservationBuffer()  # Times we've made observations
+        self._observations = ObservationBuffer()
         self.dump_count = 0
 
-    def make_observations(self, number, frequency, timer=True):
+    def make_observations(self, number, frequency, timer=True, single_pass=False):
+        """
+        number, int: how many observations to make after the initial one.
+        frequency, float: time between observations.
+        single_pass, bool: integrate the whole observation window in one go with integrator.sample
+            rather than calling integrator.run between every observation.
+        """
+        # Checked before integrating, rather than failing once the whole window has been integrated
+        if single_pass and not (self.single_pass and hasattr(self.integrator, "sample")):
+            raise ValueError(
+                f"{type(self).__name__} can't observe a {type(self.integrator).__name__} in a single pass,"
+                " use single_pass=False."
+            )
+
+        self._reserve(number + 1)
+        if single_pass:
+            times, states = self.integrator.sample(number, frequency)
+            self.look_many(times, states)
+            return
+
         self.look(self.integrator)  # Initial observation
-        for x in tqdm(range(number), disable=not timer):
+        for x in progress(range(number), disable=not timer):
             self.integrator.run(frequency)
             self.look(self.integrator)
         return
 
+    def look_many(self, times, states):
+        "Observes many integrator states at once, as returned by integrator.sample"
+        raise NotImplementedError(f"{type(self).__name__} can't observe many states at once.")
+
+    def _reserve(self, number):
+        "Makes space for another number of observations in the buffers."
+        self._time_obs.reserve(len(self._time_obs) + number)
+        self._observations.reserve(len(self._observations) + number)
+
     def wipe(self):
-        """Erases observations"""
-        self._time_obs = []
-        self._observations = []
+        """Erases observations. New buffers so datasets already handed out are left untouched."""
+        self._time_obs = ObservationBuffer()
+        self._observations = ObservationBuffer()
 
     def dump(self, save_name):
         """Saves observations to netcdf and wipes.
@@ -38,17 +73,19 @@ class XarrayObserver(Observer):
         name: file name"""
 
         if len(self._observations) == 0:
-            print("I have no observations! :(")
+            logger.warning("I have no observations! :(")
             return
 
         self.observations.to_netcdf(save_name)
-        print(f"Observations written to {save_name}. Erasing personal log.\n")
+        logger.info(f"Observations written to {save_name}. Erasing personal log.")
         self.wipe()
         self.dump_count += 1
         return
 
 
 class TrajectoryObserver(XarrayObserver):
+    single_pass = True
+
     def look(self, integrator):
         """Observes trajectory of a integrator"""
 
@@ -56,7 +93,13 @@ class TrajectoryObserver(XarrayObserver):
         self._time_obs.append(integrator.time)
 
         # Making Observations
-        self._observations.append(integrator.state.copy())
+        self._observations.append(integrator.state)
+        return
+
+    def look_many(self, times, states):
+        """Observes trajectory from an array of states"""
+        self._time_obs.extend(times)
+        self._observations.extend(states)
         return
 
 
@@ -68,11 +111,13 @@ class TangentTrajectoryObserver(XarrayObserver):
         self._time_obs.append(tangent_integrator.time)
 
         # Making Observations
-        self._observations.append(tangent_integrator._trajectory_state.copy())
+        self._observations.append(tangent_integrator._trajectory_state)
         return
 
 
 class ScalarObserver(XarrayObserver):
+    single_pass = True
+
     def __init__(self, integrator, scalar_function, name: str):
         super().__init__(integrator)
         self.name = name
@@ -88,17 +133,24 @@ class ScalarObserver(XarrayObserver):
         self._observations.append(self.scalar_function(integrator.state.copy()))
         return
 
+    def look_many(self, times, states):
+        """Observes scalar value of an array of states"""
+        self._time_obs.extend(times)
+        self._observations.extend([self.scalar_function(state) for state in states])
+        return
+
     @property
     def observations(self):
         """cupboard: Directory where to write netcdf."""
+        import xarray as xr
+
         if len(self._observations) == 0:
-            print("I have no observations! :(")
+            logger.warning("I have no observations! :(")
             return
 
-        dic = {}
-        _time = self._time_obs
+        _time = self._time_obs.array
         xr_da = xr.DataArray(
-            self._observations,
+            self._observations.array,
             dims=["time"],
             name=self.name,
             coords={"time": _time},
@@ -111,8 +163,9 @@ class MstateObserver(XarrayObserver):
     "Observes and Mstate computation."
 
     def make_observations(self, number, timer=True):
+        self._reserve(number + 1)
         self.look(self.integrator)  # Initial observation
-        for x in tqdm(range(number), disable=not timer):
+        for x in progress(range(number), disable=not timer):
             self.integrator.run(1)  # run here is # of mstate alg steps rather than length of time
             self.look(self.integrator)
         return
@@ -124,5 +177,5 @@ class MstateObserver(XarrayObserver):
         self._time_obs.append(mstate_alg.time)
 
         # Making Observations
-        self._observations.append(mstate_alg.midpoint.copy())
+        self._observations.append(mstate_alg.midpoint)
         return
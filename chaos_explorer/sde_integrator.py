@@ -0,0 +1,225 @@
+"""
+Fixed step integration of stochastic dynamical systems, dx = drift(x) dt + diffusion(x) dW,
+with the same state/time/run contract as OdeIntegrator.
+
+Noise is reproducible from a seed: each ensemble member draws from its own numpy Generator,
+spawned from one SeedSequence, so a member's noise doesn't depend on the size of the ensemble,
+on how runs are split up, or on which process it runs in. Copies made with spawn carry on with
+new independent streams, e.g. for worker processes.
+"""
+import copy
+
+import numpy as np
+
+from chaos_explorer.stats import NULL_STATS
+
+_METHODS = ("euler_maruyama", "heun")
+
+
+class SdeIntegrator:
+    """
+    Integrates a stochastic dynamical system, or an ensemble of them, with fixed steps.
+    """
+
+    def __init__(
+        self,
+        drift,
+        diffusion,
+        ic,
+        parameters={},
+        method="heun",
+        dt=0.01,
+        seed=None,
+        chunk_size=1024,
+        stats=None,
+    ):
+        """
+        drift, function: deterministic part, drift(state, **parameters), for states (ndim,) or (n_members, ndim).
+        diffusion, float, np.array or function: noise amplitude of each variable. A float or array (ndim,)
+            gives additive noise, a function diffusion(state, **parameters) with the shape of state
+            gives multiplicative noise.
+        ic, np.array: initial condition (ndim,), or initial conditions of an ensemble (n_members, ndim).
+        parameters, dict: Parameters used in drift and diffusion.
+        method, string: "euler_maruyama", Ito, or "heun", stochastic Heun which is Stratonovich
+            for multiplicative noise. For additive noise both agree, Heun being the more accurate.
+        dt, float: step size, shrunk slightly so runs land on time + t.
+        seed, int or np.random.SeedSequence: seeds the noise, fresh entropy if None.
+        chunk_size, int: number of steps of noise drawn at a time.
+        stats, Stats: collects drift evaluations and time spent integrating, nothing if None.
+        """
+        if method not in _METHODS:
+            raise ValueError(f"method must be one of {_METHODS}, not {method!r}.")
+        self.drift = drift
+        self.diffusion = diffusion
+        self.ic = ic
+        self.state = ic
+        self.parameters = parameters
+        self.time = 0
+        self.method = method
+        self.dt = dt
+        self.chunk_size = chunk_size
+        self.ndim = np.shape(ic)[-1]
+        self.multiplicative = callable(diffusion)
+        self.stats = NULL_STATS if stats is None else stats
+
+        # One stream per member, a single state being member 0 of a one member ensemble
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.n_members = None if np.ndim(ic) == 1 else len(ic)
+        self._generators = [np.random.default_rng(member_seed) for member_seed in seed.spawn(self.n_members or 1)]
+        self._noise = np.empty((len(self._generators), chunk_size, self.ndim))
+        self._noise_index = chunk_size
+
+    def _drift(self, state):
+        return self.drift(state, **self.parameters)
+
+    def _diffusion(self, state):
+        if self.multiplicative:
+            return self.diffusion(state, **self.parameters)
+        return self.diffusion
+
+    def _standard_normals(self):
+        "Next standard normal increments, drawing another chunk from each member's stream when we run out."
+        if self._noise_index == self.chunk_size:
+            for generator, noise in zip(self._generators, self._noise):
+                generator.standard_normal(out=noise)
+            self._noise_index = 0
+        normals = self._noise[:, self._noise_index]
+        self._noise_index += 1
+        return normals if self.n_members is not None else normals[0]
+
+    def _step(self, state, h, dW):
+        drift = self._drift(state)
+        diffusion = self._diffusion(state)
+        if self.method == "euler_maruyama":
+            return state + drift * h + diffusion * dW
+
+        predictor = state + drift * h + diffusion * dW
+        if self.multiplicative:
+            diffusion = 0.5 * (diffusion + self._diffusion(predictor))
+        return state + 0.5 * (drift + self._drift(predictor)) * h + diffusion * dW
+
+    def _count_evaluations(self, number_of_steps):
+        "Drift evaluations, per member for ensembles."
+        evaluations = (1 if self.method == "euler_maruyama" else 2) * number_of_steps
+        self.stats.count("rhs_evaluations", evaluations * (self.n_members or 1))
+
+    def _number_of_steps(self, t):
+        return max(int(np.ceil(t / self.dt - 1.0e-9)), 1)
+
+    def run(self, t):
+        """t: how long we integrate for in adimensional time."""
+        number_of_steps = self._number_of_steps(t)
+        h = t / number_of_steps
+        sqrt_h = np.sqrt(h)
+        state = np.asarray(self.state, dtype=float)
+        with self.stats.timer("integration"):
+            for step in range(number_of_steps):
+                state = self._step(state, h, sqrt_h * self._standard_normals())
+        self._count_evaluations(number_of_steps)
+
+        # Updating variables
+        self.state = state
+        self.time = self.time + t
+
+    def sample(self, number, frequency):
+        """
+        Integrates for number * frequency.
+        Returns the times and states, shape (number + 1,) + state shape, every frequency time units,
+        starting with the current state.
+        """
+        times = self.time + frequency * np.arange(number + 1)
+        states = np.empty((number + 1,) + np.shape(self.state))
+        states[0] = self.state
+        for i in range(number):
+            self.run(frequency)
+            states[i + 1] = self.state
+        self.time = times[-1]
+        return times, states
+
+    def run_until(self, events, max_time):
+        """
+        Integrates a single state until one of events changes sign, or for max_time.
+        events, list: functions event(t, state) as for OdeIntegrator.run_until, direction attributes are kept.
+            Crossings are found to within a step, the integration stops at the step after the crossing.
+        Returns the index of the event that stopped the integration, None if none did.
+        """
+        if self.n_members is not None:
+            raise ValueError("run_until integrates single states, not ensembles.")
+        number_of_steps = self._number_of_steps(max_time)
+        h = max_time / number_of_steps
+        sqrt_h = np.sqrt(h)
+        state = np.asarray(self.state, dtype=float)
+        directions = [getattr(event, "direction", 0) for event in events]
+        values = [event(self.time, state) for event in events]
+        fired = None
+        with self.stats.timer("integration"):
+            for step in range(number_of_steps):
+                state = self._step(state, h, sqrt_h * self._standard_normals())
+                self.time = self.time + h
+                new_values = [event(self.time, state) for event in events]
+                fired = next(
+                    (i for i in range(len(events)) if _crossed(values[i], new_values[i], directions[i])), None
+                )
+                values = new_values
+                if fired is not None:
+                    break
+        self._count_evaluations(step + 1)
+        self.state = state
+        return fired
+
+    def checkpoint(self):
+        """
+        State needed to carry on the same noise streams, as a dict, e.g. for save_checkpoint.
+        Includes the seed sequence so later spawns hand out the same streams too.
+        """
+        return {
+            "state": np.copy(self.state),
+            "time": self.time,
+            "seed_sequence": copy.deepcopy(self.seed_sequence),
+            "generators": [copy.deepcopy(generator.bit_generator.state) for generator in self._generators],
+            "noise": np.copy(self._noise),
+            "noise_index": self._noise_index,
+        }
+
+    def restore(self, checkpoint):
+        "Carries on from a checkpoint made by checkpoint."
+        self.state = np.copy(checkpoint["state"])
+        self.time = checkpoint["time"]
+        self.seed_sequence = copy.deepcopy(checkpoint["seed_sequence"])
+        for generator, state in zip(self._generators, checkpoint["generators"]):
+            generator.bit_generator.state = copy.deepcopy(state)
+        self._noise = np.copy(checkpoint["noise"])
+        self._noise_index = checkpoint["noise_index"]
+
+    def spawn(self, number):
+        """
+        Returns number copies of the integrator at the current state and time, each with its own
+        independent noise streams, e.g. to hand out to worker processes.
+        """
+        copies = []
+        for seed in self.seed_sequence.spawn(number):
+            child = SdeIntegrator(
+                self.drift,
+                self.diffusion,
+                np.copy(self.state),
+                parameters=self.parameters,
+                method=self.method,
+                dt=self.dt,
+                seed=seed,
+                chunk_size=self.chunk_size,
+                stats=self.stats,
+            )
+            child.time = self.time
+            copies.append(child)
+        return copies
+
+
+def _crossed(value, new_value, direction):
+    "Whether an event went from value to new_value through zero, in direction if it's non zero."
+    if direction > 0:
+        return value < 0 <= new_value
+    if direction < 0:
+        return value > 0 >= new_value
+    return (value < 0 <= new_value) or (value > 0 >= new_value)
@@ -0,0 +1,81 @@
+"""
+Instrumentation of long runs: counts, e.g. of rhs evaluations, and time spent in each phase, e.g. integration or QR.
+Integrators, Lyapunov computations and the M-state algorithm take a stats argument, by default NULL_STATS,
+which records nothing so instrumentation costs next to nothing when it isn't wanted.
+"""
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+
+class Stats:
+    """
+    Counts and times collected during a run.
+    Pass the same Stats to several objects, e.g. an integrator and a BisectionAlgorithm, to collect figures across them.
+    """
+
+    enabled = True
+
+    def __init__(self, sink=None):
+        """
+        sink, function: called as sink(kind, name, value) with kind "count" or "time" as each figure comes in,
+            e.g. to forward figures to a logger or metrics system. Figures are collected in counts/times regardless.
+        """
+        self.sink = sink
+        self.counts = {}
+        self.times = {}
+
+    def count(self, name, number=1):
+        "Adds number to the count called name."
+        self.counts[name] = self.counts.get(name, 0) + number
+        if self.sink is not None:
+            self.sink("count", name, number)
+
+    def add_time(self, name, seconds):
+        "Adds seconds to the time spent in the phase called name."
+        self.times[name] = self.times.get(name, 0.0) + seconds
+        if self.sink is not None:
+            self.sink("time", name, seconds)
+
+    @contextmanager
+    def timer(self, name):
+        "Context manager timing the phase called name."
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+    def reset(self):
+        self.counts = {}
+        self.times = {}
+
+    def as_dict(self):
+        return {"counts": dict(self.counts), "times": dict(self.times)}
+
+    def summary(self):
+        "One line per figure, times in seconds."
+        lines = [f"{name}: {number}" for name, number in self.counts.items()]
+        lines += [f"{name}: {seconds:.3f}s" for name, seconds in self.times.items()]
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"{type(self).__name__}(counts={self.counts}, times={self.times})"
+
+
+class NullStats(Stats):
+    "Stats that records nothing."
+
+    enabled = False
+    _null_timer = nullcontext()
+
+    def count(self, name, number=1):
+        pass
+
+    def add_time(self, name, seconds):
+        pass
+
+    def timer(self, name):
+        return self._null_timer
+
+
+NULL_STATS = NullStats()
@@ -1,9 +1,35 @@
 import numpy as np
 from scipy.integrate import solve_ivp
 
+from chaos_explorer.autodiff import make_jvp
+from chaos_explorer.integrator import SteppingSolver
+from chaos_explorer.models.registry import get_kernels
+from chaos_explorer.stats import NULL_STATS
+
 
 class TangentIntegrator:
-    def __init__(self, rhs, ic, jacobian, perturbation_ic=None, parameters={}, method="RK45"):
+    def __init__(
+        self,
+        rhs,
+        ic,
+        jacobian=None,
+        perturbation_ic=None,
+        parameters={},
+        method="RK45",
+        persistent=False,
+        dense_output=False,
+        use_kernels=True,
+        jvp=None,
+        stats=None,
+    ):
+        """
+        jacobian, function: jacobian(state, **parameters), dense, sparse or anything supporting @.
+        jvp, function: jvp(state, perturbation, **parameters) -> jacobian @ perturbation.
+            Used instead of the jacobian so the jacobian never has to be formed.
+            If neither jacobian nor jvp are given the jvp is derived from rhs by the complex step method.
+        stats, Stats: collects rhs and jacobian (or jvp) evaluations and time spent integrating, nothing if None.
+            Every evaluation of the tangent system is one of each.
+        """
 
         self.rhs = rhs
         self.jacobian = jacobian
@@ -13,40 +39,94 @@ class TangentIntegrator:
         self.time = 0
         self.method = method
         self.parameters = parameters
+        self.persistent = persistent
+        self.dense_output = dense_output
+        self.dense_solution = None
+        self._stepping_solver = SteppingSolver(self._tlm_rhs_dt, method=method)
+        self.stats = NULL_STATS if stats is None else stats
+
+        # Compiled kernels are only used if the jacobian, if given, belongs to the same registered model as rhs
+        kernels = get_kernels(rhs) if use_kernels and jvp is None else None
+        if kernels is not None and jacobian is not None and kernels is not get_kernels(jacobian):
+            kernels = None
+        self.kernels = kernels
+        self._active_kernels = None  # kernels, if they support the current parameters, set each run
+
+        if jacobian is None and jvp is None and kernels is None:
+            jvp = make_jvp(rhs)
+        self.jvp = jvp
 
     @property
     def state(self):
         return np.append(self._trajectory_state, self._perturbation_state)
 
     def _trajectory_rhs_dt(self, trajectory):
+        if self._active_kernels is not None:
+            return self._active_kernels.rhs(trajectory, self._kernel_parameters)
         return self.rhs(trajectory, **self.parameters)
 
     def _tangent_rhs_dt(self, trajectory, perturbation):
-        return self.jacobian(trajectory, **self.parameters).dot(perturbation)
+        kernels = self._active_kernels
+        if kernels is not None:
+            if kernels.jvp is not None:
+                return kernels.jvp(trajectory, perturbation, self._kernel_parameters)
+            return kernels.jacobian(trajectory, self._kernel_parameters) @ perturbation
+        if self.jvp is not None:
+            return self.jvp(trajectory, perturbation, **self.parameters)
+        return self.jacobian(trajectory, **self.parameters) @ perturbation
 
     def _tlm_rhs_dt(self, t, state):
         trajectory = state[: self.ndim]
-        perturbation = state[self.ndim :]
+        perturbation = state[self.ndim :].reshape(self._integration_shape)
         trajectory_rhs = self._trajectory_rhs_dt(trajectory)
         tangent_rhs_dt = self._tangent_rhs_dt(trajectory, perturbation)
         return np.append(trajectory_rhs, tangent_rhs_dt)
 
+    def _prepare_kernels(self):
+        "Packs parameters for the compiled kernels, or falls back to python if they don't support them."
+        if self.kernels is not None and self.kernels.supports(self.parameters):
+            self._active_kernels = self.kernels
+            self._kernel_parameters = self.kernels.pack(self.parameters)
+            return
+        self._active_kernels = None
+        if self.jacobian is None and self.jvp is None:
+            self.jvp = make_jvp(self.rhs)
+
+    def _count_evaluations(self, nfev):
+        self.stats.count("rhs_evaluations", nfev)
+        self.stats.count("jacobian_evaluations", nfev)
+
     def run(self, t):
         """t: how long we integrate for in adimensional time."""
+        with self.stats.timer("integration"):
+            self._run(t)
+
+    def _run(self, t):
+        # Perturbation is a vector (ndim,) or a matrix of vectors (ndim, k).
+        # It is flattened for solve_ivp and reshaped in the rhs.
+        self._integration_shape = np.shape(self._perturbation_state)
+        self._prepare_kernels()
 
-        # Integration, default uses RK45 with adaptive stepping.
-        solver_return = solve_ivp(
-            self._tlm_rhs_dt,
-            (self.time, self.time + t),
-            self.state,
-            dense_output=True,
-            method=self.method,
-        )
+        if self.persistent:
+            nfev = self._stepping_solver.nfev
+            final_state, self.dense_solution = self._stepping_solver.advance(
+                self.time, self.state, self.time + t, dense_output=self.dense_output
+            )
+            self._count_evaluations(self._stepping_solver.nfev - nfev)
+        else:
+            # Integration, default uses RK45 with adaptive stepping.
+            solver_return = solve_ivp(
+                self._tlm_rhs_dt,
+                (self.time, self.time + t),
+                self.state,
+                dense_output=self.dense_output,
+                method=self.method,
+            )
+            self._count_evaluations(solver_return.nfev)
+            final_state = solver_return.y[:, -1]
+            self.dense_solution = solver_return.sol
 
         # Updating variables
-        self._trajectory_state = solver_return.y[: self.ndim, -1]
-        self._perturbation_state = solver_return.y[self.ndim :, -1]
+        self._trajectory_state = final_state[: self.ndim]
+        self._perturbation_state = final_state[self.ndim :].reshape(self._integration_shape)
         self.time = self.time + t
-
-
-# TODO: Implement auto jacobian using jax.jaxfwd
@@ -10,7 +10,7 @@ setup(
     author="Calvin Nesbitt",
     author_email="cf.nesbitt95@gmail.com",
     license="MIT",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "tests"]),
     zip_safe=False,
     install_requires=requirements,
 )
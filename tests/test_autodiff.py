@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from chaos_explorer.autodiff import make_jvp
+from chaos_explorer.lyapunov.core import BennetinStepper
+from chaos_explorer.models.l63 import l63, l63_jacobian, l63_jvp
+from chaos_explorer.models.l96 import l96, l96_jacobian, l96_jvp
+
+IC = np.array([1.0, 2.0, 20.0])
+
+
+@pytest.mark.parametrize("method, rtol", [("complex_step", 1e-12), ("finite_difference", 1e-5)])
+def test_derived_jvp_matches_jacobian(method, rtol):
+    rng = np.random.default_rng(0)
+    state, perturbation = 8 + rng.standard_normal(20), rng.standard_normal((20, 4))
+    jvp = make_jvp(l96, method)
+    expected = l96_jacobian(state) @ perturbation
+    np.testing.assert_allclose(jvp(state, perturbation, F=8), expected, rtol=rtol, atol=rtol)
+    np.testing.assert_allclose(jvp(state, perturbation[:, 0], F=8), expected[:, 0], rtol=rtol, atol=rtol)
+    np.testing.assert_allclose(l96_jvp(state, perturbation), expected)
+
+
+def ftles(jacobian=None, jvp=None):
+    stepper = BennetinStepper(l63, IC, jacobian, np.eye(3), tau=0.1, jvp=jvp)
+    log_stretching = np.zeros(3)
+    for step in range(50):
+        stepper.step()
+        log_stretching += np.log(np.diag(stepper.R))
+    return log_stretching / (50 * stepper.tau)
+
+
+def test_matrix_free_ftles_match_explicit_jacobian():
+    explicit = ftles(jacobian=l63_jacobian)
+    np.testing.assert_allclose(ftles(jvp=l63_jvp), explicit, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(ftles(jvp=make_jvp(l63)), explicit, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(ftles(), explicit, rtol=1e-6, atol=1e-6)  # Compiled kernels
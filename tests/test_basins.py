@@ -0,0 +1,40 @@
+import numpy as np
+
+from chaos_explorer.integrator import OdeIntegrator
+from chaos_explorer.m_state.basins import BasinClassifier
+
+
+def pitchfork(state, a=1.0):
+    return a * state - state**3
+
+
+def test_cache_keyed_on_parameters_and_max_time():
+    classifier = BasinClassifier(lambda state: state[0], -0.5, 0.5, max_time=20, cache=True)
+    ic = np.array([0.1])
+    assert classifier(ic, OdeIntegrator(pitchfork, ic, parameters={"a": 1.0})) is False
+    assert classifier(ic, OdeIntegrator(pitchfork, ic, parameters={"a": -1.0})) is None  # Decays to 0
+    assert classifier(ic, OdeIntegrator(pitchfork, ic, parameters={"a": 1.0})) is False
+    assert len(classifier.cache) == 2
+
+    # Too short to reach the threshold
+    classifier.max_time = 0.1
+    assert classifier(ic, OdeIntegrator(pitchfork, ic, parameters={"a": 1.0})) is None
+    assert len(classifier.cache) == 3
+
+
+def test_cache_hit_skips_integration():
+    classifier = BasinClassifier(lambda state: state[0], -0.5, 0.5, max_time=20, cache=True)
+    integrator = OdeIntegrator(pitchfork, np.array([-0.1]), parameters={"a": np.array([1.0])})
+    assert classifier(np.array([-0.1]), integrator) is True
+    time = integrator.time
+    assert classifier(np.array([-0.1]), integrator) is True
+    assert integrator.time == time
+
+
+def test_points_past_a_threshold_leave_the_integrator():
+    classifier = BasinClassifier(lambda state: state[0], -0.5, 0.5, max_time=20)
+    integrator = OdeIntegrator(pitchfork, np.array([0.1]))
+    assert classifier.classify(np.array([0.7]), integrator) == (False, 0.0)
+    assert classifier.classify(np.array([-0.7]), integrator) == (True, 0.0)
+    assert integrator.time == 0
+    np.testing.assert_array_equal(integrator.state, [0.1])
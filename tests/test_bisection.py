@@ -0,0 +1,68 @@
+import numpy as np
+
+from chaos_explorer.integrator import OdeIntegrator
+from chaos_explorer.m_state.bisectionAlgorithm import BisectionAlgorithm
+from chaos_explorer.sde_integrator import SdeIntegrator
+
+
+def double_well(state):
+    return state - state**3
+
+
+def check_cold(point, integrator):
+    integrator.state = point
+    integrator.run(2.0)
+    return bool(integrator.state[0] < 0)
+
+
+def nudge(x):
+    pass
+
+
+def algorithm(sections):
+    integrator = SdeIntegrator(double_well, 0.3, np.array([-1.0]), dt=0.05, seed=7, chunk_size=16)
+    ic = [np.array([-1.0]), np.array([1.0])]
+    return BisectionAlgorithm(integrator, check_cold, nudge, nudge, 0.5, ic, sections=sections)
+
+
+def test_stochastic_resume_matches_uninterrupted_run(tmp_path):
+    for sections in [1, 3]:
+        uninterrupted = algorithm(sections)
+        uninterrupted.run(10)
+
+        path = tmp_path / f"bisection_{sections}.pkl"
+        algorithm(sections).run(4, checkpoint_path=path, checkpoint_every=2)
+        resumed = algorithm(sections)  # As if started again after being killed
+        resumed.run(10, checkpoint_path=path, checkpoint_every=2)
+
+        assert resumed.time == uninterrupted.time
+        np.testing.assert_array_equal(resumed.cold_point, uninterrupted.cold_point)
+        np.testing.assert_array_equal(resumed.hot_point, uninterrupted.hot_point)
+        np.testing.assert_array_equal(resumed.integrator.state, uninterrupted.integrator.state)
+
+
+def deterministic(sections, n_workers=1):
+    integrator = OdeIntegrator(double_well, np.array([-1.0]))
+    ic = [np.array([-1.0]), np.array([0.7])]
+    return BisectionAlgorithm(integrator, check_cold, nudge, nudge, 0.5, ic, sections=sections, n_workers=n_workers)
+
+
+def test_sections_match_bisection():
+    "Both close in on the edge state at 0, k-sections shrinking the bracket faster."
+    bisection, sections = deterministic(1), deterministic(3)
+    bisection.run(10)
+    sections.run(10)
+    for algorithm in [bisection, sections]:
+        assert algorithm.cold_point[0] < 0 < algorithm.hot_point[0]
+    bisection_width = bisection.hot_point[0] - bisection.cold_point[0]
+    sections_width = sections.hot_point[0] - sections.cold_point[0]
+    assert sections_width < 1e-2 * bisection_width
+    assert abs(sections.midpoint[0]) < bisection_width
+
+
+def test_sections_in_parallel_match_serial():
+    serial, parallel = deterministic(3), deterministic(3, n_workers=2)
+    serial.run(5)
+    parallel.run(5)
+    np.testing.assert_array_equal(parallel.cold_point, serial.cold_point)
+    np.testing.assert_array_equal(parallel.hot_point, serial.hot_point)
@@ -0,0 +1,27 @@
+import numpy as np
+
+from chaos_explorer.lyapunov.blvs import compute_blvs
+from chaos_explorer.lyapunov.core import BennetinStepper
+from chaos_explorer.lyapunov.transients import adaptive_blv_transient
+from chaos_explorer.models.l63 import l63, l63_jacobian
+
+IC = np.array([1.0, 2.0, 20.0])
+
+
+def test_adaptive_blv_transient_converges():
+    "The scaled Q_ic mustn't bias the FTLEs enough to stop the transient converging."
+    for tau in [0.01, 0.1]:
+        stepper = BennetinStepper(l63, IC, l63_jacobian, np.eye(3) * 1.0e-6, tau=tau)
+        max_steps = int(500 / tau)
+        steps = adaptive_blv_transient(stepper, max_steps)
+        assert steps < max_steps / 2
+        np.testing.assert_allclose(np.linalg.norm(stepper.Q, axis=0), 1)
+
+
+def test_compute_blvs_reports_transient_length():
+    trajectory, blvs, ftbles, transient_len = compute_blvs(l63, l63_jacobian, 5, IC, tau=0.1, transient_len=20)
+    assert transient_len == 20
+    assert len(trajectory) == len(blvs) == len(ftbles) == 5
+
+    *_, transient_len = compute_blvs(l63, l63_jacobian, 5, IC, tau=0.1, transient_len=5000, adaptive_transient=True)
+    assert 0 < transient_len < 2500
@@ -0,0 +1,35 @@
+import numpy as np
+
+from chaos_explorer.observers.buffer import ObservationBuffer
+
+
+def test_growth_preserves_contents():
+    rng = np.random.default_rng(0)
+    observations = rng.standard_normal((100, 3, 2))
+    buffer = ObservationBuffer(capacity=4)
+    for observation in observations[:37]:
+        buffer.append(observation)
+    buffer.extend(observations[37:60])
+    buffer.reserve(70)
+    buffer.extend(observations[60:61])
+    for observation in observations[61:]:
+        buffer.append(observation)
+    assert len(buffer) == 100
+    np.testing.assert_array_equal(buffer.array, observations)
+
+
+def test_reserve_before_first_observation():
+    buffer = ObservationBuffer(capacity=2)
+    buffer.reserve(10)
+    for time in range(10):
+        buffer.append(time)
+    assert buffer._data.shape == (10,)  # Allocated once, at the reserved size
+    assert buffer.array.dtype == np.float64  # Integer times aren't truncated
+    np.testing.assert_array_equal(buffer.array, np.arange(10))
+
+
+def test_array_is_a_view():
+    buffer = ObservationBuffer()
+    assert buffer.array.shape == (0,)
+    buffer.extend(np.ones((3, 2)))
+    assert np.shares_memory(buffer.array, buffer._data)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from chaos_explorer.checkpoint import load_checkpoint, save_checkpoint
+from chaos_explorer.sde_integrator import SdeIntegrator
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = tmp_path / "nested" / "checkpoint.pkl"
+    assert load_checkpoint(path) is None
+
+    checkpoint = {"array": np.arange(6.0).reshape(2, 3), "step": 3, "name": "run"}
+    save_checkpoint(path, checkpoint)
+    save_checkpoint(path, dict(checkpoint, step=4))  # Overwrites atomically
+    loaded = load_checkpoint(path)
+    np.testing.assert_array_equal(loaded["array"], checkpoint["array"])
+    assert loaded["step"] == 4
+    assert loaded["name"] == "run"
+    assert [p.name for p in path.parent.iterdir()] == ["checkpoint.pkl"]  # No temporary files left
+
+
+def test_sde_integrator_checkpoint(tmp_path):
+    def drift(state):
+        return -state
+
+    for ic in [np.zeros(2), np.zeros((3, 2))]:
+        integrator = SdeIntegrator(drift, 1.0, ic, seed=1, chunk_size=8)
+        integrator.run(0.05)  # Part way through a chunk of noise
+        save_checkpoint(tmp_path / "sde.pkl", integrator.checkpoint())
+        integrator.run(0.2)
+        spawned = integrator.spawn(1)[0]
+        spawned.run(0.1)
+
+        restored = SdeIntegrator(drift, 1.0, ic, seed=1, chunk_size=8)
+        restored.restore(load_checkpoint(tmp_path / "sde.pkl"))
+        restored.run(0.2)
+        np.testing.assert_array_equal(restored.state, integrator.state)
+        assert restored.time == integrator.time
+        restored_spawn = restored.spawn(1)[0]
+        restored_spawn.run(0.1)
+        np.testing.assert_array_equal(restored_spawn.state, spawned.state)
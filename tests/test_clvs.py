@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+
+from chaos_explorer.lyapunov.clvs import compute_clvs
+from chaos_explorer.lyapunov.reducers import ClvAngleHistogram, Histogram, MeanVariance
+from chaos_explorer.lyapunov.storage import make_store
+from chaos_explorer.models.l63 import l63, l63_jacobian
+
+IC = np.array([1.0, 2.0, 20.0])
+
+
+class Failing(MeanVariance):
+    def update(self, block):
+        raise RuntimeError("Reducer failed.")
+
+
+def run(tmp_path, reducer, storage):
+    return compute_clvs(
+        l63,
+        l63_jacobian,
+        IC,
+        save_location=tmp_path / "output",
+        blv_tranient_len=10,
+        clv_transient_steps=10,
+        clv_observation_steps=10,
+        block_size=5,
+        storage=storage,
+        tmp_dir=tmp_path / "scratch",
+        reducers=[reducer],
+        save_output=False,
+    )
+
+
+@pytest.mark.parametrize("storage", ["mmap", "disk"])
+def test_scratch_intermediates_removed(tmp_path, storage):
+    (tmp_path / "scratch").mkdir()
+    run(tmp_path, MeanVariance("FTCLE"), storage)
+    assert list((tmp_path / "scratch").iterdir()) == []
+
+    with pytest.raises(RuntimeError, match="Reducer failed"):
+        run(tmp_path, Failing("FTCLE"), storage)
+    assert list((tmp_path / "scratch").iterdir()) == []
+
+
+def test_checkpointed_intermediates_kept_on_failure(tmp_path):
+    with pytest.raises(RuntimeError, match="Reducer failed"):
+        compute_clvs(
+            l63,
+            l63_jacobian,
+            IC,
+            save_location=tmp_path / "output",
+            blv_tranient_len=10,
+            clv_transient_steps=10,
+            clv_observation_steps=10,
+            block_size=5,
+            checkpoint_dir=tmp_path / "checkpoint",
+            reducers=[Failing("FTCLE")],
+            save_output=False,
+        )
+    assert any((tmp_path / "checkpoint" / "intermediates").iterdir())
+
+
+def test_reductions_kept_out_of_block_folder(tmp_path):
+    kwargs = dict(
+        blv_tranient_len=10,
+        clv_transient_steps=10,
+        clv_observation_steps=10,
+        block_size=5,
+        save_location=tmp_path / "output",
+        reducers=[MeanVariance("FTCLE")],
+    )
+    compute_clvs(l63, l63_jacobian, IC, **kwargs)
+    assert sorted(path.name for path in (tmp_path / "output").iterdir()) == ["0.nc", "1.nc"]
+    assert (tmp_path / "output_reductions.nc").exists()
+
+    # A second run overwrites the blocks, the reductions are written again
+    compute_clvs(l63, l63_jacobian, IC, reductions_path=tmp_path / "stats" / "reductions.nc", **kwargs)
+    assert sorted(path.name for path in (tmp_path / "output").iterdir()) == ["0.nc", "1.nc"]
+    assert (tmp_path / "stats" / "reductions.nc").exists()
+    assert (tmp_path / "output_reductions.nc").exists()
+
+
+@pytest.mark.parametrize("output_store", ["netcdf", "zarr"])
+def test_parallel_segments_match_serial(tmp_path, output_store):
+    kwargs = dict(
+        blv_tranient_len=100,
+        clv_transient_steps=100,
+        clv_observation_steps=40,
+        block_size=10,
+        output_store=output_store,
+    )
+    compute_clvs(l63, l63_jacobian, IC, save_location=tmp_path / "serial", **kwargs)
+    compute_clvs(l63, l63_jacobian, IC, save_location=tmp_path / "parallel", n_workers=2, **kwargs)
+
+    path = "clvs" if output_store == "zarr" else ""
+    serial = make_store(output_store, tmp_path / "serial" / path)
+    parallel = make_store(output_store, tmp_path / "parallel" / path)
+    assert len(serial) == len(parallel) == 4
+    for index in range(len(serial)):
+        expected, block = serial.read(index), parallel.read(index)
+        for name in ["time", "trajectory", "BLV", "FTBLE"]:
+            np.testing.assert_array_equal(block[name], expected[name])
+        # Segments converge A over segment_overlap R matrices rather than the whole of the later run
+        np.testing.assert_allclose(block["CLV"], expected["CLV"], atol=1e-3)
+        np.testing.assert_allclose(block["FTCLE"], expected["FTCLE"], atol=1e-2)
+
+
+def test_reductions_match_full_output(tmp_path):
+    reducers = [
+        MeanVariance("FTCLE"),
+        MeanVariance("CLV"),
+        Histogram("FTCLE", bins=20, range=(-20, 5)),
+        ClvAngleHistogram(0, 1, bins=30),
+        ClvAngleHistogram([0], [1, 2], bins=30),
+    ]
+    compute_clvs(
+        l63,
+        l63_jacobian,
+        IC,
+        save_location=tmp_path / "output",
+        blv_tranient_len=100,
+        clv_transient_steps=100,
+        clv_observation_steps=23,
+        block_size=5,  # Uneven blocks, so the running statistics are combined across blocks
+        reducers=reducers,
+    )
+    output = make_store("netcdf", tmp_path / "output")
+    blocks = [output.read(index) for index in range(len(output))]
+    full = {name: np.concatenate([block[name] for block in blocks]) for name in ["FTCLE", "CLV"]}
+
+    for reducer in reducers[:2]:
+        values = full[reducer.variable]
+        assert reducer.count == len(values)
+        np.testing.assert_allclose(reducer.mean, np.mean(values, axis=0))
+        np.testing.assert_allclose(reducer.variance, np.var(values, axis=0, ddof=1))
+
+    for reducer in reducers[2:]:
+        values = reducer.values(full)
+        values = values if values.ndim > 1 else values[:, np.newaxis]
+        expected = np.stack([np.histogram(column, reducer.bins, reducer.range)[0] for column in values.T])
+        np.testing.assert_array_equal(np.reshape(reducer.counts, expected.shape), expected)
+        total = np.sum(expected, axis=-1) + np.ravel(reducer.underflow) + np.ravel(reducer.overflow)
+        np.testing.assert_array_equal(total, len(values))
+
+    # The same figures are written to the reductions file
+    import xarray as xr
+
+    with xr.open_dataset(tmp_path / "output_reductions.nc") as reductions:
+        np.testing.assert_allclose(reductions["FTCLE_mean"], reducers[0].mean)
+        np.testing.assert_array_equal(reductions["FTCLE_histogram"], reducers[2].counts)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from chaos_explorer.integrator import EnsembleIntegrator, OdeIntegrator
+from chaos_explorer.lyapunov.blvs import compute_blvs
+from chaos_explorer.lyapunov.ensemble import EnsembleBennetinStepper, _unbatched, compute_ensemble_spectrum
+from chaos_explorer.models.l63 import l63, l63_batched, l63_jacobian, l63_jacobian_batched
+
+ICS = np.array([[1.0, 2.0, 20.0], [-3.0, 1.0, 15.0], [0.5, -0.5, 30.0], [8.0, 8.0, 27.0]])
+
+
+def test_members_match_independent_integrators():
+    # RK45 steps the ensemble as one system, so members only agree to within the default tolerances
+    for method, rtol, atol in [("RK4", 1e-10, 0), ("RK45", 1e-2, 0.1)]:
+        ensemble = EnsembleIntegrator(l63_batched, ICS, parameters={"rho": 30}, method=method)
+        ensemble.run(0.5)
+        assert ensemble.time == 0.5
+        for ic, state in zip(ICS, ensemble.state):
+            single = OdeIntegrator(l63, ic, parameters={"rho": 30}, method=method)
+            single.run(0.5)
+            np.testing.assert_allclose(state, single.state, rtol=rtol, atol=atol)
+
+
+def test_batched_l63_matches_single_states():
+    np.testing.assert_allclose(l63_batched(ICS), np.stack([l63(ic) for ic in ICS]))
+    np.testing.assert_allclose(l63_jacobian_batched(ICS), np.stack([l63_jacobian(ic) for ic in ICS]))
+    assert _unbatched(l63) is l63_batched
+    assert _unbatched(l63_jacobian) is l63_jacobian_batched
+
+
+def test_single_state_functions_use_registered_batched_versions():
+    batched = EnsembleBennetinStepper(l63_batched, ICS, l63_jacobian_batched, np.eye(3), tau=0.1, method="RK4")
+    unbatched = EnsembleBennetinStepper(l63, ICS, l63_jacobian, np.eye(3), tau=0.1, method="RK4", batched=False)
+    assert unbatched.rhs is l63_batched
+    looped = EnsembleBennetinStepper(
+        lambda state: l63(state),  # Not registered, so members are looped over
+        ICS,
+        lambda state: l63_jacobian(state),
+        np.eye(3),
+        tau=0.1,
+        method="RK4",
+        batched=False,
+    )
+    for stepper in [batched, unbatched, looped]:
+        stepper.many_steps(5)
+    np.testing.assert_allclose(unbatched.Q, batched.Q)
+    np.testing.assert_allclose(looped.R, batched.R)
+
+
+def test_ensemble_spectrum_matches_serial_and_narrows():
+    rng = np.random.default_rng(0)
+    ics = ICS[0] + rng.standard_normal((16, 3))
+    _, _, ftbles, _ = compute_blvs(l63, l63_jacobian, 1500, ICS[0], tau=0.1, transient_len=100)
+    serial = np.mean(ftbles, axis=0)
+
+    widths = []
+    for n_members in [4, 16]:
+        spectrum = compute_ensemble_spectrum(
+            l63_batched, l63_jacobian_batched, ics[:n_members], number_of_steps=300, transient_len=50, method="RK4"
+        )
+        assert spectrum["exponents"].shape == (n_members, 3)
+        np.testing.assert_allclose(spectrum["mean"], serial, atol=0.15)
+        assert np.all(spectrum["lower"] < spectrum["mean"]) and np.all(spectrum["mean"] < spectrum["upper"])
+        widths.append(spectrum["upper"] - spectrum["lower"])
+    assert np.all(widths[1] < widths[0])
+
+    parallel = compute_ensemble_spectrum(
+        l63_batched, l63_jacobian_batched, ics[:4], number_of_steps=20, transient_len=5, method="RK4", n_workers=2
+    )
+    together = compute_ensemble_spectrum(
+        l63_batched, l63_jacobian_batched, ics[:4], number_of_steps=20, transient_len=5, method="RK4"
+    )
+    np.testing.assert_allclose(parallel["exponents"], together["exponents"], rtol=1e-10)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from chaos_explorer.lyapunov import ginelli
+
+
+def clv_convergence_step(R, A):
+    "Reference backward step, with a general solve, from the original compute_clvs."
+    newA = np.linalg.solve(R, A)  # Push A with R^-1
+    norms = np.linalg.norm(newA, axis=0, ord=2)  # Prevent vector growth
+    return newA / norms, norms
+
+
+def random_R(rng, steps, k):
+    R = np.triu(rng.standard_normal((steps, k, k)), 1)
+    R[:, np.arange(k), np.arange(k)] = np.exp(0.3 * rng.standard_normal((steps, k)) + np.linspace(0.2, -0.5, k))
+    return R
+
+
+def test_engine_matches_reference():
+    rng = np.random.default_rng(0)
+    k, tau = 5, 0.1
+    R_ts = random_R(rng, 200, k)
+    A, norms = ginelli.initial_A(k)
+
+    expected_A_ts, expected_norms_ts = [], []
+    reference_A, reference_norms = A, norms
+    for R in R_ts[::-1]:
+        expected_A_ts.append(reference_A)
+        expected_norms_ts.append(reference_norms)
+        reference_A, reference_norms = clv_convergence_step(R, reference_A)
+    expected_A_ts, expected_norms_ts = np.array(expected_A_ts[::-1]), np.array(expected_norms_ts[::-1])
+
+    A_ts, ftcle_ts, observed_A, observed_norms = ginelli.observe(R_ts, A, norms, tau)
+    np.testing.assert_allclose(A_ts, expected_A_ts, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(ftcle_ts, -np.log(expected_norms_ts) / tau, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(observed_A, reference_A, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(observed_norms, reference_norms, rtol=1e-10)
+
+    converged_A, converged_norms = ginelli.converge(R_ts, A, norms)
+    np.testing.assert_allclose(converged_A, reference_A, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(converged_norms, reference_norms, rtol=1e-10)
+
+    # Blocks chain, as when a run is split into blocks
+    first_A, first_norms = ginelli.converge(R_ts[100:], A, norms)
+    np.testing.assert_allclose(ginelli.converge(R_ts[:100], first_A, first_norms)[0], reference_A, atol=1e-12)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from chaos_explorer.integrator import OdeIntegrator
+
+IC = np.array([1.0, 0.0])
+
+
+def oscillator(state):
+    return np.array([state[1], -state[0]])
+
+
+def exact(t):
+    "Solution of the oscillator from IC at time t."
+    return np.array([np.cos(t), -np.sin(t)])
+
+
+def test_persistent_matches_exact():
+    persistent = OdeIntegrator(oscillator, IC, persistent=True)
+    fresh = OdeIntegrator(oscillator, IC)
+    for i in range(5):
+        persistent.run(0.2)
+        fresh.run(0.2)
+    np.testing.assert_allclose(persistent.state, exact(1.0), atol=1e-3)
+    np.testing.assert_allclose(fresh.state, exact(1.0), atol=1e-3)
+
+
+def test_persistent_negative_run():
+    integrator = OdeIntegrator(oscillator, IC, persistent=True)
+    integrator.run(-0.5)
+    assert integrator.time == -0.5
+    np.testing.assert_allclose(integrator.state, exact(-0.5), atol=1e-3)
+
+    # Reversing part way through restarts the solver rather than carrying on forwards
+    for t in [2.0, -0.5, -0.5, 1.0]:
+        integrator.run(t)
+    assert integrator.time == 1.5
+    np.testing.assert_allclose(integrator.state, exact(1.5), atol=1e-3)
+
+
+def test_persistent_short_backward_run():
+    "First step of a backward run is bounded by the length of the run."
+    integrator = OdeIntegrator(oscillator, IC, persistent=True)
+    integrator.run(3.0)
+    integrator.run(-1e-3)
+    np.testing.assert_allclose(integrator.state, exact(3.0 - 1e-3), atol=1e-3)
@@ -0,0 +1,81 @@
+import numpy as np
+
+from chaos_explorer.integrator import OdeIntegrator
+from chaos_explorer.jit import njit
+from chaos_explorer.models.l63 import l63, l63_jacobian
+from chaos_explorer.models.l96 import l96, l96_jacobian
+from chaos_explorer.models.registry import ModelKernels, get_kernels, register_model
+from chaos_explorer.tangent_integrator import TangentIntegrator
+
+N = 10
+
+
+def l96_ic():
+    return 8 + 0.1 * np.sin(np.arange(N))
+
+
+def test_kernels_match_python_rhs():
+    python = OdeIntegrator(l63, np.array([1.0, 2.0, 20.0]), use_kernels=False)
+    compiled = OdeIntegrator(l63, np.array([1.0, 2.0, 20.0]))
+    assert compiled.kernels is not None
+    python.run(0.5)
+    compiled.run(0.5)
+    np.testing.assert_allclose(compiled.state, python.state, rtol=1e-10)
+
+
+def decay(state, rate=1.0):
+    return -rate * state
+
+
+@njit
+def _decay_kernel(state, parameters):
+    return -parameters[0] * state
+
+
+register_model(ModelKernels("test_decay", _decay_kernel, parameters={"rate": 1.0}), decay)
+
+
+def test_unsupported_parameters_fall_back_to_python_rhs():
+    kernels = get_kernels(decay)
+    assert kernels.supports({"rate": 2.0})
+    assert not kernels.supports({"rate": np.array([1.0, 2.0])})
+    assert not kernels.supports({"unknown": 1.0})
+
+    for method in ["RK45", "RK4"]:
+        integrator = OdeIntegrator(decay, np.ones(2), parameters={"rate": np.array([1.0, 2.0])}, method=method)
+        integrator.run(1.0)
+        np.testing.assert_allclose(integrator.state, np.exp([-1.0, -2.0]), rtol=1e-2)
+
+
+def test_l96_per_site_forcing():
+    kernels = get_kernels(l96)
+    assert kernels.supports({"F": 8.0})
+    assert kernels.supports({"F": np.full(N, 8.0)})
+    assert not kernels.supports({"F": np.full((N, 2), 8.0)})
+
+    for F in [8.0, np.full(N, 8.0), np.linspace(6.0, 10.0, N)]:
+        for method in ["RK45", "RK4"]:
+            compiled = OdeIntegrator(l96, l96_ic(), parameters={"F": F}, method=method)
+            python = OdeIntegrator(l96, l96_ic(), parameters={"F": F}, method=method, use_kernels=False)
+            compiled.run(0.1)
+            python.run(0.1)
+            np.testing.assert_allclose(compiled.state, python.state)
+
+
+def test_tangent_integrator_array_parameters():
+    parameters = {"F": np.linspace(7.0, 9.0, N)}
+    compiled = TangentIntegrator(l96, l96_ic(), l96_jacobian, np.eye(N), parameters=parameters)
+    python = TangentIntegrator(l96, l96_ic(), l96_jacobian, np.eye(N), parameters=parameters, use_kernels=False)
+    compiled.run(0.1)
+    python.run(0.1)
+    np.testing.assert_allclose(compiled.state, python.state)
+
+
+def test_tangent_integrator_array_parameters_without_jacobian():
+    "Kernels found from rhs alone, the jvp has to be derived once they're skipped."
+    parameters = {"F": np.full(N, 8.0)}
+    integrator = TangentIntegrator(l96, l96_ic(), perturbation_ic=np.eye(N), parameters=parameters)
+    reference = TangentIntegrator(l96, l96_ic(), l96_jacobian, np.eye(N), parameters=parameters, use_kernels=False)
+    integrator.run(0.1)
+    reference.run(0.1)
+    np.testing.assert_allclose(integrator.state, reference.state, rtol=1e-6, atol=1e-8)
@@ -0,0 +1,48 @@
+import logging
+import subprocess
+import sys
+
+import numpy as np
+
+from chaos_explorer.log import log_to_stdout
+from chaos_explorer.lyapunov.core import BennetinObserver, BennetinStepper
+from chaos_explorer.models.l63 import l63, l63_jacobian
+
+NUMPY_ONLY = """
+import sys
+sys.modules["xarray"] = None  # Makes import xarray raise ImportError
+sys.modules["tqdm"] = None
+
+import numpy as np
+from chaos_explorer.integrator import OdeIntegrator
+from chaos_explorer.lyapunov.core import BennetinObserver, BennetinStepper, posQR
+from chaos_explorer.lyapunov.ginelli import converge, observe
+from chaos_explorer.lyapunov.blvs import compute_blvs
+from chaos_explorer.lyapunov.clvs import compute_clvs
+from chaos_explorer.models.l63 import l63, l63_jacobian
+
+OdeIntegrator(l63, np.array([1.0, 2.0, 20.0])).run(0.1)
+stepper = BennetinStepper(l63, np.array([1.0, 2.0, 20.0]), l63_jacobian, np.eye(3), tau=0.1)
+stepper.many_steps(3)
+BennetinObserver(stepper).dump_to_store(None)  # Warns that there are no observations
+"""
+
+
+def test_import_without_xarray_or_tqdm():
+    "The core layer runs with numpy/scipy only, and prints nothing, not even warnings, by default."
+    result = subprocess.run([sys.executable, "-c", NUMPY_ONLY], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == result.stderr == ""
+
+
+def test_log_to_stdout(capsys):
+    stepper = BennetinStepper(l63, np.array([1.0, 2.0, 20.0]), l63_jacobian, np.eye(3))
+    logger = logging.getLogger("chaos_explorer")
+    level = logger.level
+    handler = log_to_stdout()
+    try:
+        BennetinObserver(stepper).dump_to_store(None)
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+    assert "WARNING|I have no observations! :(" in capsys.readouterr().out
@@ -0,0 +1,21 @@
+import numpy as np
+
+from chaos_explorer.lyapunov.blvs import compute_blvs
+from chaos_explorer.models.henon import henon, henon_jacobian
+from chaos_explorer.models.logistic import logistic, logistic_jacobian
+
+
+def spectrum(f, jacobian, ic, iterates=20000):
+    *_, ftbles, _ = compute_blvs(f, jacobian, iterates, ic, tau=1, transient_len=100, discrete=True)
+    return np.mean(ftbles, axis=0)
+
+
+def test_henon_spectrum():
+    exponents = spectrum(henon, henon_jacobian, np.array([0.1, 0.1]))
+    np.testing.assert_allclose(exponents, [0.42, -1.62], atol=0.02)
+    # The jacobian's determinant is -b everywhere, so the exponents sum to log(b) exactly
+    np.testing.assert_allclose(exponents.sum(), np.log(0.3))
+
+
+def test_logistic_spectrum():
+    np.testing.assert_allclose(spectrum(logistic, logistic_jacobian, np.array([0.3])), [np.log(2)], atol=0.01)
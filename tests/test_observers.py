@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from chaos_explorer.integrator import OdeIntegrator
+from chaos_explorer.models.l63 import L63TrajectoryObserver, l63, l63_jacobian
+from chaos_explorer.observers.xarray import TangentTrajectoryObserver
+from chaos_explorer.tangent_integrator import TangentIntegrator
+
+IC = np.array([1.0, 2.0, 20.0])
+
+
+class Tangent(TangentTrajectoryObserver):
+    observations = None
+
+
+def test_single_pass_matches_stepwise():
+    single = L63TrajectoryObserver(OdeIntegrator(l63, IC))
+    stepwise = L63TrajectoryObserver(OdeIntegrator(l63, IC))
+    single.make_observations(10, 0.01, timer=False, single_pass=True)
+    stepwise.make_observations(10, 0.01, timer=False)
+    np.testing.assert_allclose(single._time_obs.array, stepwise._time_obs.array)
+    np.testing.assert_allclose(single._observations.array, stepwise._observations.array, rtol=1e-3)
+
+
+def test_single_pass_rejected_before_integrating():
+    integrator = TangentIntegrator(l63, IC, l63_jacobian, np.eye(3))
+    observer = Tangent(integrator)
+    with pytest.raises(ValueError, match="single pass"):
+        observer.make_observations(10, 0.01, timer=False, single_pass=True)
+    assert integrator.time == 0
+    assert len(observer._observations) == 0
+
+    observer.make_observations(10, 0.01, timer=False)
+    assert observer._observations.array.shape == (11, 3)
+
+
+def test_empty_observers_warn_through_logger(caplog, capsys):
+    observer = L63TrajectoryObserver(OdeIntegrator(l63, IC))
+    with caplog.at_level("WARNING", logger="chaos_explorer"):
+        assert observer.observations is None
+        observer.dump("unused.nc")
+    assert [record.levelname for record in caplog.records] == ["WARNING", "WARNING"]
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,26 @@
+import numpy as np
+
+from chaos_explorer.sde_integrator import SdeIntegrator
+
+
+def drift(state):
+    return -state
+
+
+def test_member_streams_independent_of_ensemble_size():
+    single = SdeIntegrator(drift, 0.5, np.zeros(2), seed=3)
+    pair = SdeIntegrator(drift, 0.5, np.zeros((2, 2)), seed=3)
+    five = SdeIntegrator(drift, 0.5, np.zeros((5, 2)), seed=3)
+    for integrator in [single, pair, five]:
+        integrator.run(1.0)
+    np.testing.assert_array_equal(single.state, pair.state[0])
+    np.testing.assert_array_equal(pair.state, five.state[:2])
+    assert not np.array_equal(pair.state[0], pair.state[1])
+
+
+def test_seed_reproducible():
+    first = SdeIntegrator(drift, 0.5, np.zeros(2), seed=np.random.SeedSequence(4))
+    second = SdeIntegrator(drift, 0.5, np.zeros(2), seed=4)
+    first.run(0.5)
+    second.run(0.5)
+    np.testing.assert_array_equal(first.state, second.state)
@@ -0,0 +1,85 @@
+import numpy as np
+
+from chaos_explorer.integrator import OdeIntegrator
+from chaos_explorer.lyapunov.core import BennetinStepper
+from chaos_explorer.m_state.bisectionAlgorithm import BisectionAlgorithm
+from chaos_explorer.models.l63 import l63, l63_jacobian
+from chaos_explorer.stats import NULL_STATS, Stats
+
+IC = np.array([1.0, 2.0, 20.0])
+
+
+def test_counts_times_and_sink():
+    received = []
+    stats = Stats(sink=lambda *figure: received.append(figure))
+    stats.count("steps")
+    stats.count("steps", 4)
+    stats.add_time("qr", 0.5)
+    with stats.timer("qr"):
+        pass
+
+    assert stats.counts == {"steps": 5}
+    assert stats.times["qr"] >= 0.5
+    assert received[:3] == [("count", "steps", 1), ("count", "steps", 4), ("time", "qr", 0.5)]
+    assert len(received) == 4
+    assert stats.as_dict() == {"counts": {"steps": 5}, "times": {"qr": stats.times["qr"]}}
+
+    stats.reset()
+    assert stats.as_dict() == {"counts": {}, "times": {}}
+
+
+def test_null_stats_records_nothing():
+    NULL_STATS.count("steps")
+    NULL_STATS.add_time("qr", 1.0)
+    with NULL_STATS.timer("qr"):
+        pass
+    assert not NULL_STATS.enabled
+    assert NULL_STATS.as_dict() == {"counts": {}, "times": {}}
+
+
+def test_integrator_counts_rhs_evaluations():
+    stats = Stats()
+    integrator = OdeIntegrator(l63, IC, persistent=True, stats=stats)
+    integrator.run(1.0)
+    assert stats.counts["rhs_evaluations"] == integrator._stepping_solver.nfev > 0
+    assert stats.times["integration"] > 0
+
+    stats = Stats()
+    integrator = OdeIntegrator(l63, IC, method="RK4", dt=0.01, stats=stats)
+    integrator.run(1.0)
+    assert stats.counts["rhs_evaluations"] == 4 * 100
+
+
+def test_bennetin_stepper_counts_steps():
+    stats = Stats()
+    stepper = BennetinStepper(l63, IC, l63_jacobian, np.eye(3), tau=0.1, stats=stats)
+    stepper.many_steps(7)
+    assert stats.counts["bennetin_steps"] == 7
+    assert stats.counts["rhs_evaluations"] > 0
+    assert stats.times["qr"] > 0
+
+
+def double_well(state):
+    return state - state**3
+
+
+def check_cold(point, integrator):
+    integrator.state = point
+    integrator.run(2.0)
+    return bool(integrator.state[0] < 0)
+
+
+def nudge(x):
+    pass
+
+
+def test_bisection_counts_basin_checks():
+    for sections, checks_per_step in [(1, 1), (3, 3)]:
+        stats = Stats()
+        integrator = OdeIntegrator(double_well, np.array([-1.0]))
+        ic = [np.array([-1.0]), np.array([0.7])]
+        algorithm = BisectionAlgorithm(integrator, check_cold, nudge, nudge, 0.5, ic, sections=sections, stats=stats)
+        algorithm.run(5)
+        assert stats.counts["steps"] == 5
+        assert stats.counts["basin_checks"] == 5 * checks_per_step
+        assert stats.times["basin_checks"] > 0
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from chaos_explorer.lyapunov.storage import StorageEncoding, make_store
+
+KINDS = ["memory", "mmap", "netcdf", "zarr"]
+
+
+def make_block(index, length=5, ndim=3, k=2):
+    rng = np.random.default_rng(index)
+    return {
+        "time": index * length + np.arange(length, dtype=float),
+        "trajectory": rng.standard_normal((length, ndim)),
+        "Q": rng.standard_normal((length, ndim, k)),
+        "R": np.triu(rng.standard_normal((length, k, k))),
+    }
+
+
+def assert_blocks_equal(block, expected):
+    assert set(block) == set(expected)
+    for name in expected:
+        np.testing.assert_array_equal(block[name], expected[name])
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_append_read_truncate(tmp_path, kind):
+    store = make_store(kind, tmp_path / "store", time_chunk=3, capacity=7)  # Small, so mmap stores grow
+    blocks = [make_block(i) for i in range(4)]
+    for block in blocks:
+        store.append(block)
+    assert len(store) == 4
+    for index in [2, 0, 3, 1]:
+        assert_blocks_equal(store.read(index), blocks[index])
+    for block, expected in zip(store.reversed_blocks(), blocks[::-1]):
+        assert_blocks_equal(block, expected)
+
+    # Drop blocks written after a checkpoint and carry on
+    store.truncate(2)
+    assert len(store) == 2
+    store.append(blocks[3])
+    assert len(store) == 3
+    assert_blocks_equal(store.read(1), blocks[1])
+    assert_blocks_equal(store.read(2), blocks[3])
+
+    store.truncate(0)
+    assert len(store) == 0
+    store.append(blocks[1])
+    assert_blocks_equal(store.read(0), blocks[1])
+
+
+@pytest.mark.parametrize("kind", ["netcdf", "zarr"])
+def test_reopened_store(tmp_path, kind):
+    "Stores on disk are picked up again, e.g. when a run is resumed, unless overwritten."
+    store = make_store(kind, tmp_path / "store")
+    blocks = [make_block(i) for i in range(3)]
+    for block in blocks:
+        store.append(block)
+
+    reopened = make_store(kind, tmp_path / "store")
+    assert len(reopened) == 3
+    assert_blocks_equal(reopened.read(2), blocks[2])
+    reopened.append(make_block(3))
+    assert_blocks_equal(reopened.read(3), make_block(3))
+
+    assert len(make_store(kind, tmp_path / "store", overwrite=True)) == 0
+
+
+@pytest.mark.parametrize("kind", ["netcdf", "zarr"])
+@pytest.mark.parametrize(
+    "encoding, tolerance",
+    [
+        (StorageEncoding(), 0),
+        (StorageEncoding("float32", "zlib", pack_R=True), 1e-6),
+        (StorageEncoding("int16", "zlib", pack_R=True), 1e-4),
+    ],
+)
+def test_encoded_round_trip(tmp_path, kind, encoding, tolerance):
+    store = make_store(kind, tmp_path / "store", storage_encoding=encoding)
+    block = make_block(0)
+    block["Q"] /= np.linalg.norm(block["Q"], axis=1, keepdims=True)  # Scaled as unit vectors with int16
+    store.append(block)
+    store.append(make_block(1))
+
+    read = store.read(0)
+    assert set(read) == set(block)
+    np.testing.assert_array_equal(read["time"], block["time"])
+    for name in ["trajectory", "Q", "R"]:
+        np.testing.assert_allclose(read[name], block[name], rtol=tolerance, atol=tolerance)
+    assert np.all(np.tril(read["R"], -1) == 0)
+    assert read["R"].shape == block["R"].shape
+
+
+def test_blosc_zarr_round_trip(tmp_path):
+    with pytest.raises(ValueError, match="Unknown compression"):
+        StorageEncoding(compression="lz4")
+    store = make_store("zarr", tmp_path / "store", storage_encoding=StorageEncoding("float32", "blosc", pack_R=True))
+    store.append(make_block(0))
+    np.testing.assert_allclose(store.read(0)["R"], make_block(0)["R"], rtol=1e-6)
+
+
+def test_netcdf_store_leaves_other_files(tmp_path):
+    folder = tmp_path / "store"
+    folder.mkdir()
+    (folder / "my_important_obs.nc").write_bytes(b"not a block")
+    (folder / "notes.txt").write_text("keep")
+    store = make_store("netcdf", folder)
+    assert len(store) == 0
+    store.append(make_block(0))
+    assert len(make_store("netcdf", folder)) == 1
+
+    assert len(make_store("netcdf", folder, overwrite=True)) == 0
+    assert sorted(path.name for path in folder.iterdir()) == ["my_important_obs.nc", "notes.txt"]
@@ -0,0 +1,52 @@
+import numpy as np
+
+from chaos_explorer.lyapunov import ginelli
+from chaos_explorer.lyapunov.storage import MemoryBlockStore
+from chaos_explorer.lyapunov.transients import ClvTransientCheck, _largest_angle, _scaled_product
+
+
+class CountingStore(MemoryBlockStore):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def read(self, index):
+        self.reads += 1
+        return super().read(index)
+
+
+def random_R(rng, steps, k=4):
+    "R matrices with exponents 1, 0.2, -0.5, -3 over steps of 0.1."
+    R = np.triu(0.3 * rng.standard_normal((steps, k, k)), 1)
+    exponents = np.array([1, 0.2, -0.5, -3])
+    R[:, np.arange(k), np.arange(k)] = np.exp(0.1 * exponents + 0.05 * rng.standard_normal((steps, k)))
+    return R
+
+
+def pushed_back(store, A):
+    "A pushed back through every block of store."
+    norms = np.ones(len(A))
+    for block in store.reversed_blocks():
+        A, norms = ginelli.converge(block["R"], A, norms)
+    return A
+
+
+def test_incremental_check_matches_full_push():
+    rng = np.random.default_rng(1)
+    store = CountingStore()
+    check = ClvTransientCheck(4, angle_tol=1.0e-6)
+    results = []
+    for i in range(30):  # Long enough for exp of the accumulated norms to underflow
+        store.append({"time": np.arange(100), "R": random_R(rng, 100)})
+        results.append(check(store))
+        assert store.reads == len(store)  # Each block read once by the check
+
+        identity = pushed_back(store, np.eye(4))
+        random = pushed_back(store, check.random_A)
+        np.testing.assert_allclose(np.abs(np.sum(check.M * identity, axis=0)), 1, atol=1e-10)
+        incremental = _largest_angle(check.M, _scaled_product(check.M, check.log_norms, check.random_A)[0])
+        full = _largest_angle(identity, random)
+        assert abs(incremental - full) < 1e-6 or (incremental < 1e-6 and full < 1e-6)
+        store.reads -= 2 * len(store)
+    assert not results[0] and results[-1]
+    assert np.all(np.isfinite(check.log_norms))